@@ -11,14 +11,29 @@ License: MIT
 """
 
 import streamlit as st
-import pandas as pd
 import re
-import json
-from bin_checker import check_bin_3ds
-from bin_scraper import scrape_bins_from_url
 from utils import classify_risk, is_valid_bin, is_valid_ip, is_valid_url, get_risk_icon
-import database as db
 from datetime import datetime
+import metrics
+
+# pandas, SQLAlchemy (via database) and requests (via bin_checker / bin_scraper)
+# are imported inside the tabs and functions that use them, so the page starts
+# rendering before they load and tabs that are never opened never load them
+
+# Number of bulk results written to the database / rendered per batch
+BULK_BATCH_SIZE = 100
+
+# Cached query results are keyed on the database write generation, so this
+# app's own writes show up on the next rerun; the TTL bounds how long writes
+# made by other processes (file scanner, scripts) can go unseen
+QUERY_CACHE_TTL = 60  # seconds
+
+# History summary charts: days shown in the per-day chart, countries in the country chart
+HISTORY_DAYS = 30
+HISTORY_TOP_COUNTRIES = 15
+
+# Time spent turning result tables into page elements
+RENDER_SECONDS = metrics.histogram("bin_app_render_seconds", "Time to render result tables, by section")
 
 # Set page config
 st.set_page_config(
@@ -27,15 +42,168 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_database():
+    """
+    Load the database module and create the schema once per server process.
+
+    Returns:
+        module: database, whose engine is shared across reruns and sessions
+    """
+    import database
+    database.init_db()
+    return database
+
+@st.cache_resource
+def get_lookup_client():
+    """Share the pooled HTTP session and lookup cache across reruns and sessions"""
+    import http_client
+    from bin_checker import get_lookup_cache
+    http_client.get_session()
+    return get_lookup_cache()
+
+@st.cache_resource
+def start_metrics_server():
+    """Serve /metrics on BIN_METRICS_PORT once per server process, if configured"""
+    return metrics.start_http_server()
+
+def render_diagnostics():
+    """Latency, counter and cache tables from the metrics registry, plus the raw export"""
+    snapshot = metrics.snapshot()
+    
+    if snapshot["histograms"]:
+        st.markdown("**Latency**")
+        st.dataframe([
+            {
+                "Metric": name,
+                "Labels": ", ".join(f"{key}={value}" for key, value in labels.items()),
+                "Count": summary["count"],
+                "Mean (ms)": round(summary["mean"] * 1000, 2),
+                "p50 (ms)": round(summary["p50"] * 1000, 2),
+                "p95 (ms)": round(summary["p95"] * 1000, 2),
+                "p99 (ms)": round(summary["p99"] * 1000, 2),
+            }
+            for name, labels, summary in snapshot["histograms"]
+        ], hide_index=True)
+    
+    if snapshot["values"]:
+        st.markdown("**Counters and cache**")
+        st.dataframe([
+            {
+                "Metric": name,
+                "Labels": ", ".join(f"{key}={value}" for key, value in labels.items()),
+                "Value": round(value, 4),
+            }
+            for name, labels, value in snapshot["values"]
+        ], hide_index=True)
+    
+    if not snapshot["histograms"] and not snapshot["values"]:
+        st.info("Nothing recorded yet.")
+    
+    st.download_button(
+        label="Download Prometheus metrics",
+        data=metrics.render_prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain"
+    )
+
+def is_tab_open(tab):
+    """
+    Whether a tab's content should be rendered on this run.
+
+    Returns:
+        bool: False only for tabs Streamlit reports as not selected; always
+        True where Streamlit runs every tab
+    """
+    return getattr(tab, "open", None) is not False
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, show_spinner=False)
+def load_filter_options(generation):
+    """Distinct scheme / risk level / country values for the history filters"""
+    return get_database().get_bin_record_filter_options()
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, show_spinner=False)
+def load_history_stats(generation, days):
+    """Record counts per scheme, country, risk level, source and (last `days`) day"""
+    return get_database().get_bin_stats(days=days)
+
+def render_history_summary(stats):
+    """Bar charts of the whole history's record counts, from the bin_stats rollup"""
+    import pandas as pd
+    
+    def chart(dimension, label, top=None):
+        rows = stats[dimension][:top] if top else stats[dimension]
+        st.markdown(f"**{label}**")
+        st.bar_chart(pd.DataFrame(rows, columns=[label, "Records"]).set_index(label), height=220)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        chart("scheme", "Scheme")
+    with col2:
+        chart("risk_level", "Risk Level")
+    with col3:
+        chart("source", "Source")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        chart("country", "Country", top=HISTORY_TOP_COUNTRIES)
+    with col2:
+        chart("day", "Day")
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, max_entries=100, show_spinner=False)
+def load_history_page(generation, schemes, risk_levels, countries, bin_prefix, limit, after):
+    """
+    Load one page of the history view as a display-ready DataFrame.
+
+    Returns:
+        tuple: (DataFrame, next_cursor); the DataFrame is empty if nothing matches
+    """
+    import numpy as np
+    import pandas as pd
+    
+    records_df, next_cursor = get_database().load_bin_records_frame(
+        schemes=list(schemes),
+        risk_levels=list(risk_levels),
+        countries=list(countries),
+        bin_prefix=bin_prefix,
+        limit=limit,
+        after=after
+    )
+    
+    if records_df.empty:
+        return pd.DataFrame(), next_cursor
+    
+    # Map database columns to display columns, whole columns at a time
+    history_df = pd.DataFrame({
+        "BIN": records_df["bin_number"],
+        "Date": records_df["checked_at"].astype(str).str.slice(0, 16),  # "YYYY-MM-DD HH:MM"
+        "Scheme": records_df["scheme"],
+        "Type": records_df["card_type"],
+        "Country": records_df["country"],
+        "IP/Location": records_df["ip_country"],
+        "Issuer": records_df["issuer"],
+        "3DS": np.where(records_df["is_3ds"], "Yes ✅", "No ⚠️"),
+        "Risk Level": records_df["risk_level"],
+        "Source": records_df["source"],
+        "IP Address": records_df["ip_address"],
+        # Scraped page or file:// path of a file scan finding
+        "URL": records_df["source_url"].fillna("N/A"),
+        "Fraud Context": np.where(records_df["fraud_context"], "Yes ⚠️", "No")
+    })
+    return history_df, next_cursor
+
+@st.cache_data(ttl=QUERY_CACHE_TTL, show_spinner=False)
+def load_threshold_records(generation, bin_number):
+    """Threshold records of a BIN as plain dicts (amount, triggered, recorded_at)"""
+    return [
+        {"amount": record.amount, "triggered": record.triggered, "recorded_at": record.recorded_at}
+        for record in get_database().get_threshold_records(bin_number)
+    ]
+
 # Initialize session state
 if 'threshold_tracker' not in st.session_state:
     st.session_state.threshold_tracker = {}
 
-if 'scraped_bins' not in st.session_state:
-    st.session_state.scraped_bins = pd.DataFrame(
-        columns=['BIN', 'Country', 'Scheme', 'Issuer', 'is3DS', 'Risk Level']
-    )
-
 # App title and description
 st.title("🔒 BIN Intelligence & 3DS Enforcement Checker")
 
@@ -54,456 +222,591 @@ st.markdown("---")
 st.markdown("### 💳 Secure Payment Analysis Platform")
 st.markdown("---")
 
-# Create tabs
-tab1, tab2, tab3, tab4 = st.tabs(["BIN Checker", "URL Scraper", "Threshold Tracker", "Database History"])
+# Create tabs; where Streamlit supports it only the selected tab's code runs
+tab_labels = ["BIN Checker", "URL Scraper", "Threshold Tracker", "Database History"]
+try:
+    tab1, tab2, tab3, tab4 = st.tabs(tab_labels, key="active_tab", on_change="rerun")
+except TypeError:
+    # Older Streamlit: every tab runs on every rerun
+    tab1, tab2, tab3, tab4 = st.tabs(tab_labels)
 
 with tab1:
-    st.header("🔒 BIN & Card Analysis")
-    
-    # Input form
-    with st.form(key="bin_check_form"):
-        col1, col2 = st.columns(2)
+    if is_tab_open(tab1):
+        from bin_checker import check_bin_3ds, get_coalescing_stats
+        from bulk_checker import parse_bin_file, prepare_bins, result_to_bin_data, iter_bin_results, JSONL_SUFFIXES
         
-        with col1:
-            bin_number = st.text_input("Enter BIN or Card Number", help="Enter 6-digit BIN or full card number for analysis")
+        st.header("🔒 BIN & Card Analysis")
         
-        with col2:
-            ip_address = st.text_input("Enter IP Address (optional, leave blank to skip)", 
-                                       value="", 
-                                       help="IP address for geolocation context")
+        check_mode = st.radio("Mode", ["Single BIN", "Bulk Upload"], horizontal=True)
         
-        submit_button = st.form_submit_button(label="Check BIN")
-    
-    # Process form submission
-    if submit_button:
-        if not is_valid_bin(bin_number):
-            st.error("Please enter a valid BIN number (6 digits) or full card number (13-19 digits).")
-        elif ip_address and not is_valid_ip(ip_address):
-            st.error("Please enter a valid IP address or leave the field blank.")
-        else:
-            # Use None if IP field is empty
-            ip_to_use = ip_address if ip_address.strip() else None
-            with st.spinner("Checking BIN details..."):
-                try:
-                    result = check_bin_3ds(bin_number, ip_to_use)
-                    
-                    if result.get("error"):
-                        st.error(f"Error: {result['error']}")
-                    else:
-                        # Create two columns
-                        col1, col2 = st.columns(2)
-                        
-                        # Display basic info in first column
-                        with col1:
-                            st.subheader("Card Information")
-                            # Display the first 6 digits as BIN
-                            bin_display = bin_number[:6] if len(bin_number) > 6 else bin_number
-                            st.json({
-                                "Input": bin_number,
-                                "BIN": bin_display,
-                                "Scheme": result.get("scheme", "Unknown"),
-                                "Type": result.get("cardType", "Unknown"),
-                                "Country": result.get("country", "Unknown"),
-                                "Issuer": result.get("issuer", "Unknown"),
-                                "IP Location": result.get("ipCountry", "Unknown") if ip_to_use else "N/A"
-                            })
+        if check_mode == "Single BIN":
+            # Input form
+            with st.form(key="bin_check_form"):
+                col1, col2 = st.columns(2)
+            
+                with col1:
+                    bin_number = st.text_input("Enter BIN or Card Number", help="Enter 6-digit BIN or full card number for analysis")
+            
+                with col2:
+                    ip_address = st.text_input("Enter IP Address (optional, leave blank to skip)", 
+                                               value="", 
+                                               help="IP address for geolocation context")
+            
+                submit_button = st.form_submit_button(label="Check BIN")
+        
+            # Process form submission
+            if submit_button:
+                if not is_valid_bin(bin_number):
+                    st.error("Please enter a valid BIN number (6 digits) or full card number (13-19 digits).")
+                elif ip_address and not is_valid_ip(ip_address):
+                    st.error("Please enter a valid IP address or leave the field blank.")
+                else:
+                    # Use None if IP field is empty
+                    ip_to_use = ip_address if ip_address.strip() else None
+                    with st.spinner("Checking BIN details..."):
+                        try:
+                            result = check_bin_3ds(bin_number, ip_to_use)
                         
-                        # Display security info in second column
-                        with col2:
-                            st.subheader("Security Status")
-                            is3ds = result.get("is3DS", False)
-                            risk_level = classify_risk(is3ds, False)  # Not scraped from fraud context
-                            
-                            if is3ds:
-                                st.success("✅ 3D Secure: Enforced")
+                            if result.get("error"):
+                                st.error(f"Error: {result['error']}")
                             else:
-                                st.warning("⚠️ 3D Secure: Not Enforced")
-                            
-                            st.info(f"Risk Classification: {get_risk_icon(risk_level)} {risk_level}")
+                                # Create two columns
+                                col1, col2 = st.columns(2)
                             
-                            # Store in threshold tracker
-                            if bin_number not in st.session_state.threshold_tracker:
-                                st.session_state.threshold_tracker[bin_number] = {
-                                    "bin": bin_number,
-                                    "is3DS": is3ds,
-                                    "scheme": result.get("scheme", "Unknown"),
-                                    "issuer": result.get("issuer", "Unknown"),
-                                    "thresholds": {}
-                                }
+                                # Display basic info in first column
+                                with col1:
+                                    st.subheader("Card Information")
+                                    # Display the first 6 digits as BIN
+                                    bin_display = bin_number[:6] if len(bin_number) > 6 else bin_number
+                                    st.json({
+                                        "Input": bin_number,
+                                        "BIN": bin_display,
+                                        "Scheme": result.get("scheme", "Unknown"),
+                                        "Type": result.get("cardType", "Unknown"),
+                                        "Country": result.get("country", "Unknown"),
+                                        "Issuer": result.get("issuer", "Unknown"),
+                                        "IP Location": result.get("ipCountry", "Unknown") if ip_to_use else "N/A"
+                                    })
                             
-                            # Save to database
-                            try:
-                                # Prepare data for database
-                                bin_data = {
-                                    "BIN": bin_number,
-                                    "ip_address": ip_address,
-                                    "Scheme": result.get("scheme", "Unknown"),
-                                    "Type": result.get("cardType", "Unknown"),
-                                    "Country": result.get("country", "Unknown"),
-                                    "Issuer": result.get("issuer", "Unknown"),
-                                    "IP Location": result.get("ipCountry", "Unknown"),
-                                    "is3DS": is3ds,
-                                    "Risk Level": risk_level,
-                                    "fraud_context": False,
-                                    "raw_response": result
-                                }
+                                # Display security info in second column
+                                with col2:
+                                    st.subheader("Security Status")
+                                    is3ds = result.get("is3DS", False)
+                                    risk_level = classify_risk(is3ds, False)  # Not scraped from fraud context
                                 
-                                # Add to database
-                                db.add_bin_record(bin_data, source='manual')
-                            except Exception as e:
-                                st.error(f"Error saving to database: {str(e)}")
-                        
-                        # Display full response
-                        with st.expander("View Full API Response"):
-                            st.json(result)
+                                    if is3ds:
+                                        st.success("✅ 3D Secure: Enforced")
+                                    else:
+                                        st.warning("⚠️ 3D Secure: Not Enforced")
+                                
+                                    st.info(f"Risk Classification: {get_risk_icon(risk_level)} {risk_level}")
+                                
+                                    # Store in threshold tracker
+                                    if bin_number not in st.session_state.threshold_tracker:
+                                        st.session_state.threshold_tracker[bin_number] = {
+                                            "bin": bin_number,
+                                            "is3DS": is3ds,
+                                            "scheme": result.get("scheme", "Unknown"),
+                                            "issuer": result.get("issuer", "Unknown"),
+                                            "thresholds": {}
+                                        }
+                                
+                                    # Save to database
+                                    try:
+                                        # Prepare data for database
+                                        bin_data = result_to_bin_data(bin_number, ip_address, result)
+                                    
+                                        # Add to database
+                                        get_database().add_bin_record(bin_data, source='manual')
+                                    except Exception as e:
+                                        st.error(f"Error saving to database: {str(e)}")
                             
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
-
-with tab2:
-    st.header("🔍 BIN Scraper")
-    st.markdown("### Web Intelligence & BIN Discovery")
-    
-    st.markdown("""
-    This tool scrapes webpages for potential BIN numbers and checks their 3DS enforcement status.
-    Enter a URL to scan for 6-digit BIN numbers.
-    
-    ⚠️ **Note**: Only use this tool on websites where you have permission to scrape content.
-    """)
-    
-    # Input form
-    with st.form(key="url_scraper_form"):
-        url = st.text_input("Enter URL to scrape", 
-                            help="URL to scan for potential BIN numbers")
-        
-        ip_address = st.text_input("IP Address for 3DS Lookup (optional, leave blank to skip)", 
-                                  value="",
-                                  help="IP address used for 3DS lookups")
+                                # Display full response
+                                with st.expander("View Full API Response"):
+                                    st.json(result)
+                                
+                        except Exception as e:
+                            st.error(f"An error occurred: {str(e)}")
         
-        submit_button = st.form_submit_button(label="Scrape URL")
-    
-    # Process form submission
-    if submit_button:
-        if not is_valid_url(url):
-            st.error("Please enter a valid URL (e.g., https://example.com)")
-        elif ip_address and not is_valid_ip(ip_address):
-            st.error("Please enter a valid IP address or leave the field blank.")
         else:
-            # Use None if IP field is empty
-            ip_to_use = ip_address if ip_address.strip() else None
-            with st.spinner("Scraping URL for BINs..."):
-                try:
-                    scraped_bins = scrape_bins_from_url(url, ip_to_use)
+            import pandas as pd
+            
+            st.markdown("""
+            Upload a CSV (with a `bin` column, or BINs in the first column), a JSONL / NDJSON file
+            (one BIN or `{"bin": ..., "ip": ...}` object per line) or a JSON array of those.
+            Invalid BINs or IP addresses and duplicates are skipped before any lookups are made.
+            """)
+            
+            with st.form(key="bulk_check_form"):
+                uploaded_file = st.file_uploader(
+                    "Upload BIN file",
+                    type=["csv", "txt"] + [suffix.lstrip(".") for suffix in JSONL_SUFFIXES]
+                )
+                bulk_ip = st.text_input("Default IP Address (optional, used for rows without one)", value="")
+                bulk_submit = st.form_submit_button(label="Check All BINs")
+            
+            if bulk_submit:
+                if uploaded_file is None:
+                    st.error("Please upload a CSV or JSONL file.")
+                elif bulk_ip and not is_valid_ip(bulk_ip):
+                    st.error("Please enter a valid IP address or leave the field blank.")
+                else:
+                    pairs, invalid, duplicates = prepare_bins(
+                        parse_bin_file(uploaded_file.getvalue(), uploaded_file.name),
+                        default_ip=bulk_ip.strip() or None
+                    )
+                    st.write(f"**{len(pairs)}** unique valid BINs, {len(invalid)} invalid, {duplicates} duplicates skipped")
+                    if invalid:
+                        with st.expander("View Invalid Entries"):
+                            st.write(invalid[:1000])
                     
-                    if isinstance(scraped_bins, str):  # Error message
-                        st.error(scraped_bins)
-                    elif not scraped_bins:
-                        st.info("No BIN numbers found on the provided URL.")
-                    else:
-                        # Create DataFrame for display
-                        df = pd.DataFrame(scraped_bins)
-                        
-                        # Store in session state
-                        st.session_state.scraped_bins = pd.concat([st.session_state.scraped_bins, df], ignore_index=True)
-                        
-                        # Save to database
+                    if pairs:
+                        progress = st.progress(0.0, text="Starting lookups...")
+                        table = st.empty()
+                        rows = []
+                        pending_records = []
                         saved_count = 0
-                        for _, bin_row in df.iterrows():
-                            try:
-                                # Prepare data for database
-                                bin_data = {
-                                    "BIN": bin_row["BIN"],
-                                    "ip_address": ip_address,
-                                    "Scheme": bin_row["Scheme"],
-                                    "Country": bin_row["Country"],
-                                    "Issuer": bin_row["Issuer"],
-                                    "is3DS": bin_row["is3DS"],
-                                    "Risk Level": bin_row["Risk Level"],
-                                    "fraud_context": bin_row.get("fraud_context", False),
-                                    "raw_response": {}  # Simplified for scraped BINs
-                                }
-                                
-                                # Add to database
-                                db.add_bin_record(bin_data, source='scraper', source_url=url)
-                                saved_count += 1
-                            except Exception as e:
-                                st.error(f"Error saving BIN {bin_row['BIN']} to database: {str(e)}")
-                        
-                        # Display results
-                        st.success(f"Found {len(scraped_bins)} potential BIN numbers and saved {saved_count} to database")
-                        
-                        # Format table with colored risk levels
-                        st.write("### Scraped BINs Analysis")
+                        error_count = 0
                         
-                        # Styling function to color risk levels
-                        def highlight_risk(val):
-                            color_map = {
-                                'Enforced': 'background-color: #d4edda',  # green
-                                'Weak': 'background-color: #fff3cd',      # yellow
-                                'Unsafe': 'background-color: #f8d7da'     # red
-                            }
-                            return color_map.get(val, '')
-                        
-                        # Apply styling and display table
-                        styled_df = df.style.map(highlight_risk, subset=['Risk Level'])
-                        st.dataframe(styled_df)
+                        for done, (bin_num, ip_used, result) in enumerate(iter_bin_results(pairs), start=1):
+                            if result.get("error"):
+                                error_count += 1
+                                rows.append({"BIN": bin_num, "Risk Level": "Error", "Error": result["error"]})
+                            else:
+                                bin_data = result_to_bin_data(bin_num, ip_used, result)
+                                pending_records.append(bin_data)
+                                rows.append({
+                                    "BIN": bin_num,
+                                    "Scheme": bin_data["Scheme"],
+                                    "Type": bin_data["Type"],
+                                    "Country": bin_data["Country"],
+                                    "Issuer": bin_data["Issuer"],
+                                    "is3DS": bin_data["is3DS"],
+                                    "Risk Level": bin_data["Risk Level"],
+                                    "Error": ""
+                                })
+                            
+                            # Write to the database and refresh the UI in batches rather than per BIN
+                            if len(pending_records) >= BULK_BATCH_SIZE or done == len(pairs):
+                                try:
+                                    inserted, save_errors = get_database().add_bin_records(pending_records, source='bulk')
+                                    saved_count += inserted
+                                    for index, message in save_errors:
+                                        st.error(f"Error saving BIN {pending_records[index]['BIN']} to database: {message}")
+                                except Exception as e:
+                                    st.error(f"Error saving batch to database: {str(e)}")
+                                pending_records = []
+                            
+                            if done % BULK_BATCH_SIZE == 0 or done == len(pairs):
+                                progress.progress(done / len(pairs), text=f"Checked {done} of {len(pairs)} BINs")
+                                table.dataframe(pd.DataFrame(rows))
                         
-                        # Add BINs to threshold tracker
-                        for _, row in df.iterrows():
-                            bin_num = row['BIN']
-                            if bin_num not in st.session_state.threshold_tracker:
-                                st.session_state.threshold_tracker[bin_num] = {
-                                    "bin": bin_num,
-                                    "is3DS": row['is3DS'],
-                                    "scheme": row['Scheme'],
-                                    "issuer": row['Issuer'],
-                                    "thresholds": {}
-                                }
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
-    
-    # Display all scraped BINs
-    if not st.session_state.scraped_bins.empty:
-        with st.expander("View All Previously Scraped BINs"):
-            st.dataframe(st.session_state.scraped_bins)
+                        st.session_state.bulk_results = pd.DataFrame(rows)
+                        st.success(f"Checked {len(pairs)} BINs ({error_count} errors) and saved {saved_count} to database")
+            
+            if 'bulk_results' in st.session_state and not st.session_state.bulk_results.empty:
+                st.download_button(
+                    label="Download Results CSV",
+                    data=st.session_state.bulk_results.to_csv(index=False),
+                    file_name="bulk_bin_results.csv",
+                    mime="text/csv"
+                )
+        
+        # Lookup cache and coalescing effectiveness
+        cache_stats = get_lookup_client().stats()
+        coalescing_stats = get_coalescing_stats()
+        st.caption(
+            f"Lookup cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate) · "
+            f"{coalescing_stats['coalesced']} API calls saved by coalescing"
+        )
 
-with tab3:
-    st.header("💰 Dollar Threshold Tracker")
-    
-    st.markdown("""
-    Track whether 3DS is triggered at specific dollar thresholds for different BINs.
-    Select a BIN and enter the dollar amount to record whether 3DS was triggered.
-    """)
-    
-    if not st.session_state.threshold_tracker:
-        st.info("No BINs have been checked yet. Use the BIN Checker or URL Scraper to add BINs.")
-    else:
-        # Select BIN
-        bin_options = list(st.session_state.threshold_tracker.keys())
-        selected_bin = st.selectbox("Select BIN", bin_options)
+with tab2:
+    if is_tab_open(tab2):
+        import pandas as pd
+        from bin_scraper import scrape_bins_from_url, save_scan
+        
+        if 'scraped_bins' not in st.session_state:
+            st.session_state.scraped_bins = pd.DataFrame(
+                columns=['BIN', 'Country', 'Scheme', 'Issuer', 'is3DS', 'Risk Level']
+            )
+        
+        st.header("🔍 BIN Scraper")
+        st.markdown("### Web Intelligence & BIN Discovery")
         
-        bin_data = st.session_state.threshold_tracker[selected_bin]
+        st.markdown("""
+        This tool scrapes webpages for potential BIN numbers and checks their 3DS enforcement status.
+        Enter a URL to scan for 6-digit BIN numbers.
         
-        # Display BIN info
-        st.write(f"**Scheme:** {bin_data['scheme']}")
-        st.write(f"**Issuer:** {bin_data['issuer']}")
-        st.write(f"**3DS Enforced by default:** {'Yes ✅' if bin_data['is3DS'] else 'No ⚠️'}")
+        ⚠️ **Note**: Only use this tool on websites where you have permission to scrape content.
+        """)
         
-        # Threshold entry form
-        with st.form(key="threshold_form"):
-            col1, col2 = st.columns(2)
+        # Input form
+        with st.form(key="url_scraper_form"):
+            url = st.text_input("Enter URL to scrape", 
+                                help="URL to scan for potential BIN numbers")
             
-            with col1:
-                amount = st.number_input("Dollar Amount", min_value=0.01, step=0.01, format="%.2f")
+            ip_address = st.text_input("IP Address for 3DS Lookup (optional, leave blank to skip)", 
+                                      value="",
+                                      help="IP address used for 3DS lookups")
             
-            with col2:
-                triggered = st.radio("3DS Triggered at this amount?", ["Yes", "No"])
+            force_rescan = st.checkbox("Force full rescan",
+                                       help="Ignore the stored results of previous scans of this URL")
             
-            submit_button = st.form_submit_button(label="Record Threshold")
+            submit_button = st.form_submit_button(label="Scrape URL")
         
+        # Process form submission
         if submit_button:
-            # Store threshold data in session state
-            st.session_state.threshold_tracker[selected_bin]["thresholds"][str(amount)] = (triggered == "Yes")
-            
-            # Store threshold data in database
-            try:
-                # Add to database
-                db.add_threshold_record(
-                    bin_number=selected_bin,
-                    amount=amount,
-                    triggered=(triggered == "Yes")
-                )
-                st.success(f"Recorded: 3DS {'triggered' if triggered == 'Yes' else 'not triggered'} at ${amount:.2f} and saved to database")
-            except Exception as e:
-                st.error(f"Error saving threshold data to database: {str(e)}")
-                st.success(f"Recorded: 3DS {'triggered' if triggered == 'Yes' else 'not triggered'} at ${amount:.2f} (only in session)")
+            if not is_valid_url(url):
+                st.error("Please enter a valid URL (e.g., https://example.com)")
+            elif ip_address and not is_valid_ip(ip_address):
+                st.error("Please enter a valid IP address or leave the field blank.")
+            else:
+                # Use None if IP field is empty
+                ip_to_use = ip_address if ip_address.strip() else None
+                with st.spinner("Scraping URL for BINs..."):
+                    try:
+                        # The page is remembered for rescans only once its BINs are saved
+                        scraped_bins = scrape_bins_from_url(url, ip_to_use, use_cache=not force_rescan, store=False)
+                        
+                        if isinstance(scraped_bins, str):  # Error message
+                            st.error(scraped_bins)
+                        elif not scraped_bins:
+                            save_scan(scraped_bins)
+                            st.info("No BIN numbers found on the provided URL.")
+                        else:
+                            # Create DataFrame for display
+                            df = pd.DataFrame(scraped_bins)
+                            
+                            # Store in session state
+                            st.session_state.scraped_bins = pd.concat([st.session_state.scraped_bins, df], ignore_index=True)
+                            
+                            if scraped_bins.from_cache:
+                                # Already recorded when the page was first scanned
+                                st.info("Page unchanged since the last scan; showing the stored results")
+                            else:
+                                # Save to database in a single transaction
+                                saved_count = 0
+                                bin_data_list = [
+                                    {
+                                        "BIN": bin_row["BIN"],
+                                        "ip_address": ip_address,
+                                        "Scheme": bin_row["Scheme"],
+                                        "Country": bin_row["Country"],
+                                        "Issuer": bin_row["Issuer"],
+                                        "is3DS": bin_row["is3DS"],
+                                        "Risk Level": bin_row["Risk Level"],
+                                        "fraud_context": bin_row.get("fraud_context", False),
+                                        "raw_response": {}  # Simplified for scraped BINs
+                                    }
+                                    for bin_row in scraped_bins
+                                ]
+                                try:
+                                    saved_count, save_errors = get_database().add_bin_records(bin_data_list, source='scraper', source_url=url)
+                                    for index, message in save_errors:
+                                        st.error(f"Error saving BIN {bin_data_list[index]['BIN']} to database: {message}")
+                                    if not save_errors:
+                                        save_scan(scraped_bins)
+                                except Exception as e:
+                                    st.error(f"Error saving BINs to database: {str(e)}")
+                                
+                                # Display results
+                                st.success(f"Found {len(scraped_bins)} potential BIN numbers and saved {saved_count} to database")
+                            
+                            timings = scraped_bins.timings
+                            st.caption(
+                                f"Checked {len(scraped_bins)} of {scraped_bins.candidates} candidates "
+                                f"({scraped_bins.rejected} low-confidence skipped) · "
+                                f"fetch {timings['fetch']:.2f}s · parse {timings['parse']:.2f}s · "
+                                f"lookups {timings['lookup']:.2f}s"
+                            )
+                            
+                            # Format table with colored risk levels
+                            st.write("### Scraped BINs Analysis")
+                            
+                            # Styling function to color risk levels
+                            def highlight_risk(val):
+                                color_map = {
+                                    'Enforced': 'background-color: #d4edda',  # green
+                                    'Weak': 'background-color: #fff3cd',      # yellow
+                                    'Unsafe': 'background-color: #f8d7da'     # red
+                                }
+                                return color_map.get(val, '')
+                            
+                            # Apply styling and display table
+                            with RENDER_SECONDS.time(section="scraper"):
+                                styled_df = df.style.map(highlight_risk, subset=['Risk Level'])
+                                st.dataframe(styled_df)
+                            
+                            # Add BINs to threshold tracker
+                            for _, row in df.iterrows():
+                                bin_num = row['BIN']
+                                if bin_num not in st.session_state.threshold_tracker:
+                                    st.session_state.threshold_tracker[bin_num] = {
+                                        "bin": bin_num,
+                                        "is3DS": row['is3DS'],
+                                        "scheme": row['Scheme'],
+                                        "issuer": row['Issuer'],
+                                        "thresholds": {}
+                                    }
+                    except Exception as e:
+                        st.error(f"An error occurred: {str(e)}")
         
-        # Display threshold history
-        try:
-            # Get threshold data from database
-            db_thresholds = db.get_threshold_records(selected_bin)
+        # Display all scraped BINs
+        if not st.session_state.scraped_bins.empty:
+            with st.expander("View All Previously Scraped BINs"):
+                st.dataframe(st.session_state.scraped_bins)
+
+with tab3:
+    if is_tab_open(tab3):
+        import pandas as pd
+        
+        st.header("💰 Dollar Threshold Tracker")
+        
+        st.markdown("""
+        Track whether 3DS is triggered at specific dollar thresholds for different BINs.
+        Select a BIN and enter the dollar amount to record whether 3DS was triggered.
+        """)
+        
+        if not st.session_state.threshold_tracker:
+            st.info("No BINs have been checked yet. Use the BIN Checker or URL Scraper to add BINs.")
+        else:
+            # Select BIN
+            bin_options = list(st.session_state.threshold_tracker.keys())
+            selected_bin = st.selectbox("Select BIN", bin_options)
             
-            if db_thresholds or bin_data["thresholds"]:
-                st.write("### Threshold History")
+            bin_data = st.session_state.threshold_tracker[selected_bin]
+            
+            # Display BIN info
+            st.write(f"**Scheme:** {bin_data['scheme']}")
+            st.write(f"**Issuer:** {bin_data['issuer']}")
+            st.write(f"**3DS Enforced by default:** {'Yes ✅' if bin_data['is3DS'] else 'No ⚠️'}")
+            
+            # Threshold entry form
+            with st.form(key="threshold_form"):
+                col1, col2 = st.columns(2)
                 
-                threshold_data = []
+                with col1:
+                    amount = st.number_input("Dollar Amount", min_value=0.01, step=0.01, format="%.2f")
                 
-                # Add data from database
-                for record in db_thresholds:
-                    threshold_data.append({
-                        "Amount": f"${float(record.amount):.2f}",
-                        "3DS Triggered": "Yes ✅" if record.triggered else "No ⚠️",
-                        "Date Recorded": record.recorded_at.strftime("%Y-%m-%d %H:%M"),
-                        "Source": "Database"
-                    })
+                with col2:
+                    triggered = st.radio("3DS Triggered at this amount?", ["Yes", "No"])
                 
-                # Also add data from session (in case it hasn't been saved to DB yet)
-                for amount, triggered in bin_data["thresholds"].items():
-                    # Check if this is already in the data from DB to avoid duplicates
-                    amount_str = f"${float(amount):.2f}"
-                    if not any(d["Amount"] == amount_str for d in threshold_data):
+                submit_button = st.form_submit_button(label="Record Threshold")
+            
+            if submit_button:
+                # Store threshold data in session state
+                st.session_state.threshold_tracker[selected_bin]["thresholds"][str(amount)] = (triggered == "Yes")
+                
+                # Store threshold data in database
+                try:
+                    # Add to database
+                    get_database().add_threshold_record(
+                        bin_number=selected_bin,
+                        amount=amount,
+                        triggered=(triggered == "Yes")
+                    )
+                    st.success(f"Recorded: 3DS {'triggered' if triggered == 'Yes' else 'not triggered'} at ${amount:.2f} and saved to database")
+                except Exception as e:
+                    st.error(f"Error saving threshold data to database: {str(e)}")
+                    st.success(f"Recorded: 3DS {'triggered' if triggered == 'Yes' else 'not triggered'} at ${amount:.2f} (only in session)")
+            
+            # Display threshold history
+            try:
+                # Get threshold data from database
+                db_thresholds = load_threshold_records(get_database().get_write_generation(), selected_bin)
+                
+                if db_thresholds or bin_data["thresholds"]:
+                    st.write("### Threshold History")
+                    
+                    threshold_data = []
+                    
+                    # Add data from database
+                    for record in db_thresholds:
                         threshold_data.append({
-                            "Amount": amount_str,
-                            "3DS Triggered": "Yes ✅" if triggered else "No ⚠️",
-                            "Date Recorded": "Current Session",
-                            "Source": "Session"
+                            "Amount": f"${float(record['amount']):.2f}",
+                            "3DS Triggered": "Yes ✅" if record["triggered"] else "No ⚠️",
+                            "Date Recorded": record["recorded_at"].strftime("%Y-%m-%d %H:%M"),
+                            "Source": "Database"
                         })
+                    
+                    # Also add data from session (in case it hasn't been saved to DB yet)
+                    for amount, triggered in bin_data["thresholds"].items():
+                        # Check if this is already in the data from DB to avoid duplicates
+                        amount_str = f"${float(amount):.2f}"
+                        if not any(d["Amount"] == amount_str for d in threshold_data):
+                            threshold_data.append({
+                                "Amount": amount_str,
+                                "3DS Triggered": "Yes ✅" if triggered else "No ⚠️",
+                                "Date Recorded": "Current Session",
+                                "Source": "Session"
+                            })
+                    
+                    threshold_df = pd.DataFrame(threshold_data)
+                    if not threshold_df.empty:
+                        threshold_df = threshold_df.sort_values(by="Amount")
+                        st.table(threshold_df)
+                else:
+                    st.info("No threshold data recorded for this BIN yet.")
+            except Exception as e:
+                st.error(f"Error retrieving threshold data: {str(e)}")
                 
-                threshold_df = pd.DataFrame(threshold_data)
-                if not threshold_df.empty:
+                # Fallback to session state if database access fails
+                if bin_data["thresholds"]:
+                    st.write("### Threshold History (Session Only)")
+                    
+                    threshold_data = []
+                    for amount, triggered in bin_data["thresholds"].items():
+                        threshold_data.append({
+                            "Amount": f"${float(amount):.2f}",
+                            "3DS Triggered": "Yes ✅" if triggered else "No ⚠️"
+                        })
+                    
+                    threshold_df = pd.DataFrame(threshold_data)
                     threshold_df = threshold_df.sort_values(by="Amount")
                     st.table(threshold_df)
-            else:
-                st.info("No threshold data recorded for this BIN yet.")
-        except Exception as e:
-            st.error(f"Error retrieving threshold data: {str(e)}")
-            
-            # Fallback to session state if database access fails
-            if bin_data["thresholds"]:
-                st.write("### Threshold History (Session Only)")
-                
-                threshold_data = []
-                for amount, triggered in bin_data["thresholds"].items():
-                    threshold_data.append({
-                        "Amount": f"${float(amount):.2f}",
-                        "3DS Triggered": "Yes ✅" if triggered else "No ⚠️"
-                    })
-                
-                threshold_df = pd.DataFrame(threshold_data)
-                threshold_df = threshold_df.sort_values(by="Amount")
-                st.table(threshold_df)
-            else:
-                st.info("No threshold data recorded for this BIN yet.")
+                else:
+                    st.info("No threshold data recorded for this BIN yet.")
 
 # Database History Tab
 with tab4:
-    st.header("📊 Database History")
-    
-    st.markdown("""
-    View all BIN records stored in the database. This shows the history of all BINs checked or scraped.
-    """)
-    
-    # Fetch records from database
-    try:
-        records = db.get_bin_records(limit=100)
+    if is_tab_open(tab4):
+        st.header("📊 Database History")
         
-        if records:
-            # Convert records to DataFrame for display
-            bin_records = []
-            for record in records:
-                # Try to parse raw_response to get more details
-                raw_data = {}
-                try:
-                    if record.raw_response:
-                        raw_data = json.loads(record.raw_response)
-                except:
-                    pass
-                
-                bin_records.append({
-                    "BIN": record.bin_number,
-                    "Date": record.checked_at.strftime("%Y-%m-%d %H:%M"),
-                    "Scheme": record.scheme,
-                    "Type": record.card_type or raw_data.get("cardType", "Unknown"),
-                    "Country": record.country,
-                    "IP/Location": record.ip_country or raw_data.get("ipCountry", "Unknown"),
-                    "Issuer": record.issuer,
-                    "3DS": "Yes ✅" if record.is_3ds else "No ⚠️",
-                    "Risk Level": record.risk_level,
-                    "Source": record.source,
-                    "IP Address": record.ip_address,
-                    "URL": record.source_url if record.source == 'scraper' else "N/A",
-                    "Fraud Context": "Yes ⚠️" if record.fraud_context else "No"
-                })
+        st.markdown("""
+        View all BIN records stored in the database. This shows the history of all BINs checked or scraped.
+        """)
+        
+        # Fetch records from database
+        try:
+            generation = get_database().get_write_generation()
             
-            # Create DataFrame
-            bin_df = pd.DataFrame(bin_records)
+            history_stats = load_history_stats(generation, HISTORY_DAYS)
+            if history_stats["total"]:
+                with st.expander(f"📈 Summary of all {history_stats['total']:,} records", expanded=True):
+                    with RENDER_SECONDS.time(section="summary"):
+                        render_history_summary(history_stats)
+            
+            filter_options = load_filter_options(generation)
             
             # Display filter options
             col1, col2, col3 = st.columns(3)
             with col1:
                 scheme_filter = st.multiselect(
                     "Filter by Scheme",
-                    options=sorted([x for x in bin_df["Scheme"].unique() if str(x) != "nan"]),
+                    options=filter_options["schemes"],
                     default=[]
                 )
             
             with col2:
                 risk_filter = st.multiselect(
                     "Filter by Risk Level",
-                    options=sorted([x for x in bin_df["Risk Level"].unique() if str(x) != "nan"]),
+                    options=filter_options["risk_levels"],
                     default=[]
                 )
                 
             with col3:
                 country_filter = st.multiselect(
                     "Filter by Country",
-                    options=sorted([x for x in bin_df["Country"].unique() if str(x) != "nan" and x != "Unknown"]),
+                    options=[x for x in filter_options["countries"] if x != "Unknown"],
                     default=[]
                 )
             
-            # Search by BIN
-            bin_search = st.text_input("Search by BIN", 
-                                      placeholder="Enter full or partial BIN number")
-            
-            # Apply filters
-            filtered_df = bin_df.copy()
-            
-            if scheme_filter:
-                filtered_df = filtered_df[filtered_df["Scheme"].isin(scheme_filter)]
-            if risk_filter:
-                filtered_df = filtered_df[filtered_df["Risk Level"].isin(risk_filter)]
-            if country_filter:
-                filtered_df = filtered_df[filtered_df["Country"].isin(country_filter)]
-            if bin_search:
-                filtered_df = filtered_df[filtered_df["BIN"].str.contains(bin_search, na=False)]
-            
-            # Display data
-            st.write(f"### Showing {len(filtered_df)} of {len(bin_df)} BIN Records")
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                # Search by BIN
+                bin_search = st.text_input("Search by BIN", 
+                                          placeholder="Enter full BIN number or its first digits")
+            with col2:
+                page_size = st.selectbox("Records per page", [50, 100, 250, 500], index=1)
             
-            # Columns to display
-            default_columns = ["BIN", "Scheme", "Type", "Country", "Issuer", "3DS", "Risk Level"]
+            bin_search = bin_search.strip()
             
-            # Option to see all columns
-            show_all_cols = st.checkbox("Show All Card Details", value=False)
+            # Start again from the newest records whenever the filters change
+            filter_key = (tuple(scheme_filter), tuple(risk_filter), tuple(country_filter), bin_search, page_size)
+            if st.session_state.get('history_filter_key') != filter_key:
+                st.session_state.history_filter_key = filter_key
+                st.session_state.history_cursors = [None]
             
-            display_df = filtered_df if show_all_cols else filtered_df[default_columns]
+            filtered_df, next_cursor = load_history_page(
+                generation,
+                tuple(scheme_filter),
+                tuple(risk_filter),
+                tuple(country_filter),
+                bin_search,
+                page_size,
+                st.session_state.history_cursors[-1]
+            )
             
-            # Display with highlighting
-            def highlight_3ds(val):
-                if val == "Yes ✅":
-                    return 'background-color: #d4edda'  # green
-                elif val == "No ⚠️":
-                    return 'background-color: #fff3cd'  # yellow
-                return ''
+            if not filtered_df.empty:
+                # Display data
+                page_number = len(st.session_state.history_cursors)
+                st.write(f"### Page {page_number}: Showing {len(filtered_df)} BIN Records")
                 
-            def highlight_risk(val):
-                if val == "Enforced":
-                    return 'background-color: #d4edda'  # green
-                elif val == "Weak":
-                    return 'background-color: #fff3cd'  # yellow
-                elif val == "Unsafe":
-                    return 'background-color: #f8d7da'  # red
-                return ''
-            
-            # Apply styling
-            styled_df = display_df.style.map(highlight_3ds, subset=['3DS'] if '3DS' in display_df.columns else [])
-            styled_df = styled_df.map(highlight_risk, subset=['Risk Level'] if 'Risk Level' in display_df.columns else [])
-            
-            st.dataframe(styled_df)
-            
-            # Export option
-            if st.button("Export to CSV"):
-                csv = filtered_df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="bin_records.csv",
-                    mime="text/csv"
-                )
-        else:
-            st.info("No BIN records found in the database.")
-    except Exception as e:
-        st.error(f"Error retrieving database records: {str(e)}")
+                # Columns to display
+                default_columns = ["BIN", "Scheme", "Type", "Country", "Issuer", "3DS", "Risk Level"]
+                
+                # Option to see all columns
+                show_all_cols = st.checkbox("Show All Card Details", value=False)
+                
+                display_df = filtered_df if show_all_cols else filtered_df[default_columns]
+                
+                # Display with highlighting
+                def highlight_3ds(val):
+                    if val == "Yes ✅":
+                        return 'background-color: #d4edda'  # green
+                    elif val == "No ⚠️":
+                        return 'background-color: #fff3cd'  # yellow
+                    return ''
+                    
+                def highlight_risk(val):
+                    if val == "Enforced":
+                        return 'background-color: #d4edda'  # green
+                    elif val == "Weak":
+                        return 'background-color: #fff3cd'  # yellow
+                    elif val == "Unsafe":
+                        return 'background-color: #f8d7da'  # red
+                    return ''
+                
+                # Apply styling
+                with RENDER_SECONDS.time(section="history"):
+                    styled_df = display_df.style.map(highlight_3ds, subset=['3DS'] if '3DS' in display_df.columns else [])
+                    styled_df = styled_df.map(highlight_risk, subset=['Risk Level'] if 'Risk Level' in display_df.columns else [])
+                    
+                    st.dataframe(styled_df)
+                
+                # Page navigation
+                def show_previous_page():
+                    st.session_state.history_cursors.pop()
+                
+                def show_next_page(cursor):
+                    st.session_state.history_cursors.append(cursor)
+                
+                col1, col2, _ = st.columns([1, 1, 4])
+                with col1:
+                    st.button("⬅️ Newer", on_click=show_previous_page, disabled=page_number == 1)
+                with col2:
+                    st.button("Older ➡️", on_click=show_next_page, args=(next_cursor,), disabled=next_cursor is None)
+                
+                # Export option
+                if st.button("Export to CSV"):
+                    csv = filtered_df.to_csv(index=False)
+                    st.download_button(
+                        label="Download CSV",
+                        data=csv,
+                        file_name="bin_records.csv",
+                        mime="text/csv"
+                    )
+            else:
+                st.info("No BIN records found in the database.")
+        except Exception as e:
+            st.error(f"Error retrieving database records: {str(e)}")
+
+# Diagnostics, when metrics collection is on (BIN_METRICS=1)
+if metrics.enabled():
+    start_metrics_server()
+    with st.expander("Diagnostics"):
+        render_diagnostics()
 
 # Footer
 st.markdown("---")
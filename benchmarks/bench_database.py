@@ -0,0 +1,46 @@
+"""
+bin_records writes and reads at 10k and 1M rows (BIN_BENCH_DB_ROWS).
+"""
+
+import random
+
+import pytest
+
+from conftest import DB_ROW_COUNTS, make_bin_data
+
+@pytest.mark.benchmark(group="db-write")
+@pytest.mark.parametrize("rows", DB_ROW_COUNTS)
+def test_add_bin_record(benchmark, database_of, rows):
+    db = database_of(rows)
+    rng = random.Random(rows)
+    benchmark(lambda: db.add_bin_record(make_bin_data(rng.randrange(rows), rng), source='manual'))
+
+@pytest.mark.benchmark(group="db-write")
+@pytest.mark.parametrize("rows", DB_ROW_COUNTS)
+def test_add_bin_records_batch(benchmark, database_of, rows):
+    db = database_of(rows)
+    rng = random.Random(rows)
+    batch = [make_bin_data(i, rng) for i in range(100)]
+    inserted, errors = benchmark(db.add_bin_records, batch, source='bulk')
+    assert inserted == len(batch) and not errors
+
+@pytest.mark.benchmark(group="db-read")
+@pytest.mark.parametrize("rows", DB_ROW_COUNTS)
+def test_get_bin_records(benchmark, database_of, rows):
+    db = database_of(rows)
+    records = benchmark(db.get_bin_records, 100)
+    assert len(records) == 100
+
+@pytest.mark.benchmark(group="db-read")
+@pytest.mark.parametrize("rows", DB_ROW_COUNTS)
+def test_load_bin_records_frame_filtered(benchmark, database_of, rows):
+    db = database_of(rows)
+    frame, _ = benchmark(db.load_bin_records_frame, schemes=["VISA"], risk_levels=["Unsafe"], limit=100)
+    assert len(frame) == 100
+
+@pytest.mark.benchmark(group="db-read")
+@pytest.mark.parametrize("rows", DB_ROW_COUNTS)
+def test_get_bin_stats(benchmark, database_of, rows):
+    db = database_of(rows)
+    stats = benchmark(db.get_bin_stats, days=30)
+    assert stats["total"] >= rows
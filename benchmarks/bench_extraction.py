@@ -0,0 +1,32 @@
+"""
+BIN extraction and fraud context scoring on synthetic pages from 10KB to 10MB.
+"""
+
+import pytest
+
+from bin_scraper import CHUNK_SIZE, extract_bins_streaming, is_fraud_context
+from conftest import PAGE_SIZES
+
+URL = "https://forum.example.com/threads/fresh-dumps"
+
+def _rounds(label):
+    # Keep the 10MB runs to a handful of rounds
+    return 20 if PAGE_SIZES[label] < 1024 * 1024 else 3
+
+def _chunks(page):
+    return [page[i:i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE)]
+
+@pytest.mark.benchmark(group="extraction")
+@pytest.mark.parametrize("label", list(PAGE_SIZES))
+def test_extract_bins_streaming(benchmark, pages, label):
+    chunks = _chunks(pages[label])
+    candidates, keyword_counts = benchmark.pedantic(
+        extract_bins_streaming, args=(chunks, "utf-8"), rounds=_rounds(label), iterations=1
+    )
+    assert candidates and keyword_counts
+
+@pytest.mark.benchmark(group="fraud-context")
+@pytest.mark.parametrize("label", list(PAGE_SIZES))
+def test_is_fraud_context(benchmark, pages, label):
+    text = pages[label].decode("utf-8")
+    assert benchmark.pedantic(is_fraud_context, args=(URL, text), rounds=_rounds(label), iterations=1)
@@ -0,0 +1,96 @@
+"""
+file_scanner throughput on generated log files (BIN_BENCH_SCAN_MB).
+
+Two profiles bound the range: "sparse" is a typical export, full of
+timestamps, IPs and short IDs but with a card number on about one line in
+two thousand; "dense" has a 12-16 digit ID on most lines and a card number
+or BIN on one in ten, so nearly every line reaches candidate scoring. Each
+run records GB/s in extra_info, so it is saved with the timings.
+"""
+
+import os
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import file_scanner
+
+# Size of each generated log, e.g. BIN_BENCH_SCAN_MB=256 for a longer run
+SCAN_MB = int(os.environ.get('BIN_BENCH_SCAN_MB', 32))
+
+STAMP = "2026-10-{d:02d}T{h:02d}:{m:02d}:{s:02d}Z "
+FILLER = {
+    "sparse": [
+        STAMP + "order={n9} ticket={n7} ip=10.{o}.{o}.{o} amount={n4}.{n2}\n",
+        STAMP + "GET /api/orders/{n7} status=200 bytes={n6} took={n2}ms\n",
+    ],
+    "dense": [
+        STAMP + "order={n9} ticket={n7} ip=10.{o}.{o}.{o} amount={n4}.{n2}\n",
+        STAMP + "session {n9}{n7} status=200 bytes={n6} ref {n12}\n",
+    ],
+}
+CARD_LINES = [
+    STAMP + "payment card {card} approved txn {n9}\n",
+    STAMP + "customer paid with {grouped} exp 09/27\n",
+    STAMP + "bin {bin} issuer lookup for order {n9}\n",
+]
+CARD_SHARE = {"sparse": 0.0005, "dense": 0.1}
+
+def _luhn(body):
+    total = 0
+    for i, digit in enumerate(reversed(body)):
+        value = int(digit) * (2 if i % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return body + str((10 - total % 10) % 10)
+
+def make_log(size, rng, profile):
+    """Synthetic log export of size bytes in the given profile (see module docstring)"""
+    cards = [_luhn(prefix + "".join(rng.choice("0123456789") for _ in range(15 - len(prefix))))
+             for prefix in ("4147", "5500", "6011", "4111")]
+
+    # 4MB of distinct lines, repeated to size
+    lines = []
+    length = 0
+    while length < min(size, 4 * 1024 * 1024):
+        card = rng.choice(cards)
+        templates = CARD_LINES if rng.random() < CARD_SHARE[profile] else FILLER[profile]
+        line = rng.choice(templates).format(
+            d=rng.randint(1, 28), h=rng.randint(0, 23), m=rng.randint(0, 59), s=rng.randint(0, 59),
+            n2=rng.randint(10, 99), n4=rng.randint(1000, 9999), n6=rng.randint(10 ** 5, 10 ** 6 - 1),
+            n7=rng.randint(10 ** 6, 10 ** 7 - 1), n9=rng.randint(10 ** 8, 10 ** 9 - 1),
+            n12=rng.randint(10 ** 11, 10 ** 12 - 1), o=rng.randint(0, 255), card=card,
+            grouped=" ".join(card[i:i + 4] for i in range(0, 16, 4)), bin=card[:6],
+        )
+        lines.append(line)
+        length += len(line)
+    block = "".join(lines).encode("ascii")
+    return (block * (size // len(block) + 1))[:size]
+
+@pytest.fixture(scope="session")
+def scan_files(tmp_path_factory, rng):
+    """Generated log path per profile"""
+    directory = tmp_path_factory.mktemp("scan")
+    paths = {}
+    for profile in FILLER:
+        path = directory / f"{profile}.log"
+        path.write_bytes(make_log(SCAN_MB * 1024 * 1024, rng, profile))
+        paths[profile] = str(path)
+    return paths
+
+@pytest.mark.benchmark(group="file-scan")
+@pytest.mark.parametrize("include_bins", [False, True], ids=["cards", "cards+bins"])
+@pytest.mark.parametrize("profile", list(FILLER))
+@pytest.mark.parametrize("workers", sorted({1, os.cpu_count() or 1}))
+def test_scan_paths(benchmark, scan_files, workers, profile, include_bins):
+    report = benchmark.pedantic(
+        file_scanner.scan_paths, args=([scan_files[profile]],),
+        kwargs={"workers": workers, "span_bytes": 8 * 1024 * 1024, "include_bins": include_bins},
+        rounds=3, iterations=1, warmup_rounds=1,
+    )
+    assert report["findings"]
+
+    benchmark.extra_info["bytes"] = report["bytes"]
+    benchmark.extra_info["findings"] = len(report["findings"])
+    benchmark.extra_info["gb_per_s"] = round(report["bytes"] / benchmark.stats.stats.mean / 1e9, 3)
@@ -0,0 +1,48 @@
+"""
+3DS lookups against a local stub of the 3ds-lookup API with injected latency.
+"""
+
+import asyncio
+
+import pytest
+
+import bin_checker
+
+# Seconds the stub waits before answering
+LATENCIES = [0.0, 0.02]
+
+@pytest.fixture
+def api(stub_api, monkeypatch):
+    """Point bin_checker at the stub server"""
+    monkeypatch.setattr(bin_checker, "API_BASE_URL", stub_api.url)
+    yield stub_api
+    stub_api.latency = 0.0
+
+@pytest.mark.benchmark(group="lookup")
+@pytest.mark.parametrize("latency", LATENCIES)
+def test_check_bin_3ds_uncached(benchmark, api, latency):
+    api.latency = latency
+    result = benchmark(bin_checker.check_bin_3ds, "411111", use_cache=False)
+    assert result["is3DS"] is True
+
+@pytest.mark.benchmark(group="lookup")
+def test_check_bin_3ds_cache_hit(benchmark, api):
+    api.latency = 0.02
+    bin_checker.check_bin_3ds("411111", "203.0.113.7")
+    result = benchmark(bin_checker.check_bin_3ds, "411111", "203.0.113.7")
+    assert result["is3DS"] is True
+
+@pytest.mark.benchmark(group="lookup-many")
+@pytest.mark.parametrize("latency", LATENCIES)
+def test_check_bins_3ds_many(benchmark, api, latency):
+    api.latency = latency
+    pairs = [(str(400000 + i), None) for i in range(100)]
+
+    async def check_all():
+        return [
+            result async for _, _, result in
+            bin_checker.check_bins_3ds_many(pairs, concurrency=8, use_cache=False)
+        ]
+
+    results = benchmark.pedantic(lambda: asyncio.run(check_all()), rounds=5, iterations=1, warmup_rounds=1)
+    assert all(result.get("is3DS") for result in results)
@@ -0,0 +1,254 @@
+"""
+Load test for the lookup service (service.py).
+
+Starts a local stand-in for the 3ds-lookup API with injected latency, runs
+service.py against it in a separate process (scratch database, no rate
+limit), and drives it from concurrent keep-alive clients. Reports request
+and lookup throughput, p50/p99 latency, and the service's cache and
+micro-batching counters.
+
+Lookups are drawn from a pool of --distinct BINs, so a smaller pool means
+more cache hits and more duplicate lookups for the batcher to merge.
+
+Usage:
+    python benchmarks/bench_service.py --clients 32 --requests 5000 --latency 0.02
+    python benchmarks/bench_service.py --batch 50 --requests 500 --json service.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_PATH = os.path.join(REPO_ROOT, 'service.py')
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """Answers every GET like the 3ds-lookup API, after the server's injected latency"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.server.calls += 1
+        body = json.dumps({
+            "scheme": "VISA", "cardType": "CREDIT", "country": "US",
+            "issuer": "Stub Bank", "is3DS": True,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_api(latency):
+    """
+    Run the stub API on a free port in a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: With .url, .latency and a .calls counter
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.calls = 0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_service(api_url, workers, batch_wait_ms, scratch_dir):
+    """
+    Start service.py in a child process and wait until it answers /health.
+
+    Returns:
+        tuple: (Popen, port)
+    """
+    port = free_port()
+    env = dict(
+        os.environ,
+        BIN_API_BASE_URL=api_url,
+        BIN_API_RATE_LIMIT='0',
+        BIN_DB_URL='sqlite:///' + os.path.join(scratch_dir, 'service.db'),
+        BIN_HTTP_POOL_SIZE=str(max(workers, 20)),
+    )
+    process = subprocess.Popen(
+        [sys.executable, SERVICE_PATH, '--port', str(port), '--workers', str(workers),
+         '--batch-wait-ms', str(batch_wait_ms)],
+        env=env, cwd=scratch_dir, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            request("127.0.0.1", port, "GET", "/health")
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"service exited with status {process.returncode}")
+            time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError("service did not start within 30s")
+
+def request(host, port, method, path, body=None, connection=None):
+    """One JSON request; reuses `connection` when given. Returns (status, payload)"""
+    conn = connection or http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        conn.request(method, path, body=data, headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        if connection is None:
+            conn.close()
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def run(clients=16, requests=2000, batch=1, distinct=1000, latency=0.02, workers=8, batch_wait_ms=2.0,
+        seed=20261016):
+    """
+    Run the load test.
+
+    Args:
+        clients (int): Concurrent client connections
+        requests (int): Total requests sent
+        batch (int): BINs per request; 1 uses GET /lookup, more use POST /batch
+        distinct (int): Size of the BIN pool requests draw from
+        latency (float): Seconds the stub API waits before answering
+        workers (int): Service lookup workers
+        batch_wait_ms (float): Service micro-batch collection window
+        seed (int): Seed for the BIN pool and request mix
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), errors, upstream calls and the service's /stats
+    """
+    rng = random.Random(seed)
+    pool = [str(rng.randint(400000, 599999)) for _ in range(distinct)]
+    plans = [[rng.choice(pool) for _ in range(batch)] for _ in range(requests)]
+
+    api = start_stub_api(latency)
+    scratch = tempfile.TemporaryDirectory(prefix="bin-service-bench-")
+    process, port = start_service(api.url, workers, batch_wait_ms, scratch.name)
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    next_plan = iter(plans)
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        samples = []
+        failed = 0
+        while True:
+            with lock:
+                bins = next(next_plan, None)
+            if bins is None:
+                break
+            started = time.perf_counter()
+            try:
+                if batch == 1:
+                    status, payload = request("127.0.0.1", port, "GET", f"/lookup?bin={bins[0]}", connection=conn)
+                    ok = status == 200
+                else:
+                    status, payload = request("127.0.0.1", port, "POST", "/batch", {"bins": bins}, connection=conn)
+                    ok = status == 200 and not any("error" in r for r in payload["results"])
+            except (OSError, http.client.HTTPException, ValueError):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                ok = False
+            samples.append(time.perf_counter() - started)
+            failed += not ok
+        conn.close()
+        with lock:
+            latencies.extend(samples)
+            errors[0] += failed
+
+    try:
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        _, stats = request("127.0.0.1", port, "GET", "/stats")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        api.shutdown()
+        scratch.cleanup()
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": requests,
+        "batch": batch,
+        "distinct": distinct,
+        "api_latency_ms": latency * 1000,
+        "seconds": elapsed,
+        "requests_per_s": requests / elapsed,
+        "lookups_per_s": requests * batch / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors[0],
+        "upstream_calls": api.calls,
+        "service": stats,
+    }
+
+def main(argv=None):
+    """Run the service load test and print a summary"""
+    parser = argparse.ArgumentParser(description="Load test the BIN lookup service against a stub API")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent client connections")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests")
+    parser.add_argument("--batch", type=int, default=1, help="BINs per request (>1 uses POST /batch)")
+    parser.add_argument("--distinct", type=int, default=1000, help="Distinct BINs requests draw from")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub API latency in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="Service lookup workers")
+    parser.add_argument("--batch-wait-ms", type=float, default=2.0, help="Service micro-batch window")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.clients, args.requests, args.batch, args.distinct, args.latency, args.workers,
+                 args.batch_wait_ms)
+
+    batching = report["service"]["batching"]
+    print(f"{report['requests']} requests x {report['batch']} BINs from {report['clients']} clients in "
+          f"{report['seconds']:.2f}s: {report['requests_per_s']:.0f} req/s, "
+          f"{report['lookups_per_s']:.0f} lookups/s, p50 {report['p50_ms']:.1f}ms, "
+          f"p99 {report['p99_ms']:.1f}ms, {report['errors']} errors")
+    print(f"Upstream calls {report['upstream_calls']}, cache hit rate "
+          f"{report['service']['cache']['hit_rate']:.0%}, mean micro-batch "
+          f"{batching['mean_batch_size']:.1f}, {batching['deduplicated']} duplicate lookups merged")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
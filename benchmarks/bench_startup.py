@@ -0,0 +1,165 @@
+"""
+Cold start benchmark for the Streamlit app.
+
+Renders app.py once in fresh interpreters started with `python -X importtime`
+(through Streamlit's AppTest, so no server or browser is needed) and reports,
+for the first render:
+
+- import time: the summed self time of every module first imported during it
+- render time: wall-clock time of the whole first script run
+- which of LAZY_MODULES it loaded
+
+The run fails (exit status 1) if the median import or render time exceeds
+its budget, or if any of LAZY_MODULES is imported, since those belong to
+tabs that are not open on first render.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --json startup.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, 'app.py')
+
+# Heavy dependencies of the scraper, threshold and history tabs
+LAZY_MODULES = ('pandas', 'numpy', 'sqlalchemy', 'bs4', 'trafilatura')
+
+DEFAULT_MAX_IMPORT_MS = float(os.environ.get('BIN_BENCH_MAX_IMPORT_MS', 400))
+DEFAULT_MAX_RENDER_MS = float(os.environ.get('BIN_BENCH_MAX_RENDER_MS', 1200))
+
+# Runs in the child interpreter: render the app once and print what it loaded
+DRIVER = """
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+before = set(sys.modules)
+started = time.perf_counter()
+app.run()
+render_s = time.perf_counter() - started
+
+print(json.dumps({
+    "render_s": render_s,
+    "new_modules": sorted(set(sys.modules) - before),
+    "exceptions": [str(e.value) for e in app.exception],
+}))
+"""
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output.
+
+    Args:
+        stderr (str): The interpreter's stderr
+
+    Returns:
+        dict: Module name -> self import time in microseconds
+    """
+    self_us = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        self_us[fields[2].strip()] = int(fields[0])
+    return self_us
+
+def measure_once(db_url):
+    """
+    Render the app once in a fresh interpreter.
+
+    Args:
+        db_url (str): BIN_DB_URL for the child, so the benchmark never touches real data
+
+    Returns:
+        dict: import_ms, render_ms and lazy_loaded for this run
+    """
+    env = dict(os.environ, BIN_DB_URL=db_url, PYTHONPATH=REPO_ROOT)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', DRIVER, APP_PATH],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"App render failed:\n{completed.stderr[-2000:]}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result["exceptions"]:
+        raise RuntimeError(f"App raised during render: {result['exceptions']}")
+
+    self_us = parse_importtime(completed.stderr)
+    new_modules = set(result["new_modules"])
+    return {
+        "import_ms": sum(us for module, us in self_us.items() if module in new_modules) / 1000,
+        "render_ms": result["render_s"] * 1000,
+        "lazy_loaded": sorted(new_modules.intersection(LAZY_MODULES)),
+    }
+
+def run(runs=5, max_import_ms=DEFAULT_MAX_IMPORT_MS, max_render_ms=DEFAULT_MAX_RENDER_MS):
+    """
+    Measure cold start over several runs and check it against the budgets.
+
+    Args:
+        runs (int): Fresh interpreters to start
+        max_import_ms (float): Budget for the median first-render import time
+        max_render_ms (float): Budget for the median first-render time
+
+    Returns:
+        dict: Per-run samples, medians, budgets and a list of failures (empty if it passed)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        samples = [measure_once(db_url) for _ in range(runs)]
+
+    report = {
+        "runs": samples,
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "render_ms": statistics.median(s["render_ms"] for s in samples),
+        "lazy_loaded": sorted({module for s in samples for module in s["lazy_loaded"]}),
+        "max_import_ms": max_import_ms,
+        "max_render_ms": max_render_ms,
+        "failures": [],
+    }
+
+    if report["import_ms"] > max_import_ms:
+        report["failures"].append(f"import time {report['import_ms']:.0f}ms exceeds {max_import_ms:.0f}ms")
+    if report["render_ms"] > max_render_ms:
+        report["failures"].append(f"first render {report['render_ms']:.0f}ms exceeds {max_render_ms:.0f}ms")
+    if report["lazy_loaded"]:
+        report["failures"].append(f"first render imported {', '.join(report['lazy_loaded'])}")
+
+    return report
+
+def main(argv=None):
+    """Run the cold start benchmark and fail if it is over budget"""
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--max-import-ms", type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help="Budget for the median first-render import time")
+    parser.add_argument("--max-render-ms", type=float, default=DEFAULT_MAX_RENDER_MS,
+                        help="Budget for the median first-render time")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs, args.max_import_ms, args.max_render_ms)
+
+    print(f"First render: {report['render_ms']:.0f}ms (budget {report['max_render_ms']:.0f}ms), "
+          f"imports {report['import_ms']:.0f}ms (budget {report['max_import_ms']:.0f}ms), "
+          f"median of {args.runs} runs")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    for failure in report["failures"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
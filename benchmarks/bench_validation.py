@@ -0,0 +1,59 @@
+"""
+Input validation and risk classification over large batches.
+"""
+
+import pytest
+
+from utils import classify_risk, is_valid_bin, is_valid_url
+
+BATCH_SIZE = 100000
+
+@pytest.fixture(scope="module")
+def bin_inputs(rng):
+    """BINs, full card numbers and junk in equal measure"""
+    inputs = []
+    for i in range(BATCH_SIZE):
+        kind = i % 3
+        if kind == 0:
+            inputs.append(str(rng.randint(100000, 999999)))
+        elif kind == 1:
+            inputs.append(str(rng.randint(10 ** 15, 10 ** 16 - 1)))
+        else:
+            inputs.append(rng.choice(("", "12345", "4111-1111", "abcdef", "4" * 25)))
+    return inputs
+
+@pytest.fixture(scope="module")
+def url_inputs(rng):
+    """Valid and invalid URLs"""
+    templates = (
+        "https://shop{n}.example.com/cart?item={n}",
+        "http://192.168.{a}.{b}:8080/path/{n}",
+        "https://localhost/{n}",
+        "ftp://files{n}.example.org/",
+        "not a url {n}",
+        "https://" + "sub." * 20 + "example.com/{n}",
+    )
+    return [
+        rng.choice(templates).format(n=i, a=i % 256, b=(i * 7) % 256)
+        for i in range(BATCH_SIZE)
+    ]
+
+@pytest.fixture(scope="module")
+def risk_inputs(rng):
+    """(is_3ds, fraud_context) pairs"""
+    return [(rng.random() < 0.5, rng.random() < 0.2) for _ in range(BATCH_SIZE)]
+
+@pytest.mark.benchmark(group="validation")
+def test_is_valid_bin(benchmark, bin_inputs):
+    valid = benchmark(lambda: sum(1 for value in bin_inputs if is_valid_bin(value)))
+    assert 0 < valid < len(bin_inputs)
+
+@pytest.mark.benchmark(group="validation")
+def test_is_valid_url(benchmark, url_inputs):
+    valid = benchmark(lambda: sum(1 for value in url_inputs if is_valid_url(value)))
+    assert 0 < valid < len(url_inputs)
+
+@pytest.mark.benchmark(group="validation")
+def test_classify_risk(benchmark, risk_inputs):
+    levels = benchmark(lambda: [classify_risk(is_3ds, fraud) for is_3ds, fraud in risk_inputs])
+    assert set(levels) == {"Enforced", "Weak", "Unsafe"}
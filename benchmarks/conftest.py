@@ -0,0 +1,164 @@
+"""
+Shared fixtures for the benchmark suite.
+
+Every benchmark runs against a scratch SQLite database in a temporary
+directory; BIN_DB_URL is pointed there before any application module is
+imported, so a benchmark run never touches bins_database.db.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+_scratch_dir = tempfile.TemporaryDirectory(prefix="bin-bench-")
+os.environ['BIN_DB_URL'] = 'sqlite:///' + os.path.join(_scratch_dir.name, 'default.db')
+# Lookups go to the stub server below: no SQLite cache tier, no API rate limit
+os.environ.setdefault('BIN_CACHE_PERSISTENT', '0')
+os.environ.setdefault('BIN_API_RATE_LIMIT', '0')
+
+# Row counts for the database benchmarks, e.g. BIN_BENCH_DB_ROWS=10000 for a quick run
+DB_ROW_COUNTS = [int(n) for n in os.environ.get('BIN_BENCH_DB_ROWS', '10000,1000000').split(',')]
+
+# Synthetic page sizes for the extraction benchmarks
+PAGE_SIZES = {"10KB": 10 * 1024, "100KB": 100 * 1024, "1MB": 1024 * 1024, "10MB": 10 * 1024 * 1024}
+
+SCHEMES = ("VISA", "MASTERCARD", "AMERICAN EXPRESS", "DISCOVER")
+RISK_LEVELS = ("Enforced", "Weak", "Unsafe")
+COUNTRIES = ("US", "GB", "DE", "FR", "BR", "IN")
+
+def make_bin_data(index, rng):
+    """A bin_records row in the shape add_bin_record(s) accepts"""
+    is_3ds = rng.random() < 0.5
+    return {
+        "BIN": str(400000 + index % 600000),
+        "ip_address": "",
+        "Scheme": rng.choice(SCHEMES),
+        "Type": "CREDIT",
+        "Country": rng.choice(COUNTRIES),
+        "Issuer": f"Bank {index % 97}",
+        "is3DS": is_3ds,
+        "Risk Level": rng.choice(RISK_LEVELS),
+        "fraud_context": False,
+        "raw_response": {"scheme": "VISA", "is3DS": is_3ds},
+    }
+
+@pytest.fixture(scope="session")
+def rng():
+    """Seeded random generator so inputs are identical between runs"""
+    return random.Random(20261016)
+
+@pytest.fixture(scope="session")
+def database_of(tmp_path_factory):
+    """
+    Build (once per size) a scratch database holding n bin_records rows.
+
+    Returns:
+        callable: n -> database module with its engine bound to that database
+    """
+    import database
+
+    paths = {}
+
+    def build(rows):
+        if rows not in paths:
+            path = tmp_path_factory.mktemp("db") / f"bins_{rows}.db"
+            database.configure_engine(f"sqlite:///{path}")
+            database.init_db()
+
+            rng = random.Random(rows)
+            batch = 10000
+            for start in range(0, rows, batch):
+                database.add_bin_records(
+                    [make_bin_data(i, rng) for i in range(start, min(start + batch, rows))],
+                    source='bulk'
+                )
+            paths[rows] = path
+
+        database.configure_engine(f"sqlite:///{paths[rows]}")
+        database.init_db()
+        return database
+
+    return build
+
+def make_page(size, rng):
+    """
+    Synthetic HTML page of about size bytes: filler text with card numbers,
+    BINs with and without card wording, order IDs and fraud keywords mixed in.
+    """
+    snippets = [
+        "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>",
+        "<p>Order #{n6} shipped to zip {n5}.</p>",
+        "<li>BIN {bin} visa credit card, cvv fresh</li>",
+        "<td>4111 1111 1111 1111</td><td>{n2}/{n2}</td>",
+        "<p>dumps and fullz for sale, carding tutorial</p>",
+        "<script>var x = {n8};</script>",
+        "<div>Call us on {n6}{n2} for bank card support</div>",
+    ]
+    parts = ["<html><head><title>bench</title></head><body>"]
+    length = len(parts[0])
+    while length < size:
+        snippet = rng.choice(snippets).format(
+            n2=rng.randint(10, 99), n5=rng.randint(10000, 99999), n6=rng.randint(100000, 999999),
+            n8=rng.randint(10000000, 99999999), bin=rng.choice(("411111", "520000", "601100", "371449"))
+        )
+        parts.append(snippet)
+        length += len(snippet)
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+@pytest.fixture(scope="session")
+def pages(rng):
+    """Synthetic pages keyed by PAGE_SIZES label"""
+    return {label: make_page(size, rng) for label, size in PAGE_SIZES.items()}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET like the 3ds-lookup API, after the server's injected latency"""
+
+    # Keep-alive, like the real API, so the pooled session reuses connections;
+    # headers and body go out in separate writes, so don't let Nagle hold them
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = json.dumps({
+            "scheme": "VISA", "cardType": "CREDIT", "country": "US",
+            "issuer": "Bench Bank", "is3DS": True,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="session")
+def stub_api():
+    """
+    Local stand-in for the 3ds-lookup API.
+
+    Returns:
+        ThreadingHTTPServer: Set .latency (seconds) to inject delay; .url is its base URL
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.latency = 0.0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
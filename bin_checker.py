@@ -1,18 +1,131 @@
 import os
-import requests
+import copy
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+import metrics
+from cache import LookupCache
+from rate_limiter import get_rate_limiter
+from singleflight import SingleFlight
+from bin_ranges import get_bin_range_index
 
-def check_bin_3ds(bin_number, ip_address=None):
+# Override to point lookups at a different deployment (or a local stub)
+API_BASE_URL = os.environ.get('BIN_API_BASE_URL', 'https://3ds-lookup.p.rapidapi.com').rstrip('/')
+
+# Number of lookups check_bins_3ds_many keeps in flight by default
+DEFAULT_CONCURRENCY = int(os.environ.get('BIN_LOOKUP_CONCURRENCY', 8))
+
+_lookup_cache = None
+
+# Coalesces concurrent upstream lookups for the same (BIN, IP)
+_in_flight = SingleFlight()
+
+LOOKUPS = metrics.counter("bin_lookups_total", "3DS lookups by outcome (cache_hit, api, coalesced, error)")
+API_RESPONSES = metrics.counter("bin_api_responses_total", "3ds-lookup API responses by HTTP status (or 'exception')")
+
+def get_lookup_cache():
+    """
+    Get the process-wide lookup cache, creating it on first use.
+    
+    Returns:
+        LookupCache: The shared cache instance
+    """
+    global _lookup_cache
+    if _lookup_cache is None:
+        _lookup_cache = LookupCache()
+    return _lookup_cache
+
+def get_coalescing_stats():
+    """
+    Report how many upstream calls were saved by coalescing concurrent lookups.
+    
+    Returns:
+        dict: 'executed' upstream calls, 'coalesced' (saved) calls and keys 'in_flight'
+    """
+    return _in_flight.stats()
+
+def lookup_bin_metadata(bin_number, index=None):
+    """
+    Answer scheme, country, issuer and card type from the offline BIN range index.
+    
+    No network call is made; use check_bin_3ds when the 3DS flag is needed.
+    
+    Args:
+        bin_number (str): BIN (6-8 digits) or full card number
+        index (BinRangeIndex, optional): Index to use instead of the one configured by BIN_RANGE_INDEX
+        
+    Returns:
+        dict: scheme, country, issuer and cardType, or None if the index has no answer
+    """
+    index = index if index is not None else get_bin_range_index()
+    if index is None:
+        return None
+    return index.lookup(bin_number)
+
+@metrics.timed("bin_lookup_seconds", "check_bin_3ds latency, cache hits included")
+def check_bin_3ds(bin_number, ip_address=None, use_cache=True, rate_limiter=None):
     """
     Check the 3DS status of a BIN or full card number using the 3ds-lookup RapidAPI.
     
+    Successful responses are cached per (BIN, IP) pair; errors are never cached.
+    Concurrent calls for the same pair share a single upstream request, and
+    calls that reach the API are throttled by the shared token bucket.
+    
     Args:
         bin_number (str): Card number (can be 6-digit BIN or full card number)
         ip_address (str, optional): IP address for geolocation context
+        use_cache (bool): Whether to serve and store results via the lookup cache
+        rate_limiter (TokenBucket, optional): Limiter to use instead of the shared one
         
     Returns:
         dict: Response from the API containing 3DS information
     """
+    cache = get_lookup_cache() if use_cache else None
+    
+    if cache is not None:
+        cached = cache.get(bin_number, ip_address)
+        if cached is not None:
+            LOOKUPS.inc(outcome="cache_hit")
+            return cached
+    
+    (result, outcome), shared = _in_flight.do(
+        (bin_number, ip_address), _lookup_upstream, bin_number, ip_address, cache, rate_limiter
+    )
+    
+    if "error" in result:
+        LOOKUPS.inc(outcome="error")
+    else:
+        LOOKUPS.inc(outcome="coalesced" if shared else outcome)
+    
+    # Followers get their own deep copy so one caller can't mutate another's result
+    return copy.deepcopy(result) if shared else result
+
+def _lookup_upstream(bin_number, ip_address, cache, rate_limiter):
+    """
+    Rate-limit, call the API and populate the cache; run once per in-flight key.
+    
+    Returns:
+        tuple: (result, outcome) with outcome 'api', or 'cache_hit' if an
+        earlier lookup stored the answer after the caller's cache check
+    """
+    if cache is not None:
+        # The previous leader for this key may have finished since the caller missed
+        cached = cache.get(bin_number, ip_address, count_miss=False)
+        if cached is not None:
+            return cached, "cache_hit"
+    
+    (rate_limiter or get_rate_limiter()).acquire()
+    result = _fetch_3ds(bin_number, ip_address)
+    
+    if cache is not None and "error" not in result:
+        cache.set(bin_number, ip_address, result)
+    
+    return result, "api"
+
+@metrics.timed("bin_api_request_seconds", "3ds-lookup API round trip")
+def _fetch_3ds(bin_number, ip_address=None):
+    """Call the 3ds-lookup API without consulting the cache"""
     # Generate a sample full card number from the BIN if it's just 6 digits
     # This is necessary because the API works with full card numbers, not just BINs
     card_number = bin_number
@@ -20,12 +133,13 @@ def check_bin_3ds(bin_number, ip_address=None):
         # Append zeros to make it look like a full card number
         card_number = bin_number + "0000000000"
     
-    # If IP is provided, use binip endpoint, otherwise use cards endpoint
+    # If IP is provided, use binip endpoint, otherwise use cards endpoint.
+    # Values go through params so requests encodes them into the query.
     if ip_address:
-        url = f"https://3ds-lookup.p.rapidapi.com/binip/?bin={bin_number}&ip={ip_address}"
+        url, params = f"{API_BASE_URL}/binip/", {"bin": bin_number, "ip": ip_address}
     else:
         # Use cards endpoint per the API example
-        url = f"https://3ds-lookup.p.rapidapi.com/cards/?num={card_number}"
+        url, params = f"{API_BASE_URL}/cards/", {"num": card_number}
     
     headers = {
         "X-RapidAPI-Key": "8683a24fbdmsh4ad4a4745be87d5p1e2a9ejsnf80157137a5c",
@@ -33,7 +147,8 @@ def check_bin_3ds(bin_number, ip_address=None):
     }
     
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers, params=params)
+        API_RESPONSES.inc(status=str(response.status_code))
         
         # Check if the request was successful
         if response.status_code == 200:
@@ -43,6 +158,87 @@ def check_bin_3ds(bin_number, ip_address=None):
                 "error": f"API request failed with status code {response.status_code}: {response.text}"
             }
     except Exception as e:
+        API_RESPONSES.inc(status="exception")
         return {
             "error": f"Request failed: {str(e)}"
         }
+
+def _lookup_cache_metrics():
+    # Nothing to report until the first lookup creates the cache
+    if _lookup_cache is None:
+        return []
+    stats = _lookup_cache.stats()
+    return [({"tier": tier}, stats[key]) for tier, key in (("memory", "memory_hits"), ("db", "db_hits"))]
+
+def _lookup_cache_misses():
+    return [({}, _lookup_cache.stats()["misses"])] if _lookup_cache is not None else []
+
+def _lookup_cache_hit_ratio():
+    return [({}, _lookup_cache.stats()["hit_rate"])] if _lookup_cache is not None else []
+
+def _coalescing_metrics():
+    stats = _in_flight.stats()
+    return [({"result": "executed"}, stats["executed"]), ({"result": "coalesced"}, stats["coalesced"])]
+
+metrics.register_callback("bin_lookup_cache_hits_total", "Lookup cache hits by tier", "counter", _lookup_cache_metrics)
+metrics.register_callback("bin_lookup_cache_misses_total", "Lookup cache misses", "counter", _lookup_cache_misses)
+metrics.register_callback("bin_lookup_cache_hit_ratio", "Share of cached lookups served from either tier", "gauge",
+                          _lookup_cache_hit_ratio)
+metrics.register_callback("bin_lookup_upstream_calls_total", "Upstream lookups executed vs. saved by coalescing",
+                          "counter", _coalescing_metrics)
+
+async def check_bins_3ds_many(pairs, concurrency=DEFAULT_CONCURRENCY, rate_limiter=None, use_cache=True):
+    """
+    Look up many BINs concurrently, yielding results as they complete.
+    
+    The input is consumed lazily, so at most `concurrency` lookups are in
+    flight and arbitrarily large iterables can be streamed through.
+    
+    Args:
+        pairs (iterable): (bin_number, ip_address) tuples; ip_address may be None
+        concurrency (int): Maximum number of lookups in flight
+        rate_limiter (TokenBucket, optional): Limiter to use instead of the shared one
+        use_cache (bool): Whether to serve and store results via the lookup cache
+        
+    Yields:
+        tuple: (bin_number, ip_address, result) where result has the same
+        shape as the dict returned by check_bin_3ds
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bin-lookup")
+    pending = {}
+    pairs = iter(pairs)
+    
+    def submit(bin_number, ip_address):
+        future = loop.run_in_executor(
+            executor, check_bin_3ds, bin_number, ip_address, use_cache, rate_limiter
+        )
+        pending[future] = (bin_number, ip_address)
+    
+    try:
+        for bin_number, ip_address in pairs:
+            submit(bin_number, ip_address)
+            if len(pending) >= concurrency:
+                break
+        
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            
+            for future in done:
+                bin_number, ip_address = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": f"Request failed: {str(e)}"}
+                
+                # Refill before yielding so the pool stays busy while the caller works
+                for next_bin, next_ip in pairs:
+                    submit(next_bin, next_ip)
+                    break
+                
+                yield bin_number, ip_address, result
+    
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,317 @@
+"""
+Offline BIN range index for metadata lookups (scheme, country, issuer,
+card type) that don't need the 3DS API.
+
+Ranges are normalised to 8-digit keys and flattened into disjoint,
+sorted segments (the narrowest source range wins where ranges nest), so
+a lookup is one bisect over a flat array. The index can be saved to a
+compact binary file and memory-mapped, letting many processes share one
+copy through the OS page cache.
+"""
+
+import os
+import sys
+import csv
+import json
+import mmap
+import heapq
+import struct
+import argparse
+import threading
+from array import array
+from bisect import bisect_right
+
+KEY_DIGITS = 8
+MAGIC = b"BINRIDX1"
+BYTE_ORDER_MARK = 0x01020304
+# magic, byte order mark, segment count, metadata table length in bytes
+HEADER = struct.Struct("=8sIII")
+
+METADATA_FIELDS = ("scheme", "country", "issuer", "cardType")
+
+# Accepted column / key names for each field in range files
+FIELD_ALIASES = {
+    "start": ("start", "bin_start", "range_start", "low"),
+    "end": ("end", "bin_end", "range_end", "high"),
+    "bin": ("bin", "bin_number", "prefix", "iin"),
+    "scheme": ("scheme", "brand", "network"),
+    "country": ("country", "country_name"),
+    "issuer": ("issuer", "bank", "bank_name"),
+    "cardType": ("cardtype", "card_type", "type"),
+}
+
+# Path to a prebuilt index file used by get_bin_range_index()
+DEFAULT_INDEX_PATH = os.environ.get('BIN_RANGE_INDEX')
+
+_default_index = None
+_default_lock = threading.Lock()
+
+def _key(digits, fill):
+    """Turn a BIN prefix into an 8-digit integer key, padding with the fill digit"""
+    digits = "".join(ch for ch in str(digits) if ch.isdigit())[:KEY_DIGITS]
+    if not digits:
+        raise ValueError("BIN range bounds must contain digits")
+    return int(digits.ljust(KEY_DIGITS, fill))
+
+class BinRangeIndex:
+    """
+    Sorted, array-backed interval index from BIN ranges to metadata.
+
+    Build one with from_ranges / from_csv / from_json / from_database, or
+    open a saved one with load(). Instances are read-only and thread-safe.
+    """
+
+    def __init__(self, starts, ends, meta_ids, metadata, _mmap=None):
+        self._starts = starts
+        self._ends = ends
+        self._meta_ids = meta_ids
+        self._metadata = metadata
+        self._mmap = _mmap
+
+    def __len__(self):
+        return len(self._starts)
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """
+        Build an index from (start, end, metadata) tuples.
+
+        start and end are BIN prefixes of up to 8 digits; a shorter start is
+        padded with 0s and a shorter end with 9s, so ("4", "4") covers every
+        BIN beginning with 4. Where ranges overlap the narrowest one wins.
+
+        Args:
+            ranges (iterable): (start, end, metadata dict) tuples
+
+        Returns:
+            BinRangeIndex: The built index
+        """
+        metadata = []
+        meta_lookup = {}
+        spans = []
+
+        for order, (start, end, meta) in enumerate(ranges):
+            low, high = _key(start, "0"), _key(end, "9")
+            if high < low:
+                continue
+            meta = {field: meta.get(field) or "Unknown" for field in METADATA_FIELDS}
+            frozen = tuple(meta[field] for field in METADATA_FIELDS)
+            if frozen not in meta_lookup:
+                meta_lookup[frozen] = len(metadata)
+                metadata.append(meta)
+            # Later ranges of equal width override earlier ones
+            spans.append((low, high, meta_lookup[frozen], order))
+
+        starts, ends, meta_ids = array("I"), array("I"), array("I")
+
+        # Sweep over every boundary, keeping the narrowest active range on top of a heap
+        boundaries = sorted({s[0] for s in spans} | {s[1] + 1 for s in spans})
+        spans.sort()
+        active = []
+        next_span = 0
+
+        for point, next_point in zip(boundaries, boundaries[1:]):
+            while next_span < len(spans) and spans[next_span][0] <= point:
+                low, high, meta_id, order = spans[next_span]
+                heapq.heappush(active, (high - low, -order, high, meta_id))
+                next_span += 1
+            while active and active[0][2] < point:
+                heapq.heappop(active)
+            if not active:
+                continue
+
+            meta_id = active[0][3]
+            if ends and ends[-1] == point - 1 and meta_ids[-1] == meta_id:
+                ends[-1] = next_point - 1  # extend the previous segment
+            else:
+                starts.append(point)
+                ends.append(next_point - 1)
+                meta_ids.append(meta_id)
+
+        return cls(starts, ends, meta_ids, metadata)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build an index from dict records with either start/end or bin keys.
+
+        Args:
+            records (iterable): Dicts using any of the FIELD_ALIASES names
+
+        Returns:
+            BinRangeIndex: The built index
+        """
+        def pick(record, field):
+            for alias in FIELD_ALIASES[field]:
+                if record.get(alias) not in (None, ""):
+                    return record[alias]
+            return None
+
+        def ranges():
+            for record in records:
+                record = {str(k).strip().lower(): v for k, v in record.items()}
+                start = pick(record, "start") or pick(record, "bin")
+                end = pick(record, "end") or start
+                if start is None:
+                    continue
+                yield start, end, {field: pick(record, field) for field in METADATA_FIELDS}
+
+        return cls.from_ranges(ranges())
+
+    @classmethod
+    def from_csv(cls, path):
+        """Build an index from a CSV range file with a header row"""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(csv.DictReader(f))
+
+    @classmethod
+    def from_json(cls, path):
+        """Build an index from a JSON array or JSONL range file"""
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        stripped = text.lstrip()
+        if stripped.startswith("["):
+            records = json.loads(text)
+        else:
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return cls.from_records(records)
+
+    @classmethod
+    def from_database(cls):
+        """
+        Build an index from the latest known metadata of every BIN in bin_metadata.
+
+        Returns:
+            BinRangeIndex: The built index
+        """
+        import database as db
+
+        # Creates bin_metadata, filled from bin_records, on databases that predate it
+        db.init_db()
+        return cls.from_ranges(
+            (prefix, prefix, meta) for prefix, meta in db.get_latest_bin_metadata()
+        )
+
+    def lookup(self, bin_number):
+        """
+        Look up metadata for a BIN or card number.
+
+        6- and 7-digit inputs cover many 8-digit keys; they only resolve if
+        every segment in that span carries the same metadata.
+
+        Args:
+            bin_number (str): BIN (6-8 digits) or full card number
+
+        Returns:
+            dict: scheme, country, issuer and cardType, or None if unknown
+        """
+        digits = "".join(ch for ch in str(bin_number) if ch.isdigit())[:KEY_DIGITS]
+        if len(digits) < 6:
+            return None
+
+        low, high = int(digits.ljust(KEY_DIGITS, "0")), int(digits.ljust(KEY_DIGITS, "9"))
+        starts, ends = self._starts, self._ends
+
+        i = bisect_right(starts, low) - 1
+        if i < 0 or ends[i] < low:
+            return None
+
+        meta_id = self._meta_ids[i]
+        # Walk forward over the (usually zero) further segments in a short-BIN span
+        while ends[i] < high:
+            i += 1
+            if i >= len(starts) or starts[i] != ends[i - 1] + 1 or self._meta_ids[i] != meta_id:
+                return None
+
+        return dict(self._metadata[meta_id])
+
+    def save(self, path):
+        """
+        Write the index to a binary file that load() can memory-map.
+
+        Args:
+            path (str): Destination file path
+        """
+        meta_bytes = json.dumps(self._metadata, separators=(",", ":")).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, len(self), len(meta_bytes)))
+            for column in (self._starts, self._ends, self._meta_ids):
+                f.write(memoryview(column).cast("B"))
+            f.write(meta_bytes)
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """
+        Open a saved index.
+
+        Args:
+            path (str): Index file written by save()
+            use_mmap (bool): Map the file instead of reading it into memory
+
+        Returns:
+            BinRangeIndex: The loaded index
+        """
+        with open(path, "rb") as f:
+            if use_mmap:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+        magic, mark, count, meta_length = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a BIN range index")
+        if mark != BYTE_ORDER_MARK:
+            raise ValueError(f"{path} was written on a platform with a different byte order")
+
+        view = memoryview(buffer)
+        width = count * array("I").itemsize
+        offset = HEADER.size
+        columns = []
+        for _ in range(3):
+            columns.append(view[offset:offset + width].cast("I"))
+            offset += width
+        metadata = json.loads(bytes(view[offset:offset + meta_length]).decode("utf-8"))
+
+        return cls(*columns, metadata, _mmap=buffer if use_mmap else None)
+
+def get_bin_range_index():
+    """
+    Get the process-wide index loaded from BIN_RANGE_INDEX, if configured.
+
+    Returns:
+        BinRangeIndex: The shared index, or None when no index file is configured
+    """
+    global _default_index
+    if _default_index is None and DEFAULT_INDEX_PATH and os.path.exists(DEFAULT_INDEX_PATH):
+        with _default_lock:
+            if _default_index is None:
+                _default_index = BinRangeIndex.load(DEFAULT_INDEX_PATH)
+    return _default_index
+
+def main(argv=None):
+    """Build a BIN range index file from a range file or from the history table"""
+    parser = argparse.ArgumentParser(description="Build an offline BIN range index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV range file with a header row")
+    source.add_argument("--json", help="JSON array or JSONL range file")
+    source.add_argument("--from-db", action="store_true", help="Use the latest metadata in bin_metadata")
+    parser.add_argument("-o", "--output", required=True, help="Index file to write")
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        index = BinRangeIndex.from_csv(args.csv)
+    elif args.json:
+        index = BinRangeIndex.from_json(args.json)
+    else:
+        index = BinRangeIndex.from_database()
+
+    index.save(args.output)
+    print(f"Wrote {len(index)} segments to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
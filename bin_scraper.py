@@ -1,114 +1,432 @@
-import re
-import requests
-from bs4 import BeautifulSoup
-from bin_checker import check_bin_3ds
+import os
+import json
+import time
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+import http_client
+import metrics
+from bin_checker import check_bin_3ds, DEFAULT_CONCURRENCY
+from keyword_matcher import KeywordMatcher
+from candidates import CandidateExtractor
+from streaming import iter_page_text
 from utils import classify_risk, is_valid_url
 
-def scrape_bins_from_url(url, ip_address=None):
+# Pages are downloaded in chunks and truncated at this size
+MAX_PAGE_BYTES = int(os.environ.get('BIN_SCRAPER_MAX_BYTES', 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+# Most BINs checked per page, and how many of those lookups run at once
+MAX_LOOKUPS = int(os.environ.get('BIN_SCRAPER_MAX_LOOKUPS', 15))
+LOOKUP_WORKERS = int(os.environ.get('BIN_SCRAPER_WORKERS', DEFAULT_CONCURRENCY))
+
+# Candidates scoring below this are never sent to the 3DS API (see candidates.py)
+MIN_CONFIDENCE = float(os.environ.get('BIN_SCRAPER_MIN_CONFIDENCE', 0.6))
+
+# Keywords used to judge whether a page looks fraud-related; override with
+# a JSON file named by BIN_FRAUD_KEYWORDS (see load_fraud_keywords)
+DEFAULT_FRAUD_KEYWORDS = {
+    # Suspicious terms in the URL
+    "url_terms": [
+        'pastebin', 'darkweb', 'hack', 'crack', 'carding', 'cvv',
+        'dumps', 'fraud', 'stolen', 'breach', 'leak'
+    ],
+    # Any one of these in the page text is suspicious
+    "content_terms": [
+        'cvv', 'fullz', 'dumps', 'cashout', 'carding', 'fraud',
+        'stolen credit card', 'hacked', 'leaked', 'unauthorized',
+        'darknet', 'darkweb', 'carder', 'skimmer'
+    ],
+    # Credit card related terms; a high total count is suspicious
+    "card_terms": ['card', 'credit', 'debit', 'visa', 'mastercard', 'amex', 'bin', 'cvv', 'exp'],
+    "card_term_threshold": 15,
+}
+
+SCRAPES = metrics.counter("bin_scrape_pages_total", "Scraped pages by outcome (scanned, unchanged, error)")
+SCRAPE_PHASES = metrics.histogram("bin_scrape_phase_seconds", "Time per scrape phase (fetch, parse, lookup, total)")
+SCRAPE_CANDIDATES = metrics.counter("bin_scrape_candidates_total",
+                                    "BIN candidates found while scraping, by whether they were confident enough to check")
+
+class ScrapeResult(list):
+    """
+    List of BIN result dicts from one scraped page.
+    
+    Attributes:
+        timings (dict): Seconds spent fetching, parsing and looking up BINs, and in total
+        candidates (int): Number of high-confidence BIN candidates found on the page
+        rejected (int): Number of low-confidence candidates that were not looked up
+        from_cache (bool): True if the page was unchanged and these are the stored results
+        scan (dict): What save_scan stores for conditional rescans, or None if
+            this scan shouldn't be stored (stored results, failed lookups)
+    """
+    
+    def __init__(self, results=(), timings=None, candidates=0, rejected=0, from_cache=False, scan=None):
+        super().__init__(results)
+        self.timings = timings or {}
+        self.candidates = candidates
+        self.rejected = rejected
+        self.from_cache = from_cache
+        self.scan = scan
+
+def _observe_scrape(func):
+    """Record outcome, candidate counts and per-phase timings of each scrape"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        if not metrics.enabled():
+            return result
+        
+        # Failures come back as messages rather than exceptions
+        if not isinstance(result, ScrapeResult):
+            SCRAPES.inc(outcome="error")
+            return result
+        
+        SCRAPES.inc(outcome="unchanged" if result.from_cache else "scanned")
+        if not result.from_cache:
+            SCRAPE_CANDIDATES.inc(result.candidates, status="checked")
+            SCRAPE_CANDIDATES.inc(result.rejected, status="rejected")
+        for phase, seconds in result.timings.items():
+            SCRAPE_PHASES.observe(seconds, phase=phase)
+        return result
+    
+    return wrapper
+
+@_observe_scrape
+def scrape_bins_from_url(url, ip_address=None, max_lookups=None, workers=None, min_confidence=None,
+                         use_cache=True, store=True):
     """
     Scrape a URL for potential BIN numbers and check their 3DS status.
     
+    Only candidates scoring at least min_confidence (Luhn-valid card
+    numbers, or IIN-range BINs with card wording nearby) are checked, best
+    first. They are looked up concurrently on a bounded thread pool; every
+    call still goes through check_bin_3ds, so the shared cache and rate
+    limiter apply. Results keep the candidate ranking order.
+    
+    Rescans of a URL are conditional: the stored ETag / Last-Modified are
+    sent, and on a 304 or a download whose content hash matches the last
+    scan the stored results are returned without parsing or API calls.
+    A stored scan made with a different max_lookups or min_confidence is
+    not reused.
+    
+    Callers that record the results themselves should pass store=False
+    and call save_scan(result) once the records are saved, so an
+    unchanged page is never reported as already recorded when it wasn't.
+    
     Args:
         url (str): URL to scrape
         ip_address (str, optional): IP address to use for 3DS lookups, can be None
+        max_lookups (int, optional): Maximum BINs to check, defaults to BIN_SCRAPER_MAX_LOOKUPS
+        workers (int, optional): Concurrent lookups, defaults to BIN_SCRAPER_WORKERS
+        min_confidence (float, optional): Candidate score threshold, defaults to BIN_SCRAPER_MIN_CONFIDENCE
+        use_cache (bool): Whether to reuse and store results of previous scans of the URL
+        store (bool): Store this scan right away (with use_cache); False leaves it in result.scan for save_scan
         
     Returns:
-        list: List of dictionaries containing BIN information
+        ScrapeResult: List of dictionaries containing BIN information, with timings
     """
     if not is_valid_url(url):
         return "Invalid URL format. Please provide a valid URL."
     
+    max_lookups = MAX_LOOKUPS if max_lookups is None else max_lookups
+    workers = LOOKUP_WORKERS if workers is None else workers
+    min_confidence = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    timings = {"fetch": 0.0, "parse": 0.0, "lookup": 0.0}
+    started = time.perf_counter()
+    
     try:
+        stored = _get_stored_page(url, ip_address) if use_cache else None
+        if stored is not None and (stored["max_lookups"], stored["min_confidence"]) != (max_lookups, min_confidence):
+            stored = None  # results depend on the settings; rescan in full
+        
         # Make request to the URL
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            return f"Failed to access URL. Status code: {response.status_code}"
+        if stored is not None:
+            if stored["etag"]:
+                headers['If-None-Match'] = stored["etag"]
+            if stored["last_modified"]:
+                headers['If-Modified-Since'] = stored["last_modified"]
         
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        response = http_client.get(url, headers=headers, stream=True)
+        timings["fetch"] = time.perf_counter() - started
         
-        # Extract all text content
-        text_content = soup.get_text()
-        
-        # Find all potential BIN numbers (6 digits)
-        bin_pattern = r'\b\d{6}\b'
-        potential_bins = set(re.findall(bin_pattern, text_content))
+        try:
+            if stored is not None and response.status_code == 304:
+                return _stored_result(stored, timings, started)
+            
+            if response.status_code != 200:
+                return f"Failed to access URL. Status code: {response.status_code}"
+            
+            stream_started = time.perf_counter()
+            digest = hashlib.sha256()
+            chunks = iter_limited(_timed(response.iter_content(CHUNK_SIZE), timings, "fetch"), MAX_PAGE_BYTES)
+            
+            if stored is not None:
+                # Download before parsing so an unchanged page is never parsed
+                chunks = list(_hashed(chunks, digest))
+                if digest.hexdigest() == stored["content_hash"]:
+                    return _stored_result(stored, timings, started)
+            else:
+                chunks = _hashed(chunks, digest)
+            
+            ranked, keyword_counts = extract_bins_streaming(chunks, response.encoding)
+            # Time not spent waiting on the network went to tokenizing and matching
+            body_wait = timings["fetch"] - (stream_started - started)
+            timings["parse"] = time.perf_counter() - stream_started - body_wait
+            validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        finally:
+            response.close()
         
-        if not potential_bins:
-            return []
+        confident = [c["bin"] for c in ranked if c["confidence"] >= min_confidence]
+        candidates = confident[:max(0, max_lookups)]
+        results = ScrapeResult(timings=timings, candidates=len(confident),
+                               rejected=len(ranked) - len(confident))
         
-        # Check each BIN (limit to 15 to avoid excessive API calls)
-        results = []
-        for bin_number in list(potential_bins)[:15]:
-            result = check_bin_3ds(bin_number, ip_address)
-            
-            # Skip if the API call failed
-            if "error" in result:
-                continue
-                
-            # Determine if this is from a potentially fraudulent context
-            fraud_context = is_fraud_context(url, text_content)
+        failed = 0
+        if candidates:
+            # Determine once per page if this is from a potentially fraudulent context
+            fraud_context = get_fraud_scorer().score(url, keyword_counts)["fraud_context"]
             
-            # Classify risk level
-            risk_level = classify_risk(result.get("is3DS", False), fraud_context)
+            lookup_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(candidates))),
+                                    thread_name_prefix="scrape-lookup") as executor:
+                # map() yields in submission order, keeping results deterministic
+                lookups = list(executor.map(lambda bin_number: check_bin_3ds(bin_number, ip_address), candidates))
+            timings["lookup"] = time.perf_counter() - lookup_started
             
-            bin_data = {
-                "BIN": bin_number,
-                "Country": result.get("country", "Unknown"),
-                "Scheme": result.get("scheme", "Unknown"),
-                "Issuer": result.get("issuer", "Unknown"),
-                "is3DS": result.get("is3DS", False),
-                "Risk Level": risk_level
+            for bin_number, result in zip(candidates, lookups):
+                # Skip if the API call failed
+                if "error" in result:
+                    failed += 1
+                    continue
+                
+                # Classify risk level
+                risk_level = classify_risk(result.get("is3DS", False), fraud_context)
+                
+                results.append({
+                    "BIN": bin_number,
+                    "Country": result.get("country", "Unknown"),
+                    "Scheme": result.get("scheme", "Unknown"),
+                    "Issuer": result.get("issuer", "Unknown"),
+                    "is3DS": result.get("is3DS", False),
+                    "Risk Level": risk_level
+                })
+        
+        # A failed lookup would otherwise stay missing until the page changes
+        if use_cache and not failed:
+            results.scan = {
+                "url": url,
+                "ip_address": ip_address,
+                "etag": validators[0],
+                "last_modified": validators[1],
+                "content_hash": digest.hexdigest(),
+                "candidates": results.candidates,
+                "rejected": results.rejected,
+                "max_lookups": max_lookups,
+                "min_confidence": min_confidence,
             }
-            
-            results.append(bin_data)
+            if store:
+                save_scan(results)
         
+        timings["total"] = time.perf_counter() - started
         return results
     
     except Exception as e:
         return f"Error scraping URL: {str(e)}"
 
-def is_fraud_context(url, content):
+def _get_stored_page(url, ip_address):
+    """Load the last scan of a URL, treating database errors as a cache miss"""
+    try:
+        db.init_db()
+        return db.get_scraped_page(url, ip_address)
+    except Exception:
+        return None
+
+def save_scan(result):
     """
-    Simple heuristic to determine if the context might be related to fraud.
+    Remember a scan for conditional rescans of its URL
+    
+    Failing to store it never raises; the next scan is then a full one.
     
     Args:
-        url (str): URL of the scraped content
-        content (str): Text content from the page
+        result (ScrapeResult): Result of scrape_bins_from_url(..., store=False)
         
     Returns:
-        bool: True if the context appears to be related to fraud
+        bool: True if the scan was stored
     """
-    # Check URL for suspicious terms
-    suspicious_domains = [
-        'pastebin', 'darkweb', 'hack', 'crack', 'carding', 'cvv',
-        'dumps', 'fraud', 'stolen', 'breach', 'leak'
-    ]
-    
-    if any(term in url.lower() for term in suspicious_domains):
+    scan = getattr(result, "scan", None)
+    if scan is None:
+        return False
+    try:
+        db.save_scraped_page(results=list(result), **scan)
         return True
+    except Exception:
+        return False
+
+def _stored_result(stored, timings, started):
+    timings["total"] = time.perf_counter() - started
+    results = stored["results"]
+    candidates = stored["candidates"] if stored["candidates"] is not None else len(results)
+    return ScrapeResult(results, timings=timings, candidates=candidates, rejected=stored["rejected"] or 0,
+                        from_cache=True)
+
+def _hashed(chunks, digest):
+    """Pass chunks through, feeding each one to digest"""
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+def _timed(chunks, timings, key):
+    """Pass chunks through, adding the time spent waiting for each one to timings[key]"""
+    chunks = iter(chunks)
+    while True:
+        waited = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            timings[key] += time.perf_counter() - waited
+        yield chunk
+
+def iter_limited(chunks, max_bytes):
+    """
+    Pass byte chunks through until max_bytes have been yielded.
     
-    # Check content for suspicious terms
-    suspicious_terms = [
-        'cvv', 'fullz', 'dumps', 'cashout', 'carding', 'fraud',
-        'stolen credit card', 'hacked', 'leaked', 'unauthorized',
-        'darknet', 'darkweb', 'carder', 'skimmer'
-    ]
+    Args:
+        chunks (iterable): Byte chunks
+        max_bytes (int): Size cap; the chunk that crosses it is truncated
+        
+    Yields:
+        bytes: Chunks totalling at most max_bytes
+    """
+    remaining = max_bytes
+    for chunk in chunks:
+        if len(chunk) >= remaining:
+            yield chunk[:remaining]
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+def extract_bins_streaming(chunks, encoding=None):
+    """
+    Extract ranked BIN candidates from streamed HTML without building a document tree.
     
-    content_lower = content.lower()
-    if any(term in content_lower for term in suspicious_terms):
-        return True
+    Text is tokenized incrementally (script and style content is skipped)
+    and candidates are matched over a sliding window, so numbers split
+    across chunk boundaries are still found. Fraud keywords are counted in
+    the same pass, so the page text is never held in memory as a whole.
+    
+    Args:
+        chunks (iterable): Raw HTML byte chunks
+        encoding (str, optional): Character encoding of the page
+        
+    Returns:
+        tuple: (candidate dicts ranked by confidence, Counter of fraud keyword hits)
+    """
+    candidates = CandidateExtractor()
+    keywords = get_fraud_scorer().scanner()
     
-    # Check for high density of credit card related terms
-    cc_terms = ['card', 'credit', 'debit', 'visa', 'mastercard', 'amex', 'bin', 'cvv', 'exp']
-    term_count = sum(content_lower.count(term) for term in cc_terms)
+    for text in iter_page_text(chunks, encoding):
+        candidates.feed(text)
+        keywords.feed(text)
     
-    # If there are many card-related terms, it might be suspicious
-    if term_count > 15:
-        return True
+    return candidates.close(), keywords.close()
+
+def load_fraud_keywords(path=None):
+    """
+    Load the keyword lists used to score fraud context.
+    
+    The file is a JSON object with any of the keys url_terms,
+    content_terms, card_terms and card_term_threshold; missing keys keep
+    their defaults.
     
-    return False
+    Args:
+        path (str, optional): JSON file, defaults to BIN_FRAUD_KEYWORDS
+        
+    Returns:
+        dict: Keyword configuration
+    """
+    config = dict(DEFAULT_FRAUD_KEYWORDS)
+    path = path or os.environ.get('BIN_FRAUD_KEYWORDS')
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        config.update({key: overrides[key] for key in DEFAULT_FRAUD_KEYWORDS if key in overrides})
+    return config
+
+class FraudContextScorer:
+    """
+    Scores a page for fraud context in one pass over its text.
+    
+    All content and card-density keywords are compiled into a single
+    KeywordMatcher, so a page is scanned once no matter how many terms are
+    configured.
+    
+    Args:
+        config (dict, optional): Keyword configuration, see load_fraud_keywords
+    """
+    
+    def __init__(self, config=None):
+        config = config or load_fraud_keywords()
+        self.url_terms = tuple(term.lower() for term in config['url_terms'])
+        self.content_terms = tuple(term.lower() for term in config['content_terms'])
+        self.card_terms = tuple(term.lower() for term in config['card_terms'])
+        self.card_term_threshold = config['card_term_threshold']
+        self.matcher = KeywordMatcher(self.content_terms + self.card_terms)
+    
+    def scanner(self):
+        """Start an incremental scan of page text"""
+        return self.matcher.scanner()
+    
+    def score(self, url, counts):
+        """
+        Turn keyword counts for a page into a fraud context verdict.
+        
+        Args:
+            url (str): URL of the page
+            counts (Counter): Keyword counts from scanner() or matcher.count()
+            
+        Returns:
+            dict: url_hits (list), term_hits (dict), card_term_count (int)
+            and fraud_context (bool)
+        """
+        url_lower = url.lower()
+        url_hits = [term for term in self.url_terms if term in url_lower]
+        term_hits = {term: counts[term] for term in self.content_terms if counts[term]}
+        card_term_count = sum(counts[term] for term in self.card_terms)
+        
+        return {
+            "url_hits": url_hits,
+            "term_hits": term_hits,
+            "card_term_count": card_term_count,
+            # If there are many card-related terms, it might be suspicious
+            "fraud_context": bool(url_hits or term_hits or card_term_count > self.card_term_threshold),
+        }
+
+_fraud_scorer = None
+
+def get_fraud_scorer():
+    """Get the shared scorer built from the configured keyword lists"""
+    global _fraud_scorer
+    if _fraud_scorer is None:
+        _fraud_scorer = FraudContextScorer()
+    return _fraud_scorer
+
+def is_fraud_context(url, content):
+    """
+    Simple heuristic to determine if the context might be related to fraud.
+    
+    Args:
+        url (str): URL of the scraped content
+        content (str): Text content from the page
+        
+    Returns:
+        bool: True if the context appears to be related to fraud
+    """
+    scorer = get_fraud_scorer()
+    return scorer.score(url, scorer.matcher.count(content))["fraud_context"]
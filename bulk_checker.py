@@ -0,0 +1,246 @@
+"""
+Helpers for checking many BINs at once: parsing uploaded files, validating
+and deduplicating their contents, and streaming lookups through the
+async batch API from synchronous code such as the Streamlit app.
+"""
+
+import io
+import csv
+import json
+import asyncio
+
+from bin_checker import check_bins_3ds_many, DEFAULT_CONCURRENCY
+from utils import classify_risk, is_valid_bin, is_valid_ip
+
+# Column / key names recognised as holding the BIN and the IP address
+BIN_FIELDS = ('bin', 'bin_number', 'card', 'card_number', 'number', 'pan')
+IP_FIELDS = ('ip', 'ip_address')
+
+# File name endings parsed as JSON Lines (or a JSON array); anything else is read as CSV
+JSONL_SUFFIXES = ('.jsonl', '.ndjson', '.json')
+
+def parse_bin_file(data, filename=""):
+    """
+    Parse an uploaded CSV or JSONL file into (bin, ip) pairs.
+
+    CSV files may have a header naming the BIN column (bin, bin_number,
+    card_number, ...) and optionally an ip/ip_address column; otherwise the
+    first column is used. JSONL lines may be objects with the same keys or
+    bare strings/numbers; a file holding one JSON array of those is read
+    too. Plain text files are treated as one BIN per line.
+
+    Args:
+        data (bytes or str): File contents
+        filename (str): Original file name, used to pick the format
+
+    Yields:
+        tuple: (bin_number, ip_address) with ip_address None when absent
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig', errors='replace')
+
+    fmt = 'jsonl' if filename.lower().endswith(JSONL_SUFFIXES) else 'csv'
+    yield from parse_bin_lines(io.StringIO(data), fmt)
+
+def parse_bin_lines(lines, fmt='csv'):
+    """
+    Parse lines of CSV or JSONL into (bin, ip) pairs without reading them all first.
+
+    Same rules as parse_bin_file; use this for open files and stdin.
+
+    Args:
+        lines (iterable): Text lines, e.g. a file object opened with newline=''
+        fmt (str): 'csv' (also plain text, one BIN per line) or 'jsonl'
+
+    Yields:
+        tuple: (bin_number, ip_address) with ip_address None when absent
+    """
+    if fmt == 'jsonl':
+        yield from _parse_jsonl(lines)
+    else:
+        yield from _parse_csv(lines)
+
+def _parse_jsonl(lines):
+    lines = iter(lines)
+    for line in lines:
+        if not line.strip():
+            continue
+        if line.lstrip().startswith('['):
+            # One JSON array (e.g. a pretty-printed .json file) rather than
+            # JSON Lines; it has to be read whole
+            text = line + "".join(lines)
+            try:
+                items = json.loads(text)
+            except ValueError:
+                items = None
+            if isinstance(items, list):
+                for item in items:
+                    yield _parse_json_item(item)
+                return
+            lines = iter(text.splitlines())
+        else:
+            lines = _prepend(line, lines)
+        break
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield line, None
+            continue
+        yield _parse_json_item(item)
+
+def _parse_json_item(item):
+    if isinstance(item, dict):
+        fields = {str(k).lower(): v for k, v in item.items()}
+        bin_number = next((fields[f] for f in BIN_FIELDS if fields.get(f) not in (None, "")), "")
+        ip_address = next((str(fields[f]).strip() for f in IP_FIELDS if fields.get(f)), None)
+        return _clean_number(bin_number), ip_address or None
+    return _clean_number(item), None
+
+def _parse_csv(lines):
+    reader = csv.reader(lines)
+    first = next(reader, None)
+    if first is None:
+        return
+
+    header = [cell.strip().lower() for cell in first]
+    bin_col = next((header.index(f) for f in BIN_FIELDS if f in header), None)
+    ip_col = next((header.index(f) for f in IP_FIELDS if f in header), None)
+
+    if bin_col is None:
+        # No recognisable header: the first row is data and column 0 holds the BIN
+        bin_col = 0
+        reader = _prepend(first, reader)
+
+    for row in reader:
+        if len(row) <= bin_col:
+            continue
+        ip_address = row[ip_col].strip() if ip_col is not None and len(row) > ip_col else ""
+        yield _clean_number(row[bin_col]), ip_address or None
+
+def _clean_number(value):
+    # Card numbers are often written in groups: "4111 1111 1111 1111", "4111-1111-..."
+    return str(value).strip().replace(" ", "").replace("-", "")
+
+def _prepend(row, rows):
+    yield row
+    yield from rows
+
+def iter_valid_bins(pairs, default_ip=None, counts=None, invalid=None):
+    """
+    Drop invalid and repeated (bin, ip) pairs as they stream past.
+
+    Rows with an IP address that isn't one are rejected along with
+    invalid BINs, so nothing unchecked reaches the lookup API.
+
+    Args:
+        pairs (iterable): (bin_number, ip_address) tuples
+        default_ip (str, optional): IP address used for rows that don't specify one
+        counts (dict, optional): 'invalid' and 'duplicates' are incremented in place
+        invalid (list, optional): Rejected inputs are appended here
+
+    Yields:
+        tuple: (bin_number, ip_address), each pair once, in first-seen order
+    """
+    counts = counts if counts is not None else {"invalid": 0, "duplicates": 0}
+    seen = set()
+
+    for bin_number, ip_address in pairs:
+        if not is_valid_bin(bin_number):
+            rejected = bin_number
+        elif ip_address and not is_valid_ip(ip_address):
+            rejected = f"{bin_number} (IP {ip_address})"
+        else:
+            key = (bin_number, ip_address or default_ip)
+            if key in seen:
+                counts["duplicates"] += 1
+            else:
+                seen.add(key)
+                yield key
+            continue
+
+        # Blank rows are skipped without counting as invalid
+        if rejected:
+            counts["invalid"] += 1
+            if invalid is not None:
+                invalid.append(rejected)
+
+def prepare_bins(pairs, default_ip=None):
+    """
+    Validate and deduplicate (bin, ip) pairs, preserving first-seen order.
+
+    Collects iter_valid_bins into a list, for callers that need the count up front.
+
+    Args:
+        pairs (iterable): (bin_number, ip_address) tuples
+        default_ip (str, optional): IP address used for rows that don't specify one
+
+    Returns:
+        tuple: (valid_pairs, invalid, duplicates) where invalid is a list of
+        rejected inputs and duplicates is the number of repeats dropped
+    """
+    counts = {"invalid": 0, "duplicates": 0}
+    invalid = []
+    valid = list(iter_valid_bins(pairs, default_ip, counts, invalid))
+    return valid, invalid, counts["duplicates"]
+
+def result_to_bin_data(bin_number, ip_address, result, fraud_context=False):
+    """
+    Build the record dict stored by database.add_bin_record from an API result.
+
+    Args:
+        bin_number (str): BIN or card number that was checked
+        ip_address (str): IP address used for the lookup (may be None)
+        result (dict): Response from check_bin_3ds
+        fraud_context (bool): Whether the BIN was found in a fraud context
+
+    Returns:
+        dict: BIN record data
+    """
+    is3ds = result.get("is3DS", False)
+
+    return {
+        "BIN": bin_number,
+        "ip_address": ip_address or "",
+        "Scheme": result.get("scheme", "Unknown"),
+        "Type": result.get("cardType", "Unknown"),
+        "Country": result.get("country", "Unknown"),
+        "Issuer": result.get("issuer", "Unknown"),
+        "IP Location": result.get("ipCountry", "Unknown"),
+        "is3DS": is3ds,
+        "Risk Level": classify_risk(is3ds, fraud_context),
+        "fraud_context": fraud_context,
+        "raw_response": result
+    }
+
+def iter_bin_results(pairs, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Synchronous wrapper around check_bins_3ds_many.
+
+    Drives the async generator on a private event loop so callers without
+    a running loop (Streamlit scripts, CLIs) can consume results as they
+    complete.
+
+    Args:
+        pairs (iterable): (bin_number, ip_address) tuples
+        concurrency (int): Maximum number of lookups in flight
+
+    Yields:
+        tuple: (bin_number, ip_address, result)
+    """
+    loop = asyncio.new_event_loop()
+    results = check_bins_3ds_many(pairs, concurrency=concurrency)
+
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.close()
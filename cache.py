@@ -0,0 +1,186 @@
+"""
+Two-tier (memory + SQLite) cache for 3DS lookup responses.
+
+Entries are keyed by (BIN, IP). The in-process tier is a bounded LRU; the
+SQLite tier lives in the application database so cached answers survive
+restarts and are shared between Streamlit worker processes.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# Defaults can be overridden from the environment
+DEFAULT_TTL = int(os.environ.get('BIN_CACHE_TTL', 24 * 60 * 60))  # seconds
+DEFAULT_MAX_ENTRIES = int(os.environ.get('BIN_CACHE_MAX_ENTRIES', 1024))
+DEFAULT_MAX_PERSISTENT_ENTRIES = int(os.environ.get('BIN_CACHE_MAX_PERSISTENT_ENTRIES', 100000))
+DEFAULT_PERSISTENT = os.environ.get('BIN_CACHE_PERSISTENT', '1').lower() not in ('0', 'false', 'no')
+
+# Prune the SQLite tier once every this many writes
+PRUNE_INTERVAL = 500
+
+class LookupCache:
+    """
+    TTL cache with an in-process LRU tier in front of an SQLite tier.
+
+    Args:
+        ttl (int): Seconds an entry stays valid
+        max_entries (int): Maximum number of entries in the memory tier
+        persistent (bool): Whether to use the SQLite tier
+        max_persistent_entries (int): Maximum number of rows in the SQLite tier
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 persistent=DEFAULT_PERSISTENT, max_persistent_entries=DEFAULT_MAX_PERSISTENT_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self.max_persistent_entries = max_persistent_entries
+
+        # The database module (and SQLAlchemy) is only loaded on first use of the SQLite tier
+        self._db = None
+
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, response as JSON text)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(bin_number, ip_address=None):
+        """Build the hashed cache key so raw card numbers are never persisted"""
+        raw = f"{bin_number}|{ip_address or ''}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, bin_number, ip_address=None, count_miss=True, memory_only=False):
+        """
+        Look up a cached response.
+
+        Args:
+            bin_number (str): BIN or card number
+            ip_address (str, optional): IP address used for the lookup
+            count_miss (bool): False for a second look after a counted miss
+            memory_only (bool): Skip the SQLite tier, for callers that can't block on it
+
+        Returns:
+            dict: A fresh copy of the cached response, nested values
+            included, or None on a miss
+        """
+        key = self.make_key(bin_number, ip_address)
+        now = time.monotonic()
+
+        text = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    text = entry[1]
+                else:
+                    del self._entries[key]
+        if text is not None:
+            # Parsed on every hit, so callers never share nested values
+            return json.loads(text)
+
+        if self.persistent and not memory_only:
+            try:
+                cached = self._database().get_cached_lookup(key, with_expiry=True)
+            except Exception:
+                cached = None
+                with self._lock:
+                    self.errors += 1
+
+            if cached is not None:
+                # Promote with the row's remaining lifetime (never more than our
+                # own TTL), so the memory tier can't outlive the SQLite entry
+                response, expires_at = cached
+                remaining = (expires_at - datetime.utcnow()).total_seconds()
+                self._remember(key, response, now + min(max(remaining, 0), self.ttl))
+                with self._lock:
+                    self.db_hits += 1
+                # Freshly decoded; the memory tier keeps its own text
+                return response
+
+        if count_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, bin_number, ip_address, response):
+        """
+        Store a response in both tiers.
+
+        Args:
+            bin_number (str): BIN or card number
+            ip_address (str): IP address used for the lookup (may be None)
+            response (dict): API response to cache
+        """
+        key = self.make_key(bin_number, ip_address)
+        self._remember(key, response, time.monotonic() + self.ttl)
+
+        if not self.persistent:
+            return
+
+        try:
+            db = self._database()
+            db.set_cached_lookup(key, response, datetime.utcnow() + timedelta(seconds=self.ttl))
+
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % PRUNE_INTERVAL == 0
+            if prune:
+                db.prune_lookup_cache(self.max_persistent_entries)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+
+    def clear(self):
+        """Drop all entries from the memory tier and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = self.db_hits = self.misses = self.errors = 0
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Hit/miss counters, hit rate and memory tier size
+        """
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+    def _database(self):
+        """Import the database module and create the schema on first use"""
+        if self._db is None:
+            import database
+            database.init_db()
+            self._db = database
+        return self._db
+
+    def _remember(self, key, response, expires_at):
+        # Kept as text so callers mutating a result can't poison the cache
+        text = json.dumps(response)
+        with self._lock:
+            self._entries[key] = (expires_at, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
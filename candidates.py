@@ -0,0 +1,228 @@
+"""
+Candidate BIN extraction for scraped text.
+
+Plain six-digit numbers are mostly zip codes, order IDs and dates, so
+candidates are scored before any of them costs an API call:
+
+- 13-19 digit card numbers (optionally grouped with spaces or dashes)
+  must pass the Luhn check and start with a known IIN range; only their
+  leading digits are kept, never the full number.
+- 6- and 8-digit numbers must start with a known IIN range and need
+  card/BIN wording nearby to reach the default threshold; nearby order,
+  phone or postal wording and degenerate digit runs count against them.
+
+Candidates for the same BIN are merged and ranked by confidence.
+"""
+
+import re
+
+from streaming import StreamingMatcher
+from utils import is_luhn_valid
+
+# Digits kept from a full card number
+BIN_LENGTH = 6
+
+# Characters on each side of a number inspected for context words
+CONTEXT_CHARS = 32
+
+# Issuer identification ranges: (low prefix, high prefix, scheme, valid PAN lengths)
+IIN_RANGES = [
+    ("4", "4", "VISA", (13, 16, 19)),
+    ("51", "55", "MASTERCARD", (16,)),
+    ("2221", "2720", "MASTERCARD", (16,)),
+    ("34", "34", "AMERICAN EXPRESS", (15,)),
+    ("37", "37", "AMERICAN EXPRESS", (15,)),
+    ("6011", "6011", "DISCOVER", (16, 17, 18, 19)),
+    ("644", "649", "DISCOVER", (16, 17, 18, 19)),
+    ("65", "65", "DISCOVER", (16, 17, 18, 19)),
+    ("3528", "3589", "JCB", (16, 17, 18, 19)),
+    ("300", "305", "DINERS CLUB", (14, 15, 16, 17, 18, 19)),
+    ("36", "36", "DINERS CLUB", (14, 15, 16, 17, 18, 19)),
+    ("38", "39", "DINERS CLUB", (16, 17, 18, 19)),
+    ("62", "62", "UNIONPAY", (16, 17, 18, 19)),
+    ("50", "50", "MAESTRO", (12, 13, 14, 15, 16, 17, 18, 19)),
+    ("56", "58", "MAESTRO", (12, 13, 14, 15, 16, 17, 18, 19)),
+    ("6304", "6304", "MAESTRO", (12, 13, 14, 15, 16, 17, 18, 19)),
+    ("6759", "6759", "MAESTRO", (12, 13, 14, 15, 16, 17, 18, 19)),
+    ("6761", "6763", "MAESTRO", (12, 13, 14, 15, 16, 17, 18, 19)),
+    ("2200", "2204", "MIR", (16, 17, 18, 19)),
+    ("60", "60", "RUPAY", (16,)),
+    ("508", "508", "RUPAY", (16,)),
+]
+
+# Every prefix each range covers, looked up longest first so e.g. 6011 wins over 60
+_IIN_BY_PREFIX = {}
+for _low, _high, _scheme, _lengths in IIN_RANGES:
+    for _prefix in range(int(_low), int(_high) + 1):
+        _IIN_BY_PREFIX.setdefault(len(_low), {})[str(_prefix)] = (_scheme, _lengths)
+_IIN_PREFIX_LENGTHS = sorted(_IIN_BY_PREFIX, reverse=True)
+
+# Card numbers grouped 4-4-4-4(-3) or 4-6-5 with one consistent separator, or
+# run together; then standalone 6- or 8-digit numbers
+CANDIDATE_PATTERN = re.compile(
+    r'(?<!\d)(?:'
+    r'(?:\d{4}(?P<sep>[ -])\d{4}(?P=sep)\d{4}(?P=sep)\d{1,4}(?:(?P=sep)\d{1,3})?'
+    r'|\d{4}(?P<amex_sep>[ -])\d{6}(?P=amex_sep)\d{4,5}'
+    r'|\d{13,19})'
+    r'|(?:\d{6}(?:\d{2})?)'
+    r')(?!\d)'
+)
+
+# Wording that makes a nearby short number more or less likely to be a BIN
+POSITIVE_CONTEXT = re.compile(
+    r'\b(?:bins?|iins?|cards?|cc|credit|debit|prepaid|visa|master ?card|mc|amex|'
+    r'discover|jcb|maestro|unionpay|issuer|bank|cvv2?|exp)\b'
+)
+NEGATIVE_CONTEXT = re.compile(
+    r'\b(?:order|invoice|zip|postal|post ?code|phone|tel|fax|ref|reference|'
+    r'tracking|sku|isbn|ticket|case|account|id)\b|#'
+)
+
+# Confidence assigned by score_candidate
+PAN_CONFIDENCE = 0.95
+PAN_WRONG_LENGTH_CONFIDENCE = 0.7
+SHORT_BASE_CONFIDENCE = 0.35
+POSITIVE_CONTEXT_BONUS = 0.35
+NEGATIVE_CONTEXT_PENALTY = 0.3
+DEGENERATE_PENALTY = 0.3
+
+def match_iin(digits):
+    """
+    Find the card scheme whose IIN range the digits fall in.
+
+    Args:
+        digits (str): Card number or BIN digits
+
+    Returns:
+        tuple: (scheme, valid PAN lengths), or None if no range matches
+    """
+    for length in _IIN_PREFIX_LENGTHS:
+        iin = _IIN_BY_PREFIX[length].get(digits[:length])
+        if iin is not None:
+            return iin
+    return None
+
+def _is_degenerate(digits):
+    """Repeated or consecutive digit runs (444444, 456789, 654321)"""
+    if len(set(digits)) == 1:
+        return True
+    steps = {(int(b) - int(a)) % 10 for a, b in zip(digits, digits[1:])}
+    return steps in ({1}, {9})
+
+def score_candidate(digits, kind, context=""):
+    """
+    Score a number found in text as a BIN candidate.
+
+    Args:
+        digits (str): The number with separators removed
+        kind (str): "pan" for 13-19 digit card numbers, "bin" for 6/8-digit numbers
+        context (str): Text around the number (not including it)
+
+    Returns:
+        dict: bin, scheme, kind and confidence (0-1), or None if it can't be a BIN
+    """
+    iin = match_iin(digits)
+    if iin is None:
+        return None
+    scheme, lengths = iin
+
+    if kind == "pan":
+        if not is_luhn_valid(digits):
+            return None
+        confidence = PAN_CONFIDENCE if len(digits) in lengths else PAN_WRONG_LENGTH_CONFIDENCE
+        return {"bin": digits[:BIN_LENGTH], "scheme": scheme, "kind": kind, "confidence": confidence}
+
+    context = context.lower()
+    confidence = SHORT_BASE_CONFIDENCE
+    if POSITIVE_CONTEXT.search(context):
+        confidence += POSITIVE_CONTEXT_BONUS
+    if NEGATIVE_CONTEXT.search(context):
+        confidence -= NEGATIVE_CONTEXT_PENALTY
+    if _is_degenerate(digits):
+        confidence -= DEGENERATE_PENALTY
+
+    confidence = round(min(max(confidence, 0.0), 1.0), 2)
+    return {"bin": digits, "scheme": scheme, "kind": kind, "confidence": confidence}
+
+def score_match(text, before="", after=""):
+    """
+    Score a CANDIDATE_PATTERN match given the text around it.
+
+    Args:
+        text (str): Matched text, possibly with space or dash separators
+        before (str): Text preceding the match
+        after (str): Text following the match
+
+    Returns:
+        dict: See score_candidate, or None
+    """
+    digits = text.replace(" ", "").replace("-", "")
+    kind = "bin" if len(digits) <= 8 else "pan"
+    # Only wording in the same line / block describes the number
+    context = before.rsplit("\n", 1)[-1] + " " + after.split("\n", 1)[0]
+    return score_candidate(digits, kind, context)
+
+class CandidateExtractor:
+    """
+    Collect and rank BIN candidates from a stream of text chunks.
+
+    Feed text with feed() and get the ranked candidates from close().
+    Matching runs over a sliding window, so numbers and their context
+    split across chunks are handled like contiguous text.
+    """
+
+    def __init__(self):
+        self._matcher = StreamingMatcher(CANDIDATE_PATTERN, overlap=64, context=CONTEXT_CHARS)
+        self._candidates = {}
+
+    def feed(self, text):
+        """
+        Scan the next chunk of text.
+
+        Args:
+            text (str): Next chunk of the stream
+        """
+        self._add(self._matcher.feed(text))
+
+    def close(self):
+        """
+        Finish the scan and rank what was found.
+
+        Returns:
+            list: Candidate dicts (bin, scheme, kind, confidence, occurrences),
+            highest confidence first, then most frequent, then by BIN
+        """
+        self._add(self._matcher.close())
+        return sorted(
+            self._candidates.values(),
+            key=lambda c: (-c["confidence"], -c["occurrences"], c["bin"])
+        )
+
+    def _add(self, matches):
+        for _, text, before, after in matches:
+            candidate = score_match(text, before, after)
+            if candidate is None:
+                continue
+
+            existing = self._candidates.get(candidate["bin"])
+            if existing is None:
+                candidate["occurrences"] = 1
+                self._candidates[candidate["bin"]] = candidate
+            else:
+                existing["occurrences"] += 1
+                if candidate["confidence"] > existing["confidence"]:
+                    existing.update(kind=candidate["kind"], confidence=candidate["confidence"])
+
+def extract_candidates(text):
+    """
+    Rank the BIN candidates in a text.
+
+    Args:
+        text (str): Text to scan
+
+    Returns:
+        list: Candidate dicts, see CandidateExtractor.close
+    """
+    extractor = CandidateExtractor()
+    extractor.feed(text)
+    return extractor.close()
@@ -0,0 +1,494 @@
+"""
+Command-line entry point for batch jobs without the Streamlit UI.
+
+`check` streams BINs from CSV / JSONL files or stdin through validation,
+3DS lookup, risk classification and persistence; `scrape` does the same
+for a list of URLs. Each stage hands work to the next as it is ready:
+lookups run concurrently through the shared cache and rate limiter,
+results are written to stdout as they complete, and database writes are
+batched on a background thread, so memory stays flat however long the
+input is.
+
+Usage:
+    bin-intel check bins.csv > results.jsonl
+    cat bins.jsonl | bin-intel check - --output csv
+    bin-intel scrape urls.txt --no-db
+    bin-intel migrate-payloads --vacuum
+    bin-intel rebuild
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+from utils import is_valid_ip, is_valid_url
+
+# Rows per add_bin_records call
+DEFAULT_BATCH_SIZE = int(os.environ.get('BIN_CLI_BATCH_SIZE', 500))
+
+# Pages scraped at once; each page also runs its own BIN lookups concurrently
+DEFAULT_PAGE_WORKERS = int(os.environ.get('BIN_CLI_PAGE_WORKERS', 2))
+
+# Output columns, in order, for each command
+CHECK_FIELDS = ("BIN", "ip_address", "Scheme", "Type", "Country", "Issuer", "IP Location",
+                "is3DS", "Risk Level", "error")
+SCRAPE_FIELDS = ("url", "BIN", "ip_address", "Scheme", "Country", "Issuer", "is3DS", "Risk Level", "error")
+
+class RecordWriter:
+    """
+    Batch bin_records writes on a background thread.
+
+    The queue between the pipeline and the writer is bounded, so a slow
+    database holds back lookups instead of buffering results in memory.
+
+    Args:
+        source (str): bin_records source for every row ('bulk' or 'scraper')
+        batch_size (int): Rows per add_bin_records call
+        enabled (bool): False to accept and drop rows (--no-db)
+    """
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE, enabled=True):
+        self.source = source
+        self.batch_size = max(1, batch_size)
+        self.enabled = enabled
+        self.inserted = 0
+        self.errors = []  # (BIN, message)
+        self._batch = []
+        self._callbacks = []
+        self._queue = queue.Queue(maxsize=4)
+        self._thread = None
+
+        if enabled:
+            import database as db
+
+            db.init_db()
+            self._db = db
+            self._thread = threading.Thread(target=self._run, name="bin-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, bin_data):
+        """Queue one record, flushing a full batch to the writer thread"""
+        if not self.enabled:
+            return
+        self._batch.append(bin_data)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def defer(self, callback):
+        """
+        Run callback on the writer thread once every row added so far is written.
+
+        Callbacks are skipped once any write has failed, and never run when
+        the writer is disabled.
+        """
+        if self.enabled:
+            self._callbacks.append(callback)
+
+    def close(self):
+        """
+        Write the remaining rows and wait for the writer to finish.
+
+        Returns:
+            tuple: (inserted, errors) with errors as (BIN, message) pairs
+        """
+        if self._thread is not None:
+            if self._batch or self._callbacks:
+                self._flush()
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        return self.inserted, self.errors
+
+    def _flush(self):
+        # Callbacks travel with the batch so they run after the rows before them
+        self._queue.put((self._batch, self._callbacks))
+        self._batch = []
+        self._callbacks = []
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, callbacks = item
+            if batch:
+                try:
+                    inserted, errors = self._db.add_bin_records(batch, source=self.source)
+                except Exception as e:
+                    inserted, errors = 0, [(index, str(e)) for index in range(len(batch))]
+                self.inserted += inserted
+                self.errors.extend((batch[index]["BIN"], message) for index, message in errors)
+            if not self.errors:
+                for callback in callbacks:
+                    callback()
+
+class OutputWriter:
+    """
+    Stream result rows to a text stream as JSON Lines or CSV.
+
+    Args:
+        stream (file): Where to write, usually sys.stdout
+        fmt (str): 'jsonl' or 'csv'
+        fields (tuple): Columns to write, in order
+        flush_every (int): Rows between flushes, so piped consumers see progress
+    """
+
+    def __init__(self, stream, fmt, fields, flush_every=100):
+        self.stream = stream
+        self.fields = fields
+        self.flush_every = flush_every
+        self.rows = 0
+        self._csv = None
+
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=fields, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, row):
+        """Write one row; keys outside the configured fields are dropped"""
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps({k: row[k] for k in self.fields if k in row}) + "\n")
+
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+def open_input(path):
+    """
+    Open an input file, '-' meaning stdin.
+
+    Returns:
+        file: Text stream (the caller closes it unless it is stdin)
+    """
+    if path == '-':
+        return sys.stdin
+    return open(path, encoding='utf-8-sig', errors='replace', newline='')
+
+def detect_format(path, lines, fmt='auto'):
+    """
+    Decide whether an input is CSV or JSON Lines.
+
+    The file name decides where it can; otherwise (stdin, other suffixes)
+    the first non-blank line is inspected: a JSON object or array means JSON.
+
+    Args:
+        path (str): Input path or '-'
+        lines (iterator): The input's lines
+        fmt (str): 'csv', 'jsonl' or 'auto'
+
+    Returns:
+        tuple: (fmt, lines) where lines still yields every line, including any peeked
+    """
+    from bulk_checker import JSONL_SUFFIXES
+
+    if fmt != 'auto':
+        return fmt, lines
+    if path.lower().endswith(JSONL_SUFFIXES):
+        return 'jsonl', lines
+    if path.lower().endswith(('.csv', '.txt')):
+        return 'csv', lines
+
+    lines = iter(lines)
+    peeked = []
+    for line in lines:
+        peeked.append(line)
+        if line.strip():
+            break
+    first = peeked[-1].lstrip() if peeked else ""
+    return ('jsonl' if first.startswith(('{', '[')) else 'csv'), itertools.chain(peeked, lines)
+
+def read_bins(paths, fmt='auto'):
+    """
+    Stream (bin, ip) pairs from every input in turn.
+
+    Args:
+        paths (list): File paths, '-' for stdin
+        fmt (str): 'csv', 'jsonl' or 'auto'
+
+    Yields:
+        tuple: (bin_number, ip_address) with ip_address None when absent
+    """
+    from bulk_checker import parse_bin_lines
+
+    for path in paths:
+        stream = open_input(path)
+        try:
+            path_fmt, lines = detect_format(path, stream, fmt)
+            yield from parse_bin_lines(lines, path_fmt)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+def read_urls(paths):
+    """
+    Stream URLs from every input in turn: one per line, or JSON objects with a "url" key.
+
+    Args:
+        paths (list): File paths, '-' for stdin
+
+    Yields:
+        str: URL as given (validated later)
+    """
+    for path in paths:
+        stream = open_input(path)
+        try:
+            for line in stream:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('{'):
+                    try:
+                        line = str(json.loads(line).get("url", "")).strip()
+                    except (ValueError, AttributeError):
+                        pass
+                yield line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+def bounded_map(func, items, workers):
+    """
+    Apply func to items on a thread pool with at most `workers` calls pending.
+
+    Items are pulled lazily, so arbitrarily long inputs stream through.
+
+    Yields:
+        tuple: (item, result) in completion order
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bin-cli") as executor:
+        pending = {executor.submit(func, item): item for item in itertools.islice(items, max(1, workers))}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for next_item in itertools.islice(items, 1):
+                    pending[executor.submit(func, next_item)] = next_item
+                yield item, future.result()
+
+def run_check(args):
+    """Look up, classify, print and record every BIN in the inputs"""
+    from bulk_checker import iter_bin_results, iter_valid_bins, result_to_bin_data
+
+    counts = {"ok": 0, "errors": 0, "invalid": 0, "duplicates": 0}
+    output = OutputWriter(sys.stdout, args.output, CHECK_FIELDS)
+    writer = RecordWriter('bulk', args.batch_size, enabled=not args.no_db)
+    started = time.perf_counter()
+
+    try:
+        pairs = iter_valid_bins(read_bins(args.inputs, args.format), args.ip, counts)
+        for bin_number, ip_address, result in iter_bin_results(pairs, concurrency=args.concurrency):
+            if "error" in result:
+                counts["errors"] += 1
+                output.write({"BIN": bin_number, "ip_address": ip_address or "", "error": result["error"]})
+                continue
+
+            bin_data = result_to_bin_data(bin_number, ip_address, result)
+            counts["ok"] += 1
+            output.write(bin_data)
+            writer.add(bin_data)
+    finally:
+        output.close()
+        inserted, save_errors = writer.close()
+
+    elapsed = time.perf_counter() - started
+    checked = counts["ok"] + counts["errors"]
+    print(f"Checked {checked} BINs in {elapsed:.1f}s ({checked / elapsed if elapsed else 0:.0f}/s): "
+          f"{counts['ok']} ok, {counts['errors']} failed, {counts['invalid']} invalid, "
+          f"{counts['duplicates']} duplicates", file=sys.stderr)
+    return _report_saves(args, inserted, save_errors, counts["errors"])
+
+def run_scrape(args):
+    """Scrape every URL in the inputs, printing and recording the BINs found"""
+    from bin_scraper import save_scan, scrape_bins_from_url
+
+    counts = {"pages": 0, "unchanged": 0, "failed": 0, "invalid": 0, "bins": 0}
+    output = OutputWriter(sys.stdout, args.output, SCRAPE_FIELDS)
+    writer = RecordWriter('scraper', args.batch_size, enabled=not args.no_db)
+    started = time.perf_counter()
+
+    def urls():
+        for url in read_urls(args.inputs):
+            if is_valid_url(url):
+                yield url
+            else:
+                counts["invalid"] += 1
+
+    def scrape(url):
+        # Pages are remembered for rescans by the writer, once their BINs are saved
+        return scrape_bins_from_url(url, args.ip, max_lookups=args.max_lookups,
+                                    min_confidence=args.min_confidence, use_cache=not args.force,
+                                    store=False)
+
+    try:
+        for url, result in bounded_map(scrape, urls(), args.workers):
+            counts["pages"] += 1
+            if isinstance(result, str):
+                counts["failed"] += 1
+                output.write({"url": url, "error": result})
+                continue
+
+            if result.from_cache:
+                counts["unchanged"] += 1
+
+            for row in result:
+                counts["bins"] += 1
+                output.write(dict(row, url=url, ip_address=args.ip or ""))
+
+                # Stored results of an unchanged page were recorded when it was first scanned
+                if not result.from_cache:
+                    writer.add({
+                        "BIN": row["BIN"],
+                        "ip_address": args.ip or "",
+                        "Scheme": row["Scheme"],
+                        "Country": row["Country"],
+                        "Issuer": row["Issuer"],
+                        "is3DS": row["is3DS"],
+                        "Risk Level": row["Risk Level"],
+                        "fraud_context": row.get("fraud_context", False),
+                        "raw_response": {},
+                        "source_url": url,
+                    })
+
+            # Skipped with --no-db, so a later recorded run scans the page again
+            if not result.from_cache:
+                writer.defer(lambda result=result: save_scan(result))
+    finally:
+        output.close()
+        inserted, save_errors = writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scraped {counts['pages']} pages in {elapsed:.1f}s: {counts['bins']} BINs, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed, {counts['invalid']} invalid URLs",
+          file=sys.stderr)
+    return _report_saves(args, inserted, save_errors, counts["failed"])
+
+def run_migrate_payloads(args):
+    """Move legacy raw_response JSON into response_payloads, optionally compacting the file"""
+    import database as db
+
+    db.init_db()
+    started = time.perf_counter()
+    report = db.migrate_raw_responses(batch_size=args.batch_size)
+    print(f"Migrated {report['rows']} rows in {time.perf_counter() - started:.1f}s: "
+          f"{report['payloads']} new payloads, {report['bytes_before'] / 1e6:.1f} MB of JSON stored as "
+          f"{report['bytes_after'] / 1e6:.1f} MB, {report['skipped']} rows with invalid JSON left as they were",
+          file=sys.stderr)
+
+    if args.vacuum:
+        size = _database_file_size(db)
+        db.vacuum_db()
+        if size is not None:
+            print(f"Vacuumed database file: {size / 1e6:.1f} MB -> {_database_file_size(db) / 1e6:.1f} MB",
+                  file=sys.stderr)
+
+    stats = db.get_payload_stats()
+    print(f"{stats['referencing_rows']} rows share {stats['payloads']} payloads "
+          f"({stats['compressed_bytes'] / 1e6:.1f} MB compressed); {stats['legacy_rows']} legacy rows remain",
+          file=sys.stderr)
+    return 0
+
+def run_rebuild(args):
+    """Recompute bin_metadata and bin_stats from the bin_records history"""
+    import database as db
+
+    db.init_db()
+    started = time.perf_counter()
+    bins = db.rebuild_bin_metadata()
+    records = db.rebuild_bin_stats()
+    print(f"Rebuilt bin_metadata ({bins} BINs) and bin_stats ({records} records) in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+def _database_file_size(db):
+    path = db.engine.url.database if db.engine.dialect.name == 'sqlite' else None
+    return os.path.getsize(path) if path and os.path.exists(path) else None
+
+def _report_saves(args, inserted, save_errors, failures):
+    """Print the persistence summary and pick the exit code"""
+    if not args.no_db:
+        print(f"Recorded {inserted} rows in bin_records", file=sys.stderr)
+    for bin_number, message in save_errors:
+        print(f"BIN {bin_number} not saved: {message}", file=sys.stderr)
+    return 1 if failures or save_errors else 0
+
+def build_parser():
+    """Argument parser for the bin-intel command"""
+    from bin_checker import DEFAULT_CONCURRENCY
+    from bin_scraper import MAX_LOOKUPS, MIN_CONFIDENCE
+
+    parser = argparse.ArgumentParser(prog="bin-intel", description="Batch BIN intelligence and 3DS checks")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Collect metrics and write them here in Prometheus text format when done")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="*", default=["-"], help="Input files ('-' or none for stdin)")
+    common.add_argument("--ip", help="IP address for geolocation context")
+    common.add_argument("--output", choices=("jsonl", "csv"), default="jsonl", help="stdout format")
+    common.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per database write")
+    common.add_argument("--no-db", action="store_true", help="Don't record results in the database")
+
+    check = commands.add_parser("check", parents=[common], help="Check BINs / card numbers from CSV or JSONL")
+    check.add_argument("--format", choices=("auto", "csv", "jsonl"), default="auto", help="Input format")
+    check.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Lookups in flight")
+    check.set_defaults(run=run_check)
+
+    scrape = commands.add_parser("scrape", parents=[common], help="Scrape URLs (one per line) for BINs")
+    scrape.add_argument("-w", "--workers", type=int, default=DEFAULT_PAGE_WORKERS, help="Pages scraped at once")
+    scrape.add_argument("--max-lookups", type=int, default=MAX_LOOKUPS, help="Most BINs checked per page")
+    scrape.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE,
+                        help="Minimum candidate score (0-1)")
+    scrape.add_argument("--force", action="store_true", help="Rescan pages even if unchanged since the last scan")
+    scrape.set_defaults(run=run_scrape)
+
+    migrate = commands.add_parser("migrate-payloads",
+                                  help="Move stored API responses into the compressed, deduplicated payload table")
+    migrate.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction")
+    migrate.add_argument("--vacuum", action="store_true", help="Compact the SQLite file afterwards (blocks writers)")
+    migrate.set_defaults(run=run_migrate_payloads)
+
+    rebuild = commands.add_parser("rebuild", help="Recompute the per-BIN latest state and history statistics")
+    rebuild.set_defaults(run=run_rebuild)
+
+    return parser
+
+def main(argv=None):
+    """Run the bin-intel command; returns the process exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if getattr(args, "ip", None) and not is_valid_ip(args.ip):
+        parser.error(f"invalid IP address: {args.ip}")
+
+    if args.metrics:
+        metrics.enable()
+
+    try:
+        return args.run(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Downstream closed early (e.g. piped into head); don't traceback on exit
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    finally:
+        if args.metrics:
+            with open(args.metrics, "w", encoding="utf-8") as f:
+                f.write(metrics.render_prometheus())
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,161 @@
 import os
 import json
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, Table, MetaData
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from sqlalchemy import create_engine, event, exc, func, insert, update, select, case, or_, type_coerce, tuple_, bindparam, inspect, Column, Integer, String, Boolean, Float, Text, DateTime, LargeBinary, Index, Table, MetaData
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import metrics
 
-# Create database engine and session
-engine = create_engine('sqlite:///bins_database.db')
-Session = sessionmaker(bind=engine)
+# Database settings, overridable from the environment
+DATABASE_URL = os.environ.get('BIN_DB_URL', 'sqlite:///bins_database.db')
+POOL_SIZE = int(os.environ.get('BIN_DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.environ.get('BIN_DB_MAX_OVERFLOW', 10))
+POOL_TIMEOUT = float(os.environ.get('BIN_DB_POOL_TIMEOUT', 30))
+
+# zlib level (1-9) for API responses stored in response_payloads
+PAYLOAD_COMPRESSION_LEVEL = int(os.environ.get('BIN_DB_PAYLOAD_LEVEL', 6))
+
+# Latency and error counts of every data function below, labelled by operation
+metrics.histogram("bin_db_operation_seconds", "Database call latency by operation")
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# writer commits, and busy_timeout makes writers wait for the lock instead
+# of failing immediately with "database is locked".
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "cache_size": "-20000",  # KiB, i.e. ~20 MB of page cache per connection
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+def parse_pragmas(value):
+    """
+    Parse a "name=value,name=value" pragma list
+    
+    Args:
+        value (str): Comma-separated pragma assignments
+        
+    Returns:
+        dict: Pragma names mapped to values
+    """
+    pragmas = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, setting = item.split("=", 1)
+            pragmas[name.strip()] = setting.strip()
+    return pragmas
+
+SQLITE_PRAGMAS = dict(DEFAULT_SQLITE_PRAGMAS, **parse_pragmas(os.environ.get('BIN_DB_SQLITE_PRAGMAS')))
+
+# Engine and session factory; created without connecting, see configure_engine
+engine = None
+Session = sessionmaker()
 Base = declarative_base()
 
+_init_lock = threading.Lock()
+_initialized = False
+
+# bin_metadata columns merged from each new observation when it knows them
+METADATA_FIELDS = ('scheme', 'card_type', 'country', 'issuer', 'is_3ds', 'risk_level', 'payload_hash')
+
+# bin_records columns counted in bin_stats; 'day' is the date part of checked_at
+STATS_DIMENSIONS = ('scheme', 'country', 'risk_level', 'source', 'day')
+
+# Prepared bin_metadata / bin_stats upserts by dialect name, see _bin_metadata_upsert
+_metadata_upserts = {}
+_stats_upserts = {}
+
+# Hashes of response_payloads rows known to be committed (payloads are never
+# deleted), newest last; cleared when the engine is reconfigured
+KNOWN_PAYLOADS_MAX = 10000
+_known_payloads = OrderedDict()
+_known_payloads_lock = threading.Lock()
+
+# Incremented after every committed write to bin_records or threshold_records,
+# so callers caching query results can tell when to reload them
+_write_generation = 0
+_generation_lock = threading.Lock()
+
+def configure_engine(url=None, pool_size=None, pragmas=None):
+    """
+    Create the database engine and bind the session factory to it
+    
+    No connection is opened here; SQLite pragmas are applied as each
+    pooled connection is created. Call init_db() afterwards to create
+    the schema.
+    
+    Args:
+        url (str, optional): Database URL, defaults to BIN_DB_URL
+        pool_size (int, optional): Connection pool size, defaults to BIN_DB_POOL_SIZE
+        pragmas (dict, optional): SQLite pragmas, defaults to SQLITE_PRAGMAS
+        
+    Returns:
+        Engine: The new engine
+    """
+    global engine, _initialized
+    
+    url = url or DATABASE_URL
+    pool_size = pool_size or POOL_SIZE
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    
+    is_sqlite = url.startswith("sqlite")
+    in_memory = is_sqlite and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url)
+    
+    kwargs = {"pool_pre_ping": not is_sqlite}
+    if not in_memory:
+        kwargs.update(pool_size=pool_size, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+    if is_sqlite:
+        # Pooled connections are shared by Streamlit's script threads
+        kwargs["connect_args"] = {"check_same_thread": False}
+    
+    new_engine = create_engine(url, **kwargs)
+    
+    if is_sqlite:
+        @event.listens_for(new_engine, "connect")
+        def _configure_sqlite_connection(dbapi_connection, connection_record):
+            # pysqlite's implicit BEGIN handling breaks SAVEPOINT nesting; let SQLAlchemy emit BEGIN itself
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+        
+        @event.listens_for(new_engine, "begin")
+        def _begin_sqlite_transaction(conn):
+            conn.exec_driver_sql("BEGIN")
+    
+    if engine is not None:
+        engine.dispose()
+    
+    engine = new_engine
+    Session.configure(bind=engine)
+    _initialized = False
+    with _known_payloads_lock:
+        _known_payloads.clear()
+    return engine
+
+class ResponsePayload(Base):
+    """Table of distinct API responses, compressed and addressed by content hash"""
+    __tablename__ = 'response_payloads'
+    
+    hash = Column(String(64), primary_key=True)  # sha256 of the canonical JSON, see _canonical_payload
+    encoding = Column(String(10), nullable=False, default='zlib')
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def decode(self):
+        """The stored response as a dict"""
+        return decode_payload(self.encoding, self.data)
+
 class BinRecord(Base):
     """Table for storing BIN check records"""
     __tablename__ = 'bin_records'
@@ -25,10 +171,66 @@ class BinRecord(Base):
     is_3ds = Column(Boolean)
     risk_level = Column(String(20))
     fraud_context = Column(Boolean, default=False)
-    raw_response = Column(Text)
+    raw_response = Column(Text)  # JSON text; only rows written before payload_hash existed, see migrate_raw_responses
     checked_at = Column(DateTime, default=datetime.utcnow)
-    source = Column(String(50))  # 'manual' or 'scraper'
-    source_url = Column(String(255), nullable=True)  # URL if scraped
+    source = Column(String(50))  # 'manual', 'scraper', 'bulk' or 'file_scan'
+    source_url = Column(String(255), nullable=True)  # URL if scraped, file URL if found by the file scanner
+    payload_hash = Column(String(64), nullable=True)  # response_payloads.hash of the API response
+    
+    # Loaded with the records (one extra query per result set) so detached records can still decode it
+    payload = relationship(
+        ResponsePayload,
+        primaryjoin="foreign(BinRecord.payload_hash) == ResponsePayload.hash",
+        lazy="selectin",
+        viewonly=True,
+    )
+    
+    # Support newest-first paging, optionally narrowed by the history tab filters
+    __table_args__ = (
+        Index('ix_bin_records_checked_at_id', 'checked_at', 'id'),
+        Index('ix_bin_records_scheme_checked_at', 'scheme', 'checked_at'),
+        Index('ix_bin_records_risk_level_checked_at', 'risk_level', 'checked_at'),
+        Index('ix_bin_records_country_checked_at', 'country', 'checked_at'),
+    )
+    
+    @property
+    def response(self):
+        """The stored API response as a dict, whether it is in response_payloads or a legacy raw_response"""
+        if self.payload is not None:
+            return self.payload.decode()
+        if self.raw_response:
+            return json.loads(self.raw_response)
+        return {}
+
+class BinMetadata(Base):
+    """Table holding the latest known state of each BIN, kept in sync by every bin_records write"""
+    __tablename__ = 'bin_metadata'
+    
+    bin_number = Column(String(6), primary_key=True)
+    scheme = Column(String(50))
+    card_type = Column(String(50))
+    country = Column(String(50))
+    issuer = Column(String(100))
+    is_3ds = Column(Boolean)
+    risk_level = Column(String(20))
+    payload_hash = Column(String(64), nullable=True)  # response_payloads.hash of the latest successful lookup
+    first_seen = Column(DateTime, nullable=False)
+    last_checked = Column(DateTime, nullable=False)
+    check_count = Column(Integer, nullable=False, default=0)
+    
+    # "All BINs of a scheme / country" in BIN order straight from the index
+    __table_args__ = (
+        Index('ix_bin_metadata_scheme_bin_number', 'scheme', 'bin_number'),
+        Index('ix_bin_metadata_country_bin_number', 'country', 'bin_number'),
+    )
+
+class BinStat(Base):
+    """Table of bin_records counts per scheme, country, risk level, source and day, kept in sync by every write"""
+    __tablename__ = 'bin_stats'
+    
+    dimension = Column(String(20), primary_key=True)  # one of STATS_DIMENSIONS
+    value = Column(String(100), primary_key=True)  # 'Unknown' for empty columns, 'YYYY-MM-DD' for day
+    count = Column(Integer, nullable=False, default=0)
 
 class ThresholdRecord(Base):
     """Table for storing threshold testing records"""
@@ -40,17 +242,406 @@ class ThresholdRecord(Base):
     triggered = Column(Boolean, nullable=False)
     recorded_at = Column(DateTime, default=datetime.utcnow)
 
+class LookupCacheEntry(Base):
+    """Table for caching 3DS API responses between processes and restarts"""
+    __tablename__ = 'lookup_cache'
+    
+    cache_key = Column(String(64), primary_key=True)  # sha256 of BIN + IP, never the raw card number
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class ScrapedPage(Base):
+    """Table remembering the last scan of each URL for conditional rescans"""
+    __tablename__ = 'scraped_pages'
+    
+    url = Column(String(2048), primary_key=True)
+    ip_address = Column(String(45), primary_key=True, default='')  # results depend on the lookup IP
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the downloaded bytes
+    results = Column(Text, nullable=False)  # JSON list of scraper result dicts
+    scanned_at = Column(DateTime, default=datetime.utcnow)
+    candidates = Column(Integer, nullable=True)  # confident candidates found by the scan
+    rejected = Column(Integer, nullable=True)  # low-confidence candidates it skipped
+    # Settings the results depend on; a scan with different ones doesn't reuse them
+    max_lookups = Column(Integer, nullable=True)
+    min_confidence = Column(Float, nullable=True)
+
+@metrics.timed("bin_db_operation_seconds", operation="init_db")
 def init_db():
-    """Initialize the database by creating all tables"""
-    Base.metadata.create_all(engine)
+    """
+    Initialize the database by creating all tables
+    
+    Call once at application startup. Repeated calls in the same process
+    are no-ops until the engine is reconfigured.
+    """
+    global _initialized
+    
+    if _initialized:
+        return
+    
+    with _init_lock:
+        if not _initialized:
+            inspector = inspect(engine)
+            backfill_metadata = not inspector.has_table(BinMetadata.__tablename__)
+            backfill_stats = not inspector.has_table(BinStat.__tablename__)
+            Base.metadata.create_all(engine)
+            
+            # create_all also skips columns added to tables that already exist
+            _add_missing_columns()
+            
+            # create_all skips indexes of tables that already exist, so add any new ones
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            
+            # Databases written before bin_metadata / bin_stats existed get them filled from their history once
+            if backfill_metadata:
+                rebuild_bin_metadata()
+            if backfill_stats:
+                rebuild_bin_stats()
+            
+            _initialized = True
     
+def _add_missing_columns():
+    """Add nullable model columns missing from existing tables (ALTER TABLE ... ADD COLUMN)"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                    )
+
+def get_write_generation():
+    """
+    Get the current write generation
+    
+    The number changes whenever this process commits a write to
+    bin_records or threshold_records, so it can be used as a cache key
+    for results read from those tables. Writes made by other processes
+    are not counted.
+    
+    Returns:
+        int: Current generation
+    """
+    return _write_generation
+
+def _bump_write_generation():
+    """Mark cached bin_records / threshold_records reads as stale"""
+    global _write_generation
+    
+    with _generation_lock:
+        _write_generation += 1
+
+def _dialect_insert(dialect_name):
+    """The dialect's insert() with ON CONFLICT support (SQLite, PostgreSQL), or None"""
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+    return dialect_insert
+
+def _canonical_payload(response):
+    """Serialize an API response with sorted keys, so equal responses get the same hash; returns (hash, bytes)"""
+    text = json.dumps(response, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(text).hexdigest(), text
+
+def decode_payload(encoding, data):
+    """
+    Decode a response_payloads blob
+    
+    Args:
+        encoding (str): The row's encoding
+        data (bytes): The row's data
+        
+    Returns:
+        dict: The API response
+    """
+    if encoding == 'zlib':
+        return json.loads(zlib.decompress(data))
+    raise ValueError(f"Unknown payload encoding: {encoding}")
+
+def _remember_payloads(hashes):
+    """Record payloads as committed, so later writes of the same response skip the lookup"""
+    with _known_payloads_lock:
+        for payload_hash in hashes:
+            _known_payloads[payload_hash] = None
+            _known_payloads.move_to_end(payload_hash)
+        while len(_known_payloads) > KNOWN_PAYLOADS_MAX:
+            _known_payloads.popitem(last=False)
+
+def _store_payloads(conn, payloads):
+    """
+    Compress and insert the payloads not stored yet, inside the caller's transaction
+    
+    Call _remember_payloads with the hashes once the transaction commits.
+    
+    Args:
+        conn (Connection): Connection with an open transaction
+        payloads (dict): hash -> canonical JSON bytes, see _canonical_payload
+        
+    Returns:
+        list: response_payloads column values of the payloads that were new
+    """
+    with _known_payloads_lock:
+        unknown = [payload_hash for payload_hash in payloads if payload_hash not in _known_payloads]
+    if not unknown:
+        return []
+    
+    existing = set(conn.execute(
+        select(ResponsePayload.hash).where(ResponsePayload.hash.in_(unknown))
+    ).scalars())
+    new = [
+        {
+            "hash": payload_hash,
+            "encoding": "zlib",
+            "data": zlib.compress(payloads[payload_hash], PAYLOAD_COMPRESSION_LEVEL),
+            "size": len(payloads[payload_hash]),
+            "created_at": datetime.utcnow(),
+        }
+        for payload_hash in unknown if payload_hash not in existing
+    ]
+    if not new:
+        return new
+    
+    # Another writer may store the same payload between the check and the insert
+    dialect_insert = _dialect_insert(conn.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(ResponsePayload.__table__).on_conflict_do_nothing(index_elements=['hash'])
+    else:
+        statement = insert(ResponsePayload.__table__)
+    conn.execute(statement, new)
+    return new
+
+def _bin_record_values(bin_data, source='manual', source_url=None):
+    """
+    Map BIN check result data to bin_records column values
+    
+    Args:
+        bin_data (dict): BIN check result data; a 'source_url' key overrides
+            the batch-wide source_url for this row
+        source (str): 'manual', 'scraper', 'bulk' or 'file_scan'
+        source_url (str): URL if source is 'scraper', file URL if 'file_scan'
+        
+    Returns:
+        tuple: (column values for a BinRecord row, (hash, canonical JSON) of its API response)
+    """
+    if not bin_data.get('BIN'):
+        raise ValueError("BIN is required")
+    
+    payload_hash, payload = _canonical_payload(bin_data.get('raw_response', {}))
+    
+    return {
+        "bin_number": bin_data.get('BIN'),
+        "ip_address": bin_data.get('ip_address', '0.0.0.0'),
+        "scheme": bin_data.get('Scheme', 'Unknown'),
+        "card_type": bin_data.get('Type', 'Unknown'),
+        "country": bin_data.get('Country', 'Unknown'),
+        "issuer": bin_data.get('Issuer', 'Unknown'),
+        "ip_country": bin_data.get('IP Location', 'Unknown'),
+        "is_3ds": bin_data.get('is3DS', False),
+        "risk_level": bin_data.get('Risk Level', 'Unknown'),
+        "fraud_context": bin_data.get('fraud_context', False),
+        "payload_hash": payload_hash,
+        "checked_at": datetime.utcnow(),
+        "source": source,
+        "source_url": bin_data.get('source_url', source_url)
+    }, (payload_hash, payload)
+
+def _bin_metadata_values(values, response):
+    """
+    Reduce one bin_records row to a bin_metadata update
+    
+    Fields the row doesn't know ('Unknown', empty, or everything when the
+    lookup failed) are None, so merging it keeps the previous values.
+    
+    Args:
+        values (dict): bin_records column values, see _bin_record_values
+        response (dict): The API response stored with the row
+        
+    Returns:
+        dict: bin_metadata column values
+    """
+    succeeded = isinstance(response, dict) and 'error' not in response
+    entry = {
+        "bin_number": values["bin_number"],
+        "is_3ds": values["is_3ds"] if succeeded else None,
+        "payload_hash": values.get("payload_hash") if succeeded else None,
+        "first_seen": values["checked_at"],
+        "last_checked": values["checked_at"],
+        "check_count": 1,
+    }
+    for field in ('scheme', 'card_type', 'country', 'issuer', 'risk_level'):
+        value = values.get(field)
+        entry[field] = value if succeeded and value not in (None, '', 'Unknown') else None
+    return entry
+
+def _merge_bin_metadata(current, entry):
+    """Fold a newer bin_metadata update into the current values (in place); mirrors _upsert_bin_metadata"""
+    for field in METADATA_FIELDS:
+        if entry[field] is not None:
+            current[field] = entry[field]
+    current["first_seen"] = min(current["first_seen"], entry["first_seen"])
+    current["last_checked"] = max(current["last_checked"], entry["last_checked"])
+    current["check_count"] += entry["check_count"]
+    return current
+
+def _fold_bin_metadata(entries):
+    """Merge updates for the same BIN, oldest first; returns one entry per BIN"""
+    folded = {}
+    for entry in entries:
+        current = folded.get(entry["bin_number"])
+        if current is None:
+            folded[entry["bin_number"]] = dict(entry)
+        else:
+            _merge_bin_metadata(current, entry)
+    return list(folded.values())
+
+def _bin_metadata_upsert(dialect_name):
+    """The INSERT ... ON CONFLICT merge for bin_metadata, built once per dialect; None if unsupported"""
+    if dialect_name in _metadata_upserts:
+        return _metadata_upserts[dialect_name]
+    
+    dialect_insert = _dialect_insert(dialect_name)
+    if dialect_insert is None:
+        _metadata_upserts[dialect_name] = None
+        return None
+    
+    table = BinMetadata.__table__
+    statement = dialect_insert(table)
+    new = statement.excluded
+    merged = {field: func.coalesce(new[field], table.c[field]) for field in METADATA_FIELDS}
+    merged.update(
+        first_seen=case((table.c.first_seen <= new.first_seen, table.c.first_seen), else_=new.first_seen),
+        last_checked=case((table.c.last_checked >= new.last_checked, table.c.last_checked), else_=new.last_checked),
+        check_count=table.c.check_count + new.check_count,
+    )
+    statement = statement.on_conflict_do_update(index_elements=['bin_number'], set_=merged)
+    _metadata_upserts[dialect_name] = statement
+    return statement
+
+def _upsert_bin_metadata(conn, entries):
+    """
+    Merge bin_metadata updates into the table, inside the caller's transaction
+    
+    Known fields replace the stored ones, unknown (None) fields keep them,
+    and the check count accumulates.
+    
+    Args:
+        conn (Connection): Connection with an open transaction
+        entries (list): Updates from _bin_metadata_values, oldest first
+    """
+    entries = _fold_bin_metadata(entries)
+    if not entries:
+        return
+    
+    statement = _bin_metadata_upsert(conn.dialect.name)
+    if statement is not None:
+        conn.execute(statement, entries)
+        return
+    
+    # Other databases: read, merge and write back
+    table = BinMetadata.__table__
+    keys = [entry["bin_number"] for entry in entries]
+    existing = {
+        row["bin_number"]: dict(row)
+        for row in conn.execute(select(table).where(table.c.bin_number.in_(keys))).mappings()
+    }
+    inserts = [entry for entry in entries if entry["bin_number"] not in existing]
+    updates = [_merge_bin_metadata(existing[entry["bin_number"]], entry)
+               for entry in entries if entry["bin_number"] in existing]
+    if inserts:
+        conn.execute(insert(table), inserts)
+    if updates:
+        conn.execute(
+            update(table).where(table.c.bin_number == bindparam('key')).values(
+                {column: bindparam('new_' + column) for column in updates[0] if column != 'bin_number'}
+            ),
+            [dict({'new_' + column: value for column, value in row.items()}, key=row["bin_number"])
+             for row in updates]
+        )
+
+def _bin_stats_deltas(rows):
+    """
+    Count bin_records rows per bin_stats dimension value
+    
+    Args:
+        rows (list): bin_records column values, see _bin_record_values
+        
+    Returns:
+        list: bin_stats rows with the counts to add
+    """
+    counts = {}
+    for values in rows:
+        for dimension in STATS_DIMENSIONS:
+            if dimension == 'day':
+                value = values["checked_at"].date().isoformat()
+            else:
+                value = values.get(dimension) or 'Unknown'
+            counts[(dimension, value)] = counts.get((dimension, value), 0) + 1
+    
+    return [{"dimension": dimension, "value": value, "count": count}
+            for (dimension, value), count in counts.items()]
+
+def _increment_bin_stats(conn, rows):
+    """Add newly inserted bin_records rows to bin_stats, inside the caller's transaction"""
+    deltas = _bin_stats_deltas(rows)
+    if not deltas:
+        return
+    
+    dialect_name = conn.dialect.name
+    if dialect_name not in _stats_upserts:
+        dialect_insert = _dialect_insert(dialect_name)
+        statement = None
+        if dialect_insert is not None:
+            statement = dialect_insert(BinStat.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['dimension', 'value'],
+                set_={"count": BinStat.__table__.c.count + statement.excluded.count}
+            )
+        _stats_upserts[dialect_name] = statement
+    
+    statement = _stats_upserts[dialect_name]
+    if statement is not None:
+        conn.execute(statement, deltas)
+        return
+    
+    # Other databases: increment the rows that exist, insert the rest
+    table = BinStat.__table__
+    existing = set(conn.execute(
+        select(table.c.dimension, table.c.value).where(
+            tuple_(table.c.dimension, table.c.value).in_([(d["dimension"], d["value"]) for d in deltas])
+        )
+    ).all())
+    inserts = [d for d in deltas if (d["dimension"], d["value"]) not in existing]
+    updates = [
+        {"key_dimension": d["dimension"], "key_value": d["value"], "delta": d["count"]}
+        for d in deltas if (d["dimension"], d["value"]) in existing
+    ]
+    if inserts:
+        conn.execute(insert(table), inserts)
+    if updates:
+        conn.execute(
+            update(table).where(
+                table.c.dimension == bindparam('key_dimension'), table.c.value == bindparam('key_value')
+            ).values(count=table.c.count + bindparam('delta')),
+            updates
+        )
+
+@metrics.timed("bin_db_operation_seconds", operation="add_bin_record")
 def add_bin_record(bin_data, source='manual', source_url=None):
     """
     Add a BIN record to the database
     
     Args:
         bin_data (dict): BIN check result data
-        source (str): 'manual' or 'scraper'
+        source (str): 'manual', 'scraper' or 'bulk'
         source_url (str): URL if source is 'scraper'
         
     Returns:
@@ -59,24 +650,17 @@ def add_bin_record(bin_data, source='manual', source_url=None):
     session = Session()
     
     try:
-        record = BinRecord(
-            bin_number=bin_data.get('BIN'),
-            ip_address=bin_data.get('ip_address', '0.0.0.0'),
-            scheme=bin_data.get('Scheme', 'Unknown'),
-            card_type=bin_data.get('Type', 'Unknown'),
-            country=bin_data.get('Country', 'Unknown'),
-            issuer=bin_data.get('Issuer', 'Unknown'),
-            ip_country=bin_data.get('IP Location', 'Unknown'),
-            is_3ds=bin_data.get('is3DS', False),
-            risk_level=bin_data.get('Risk Level', 'Unknown'),
-            fraud_context=bin_data.get('fraud_context', False),
-            raw_response=json.dumps(bin_data.get('raw_response', {})),
-            source=source,
-            source_url=source_url
-        )
+        values, (payload_hash, payload) = _bin_record_values(bin_data, source, source_url)
+        _store_payloads(session.connection(), {payload_hash: payload})
+        _upsert_bin_metadata(session.connection(),
+                             [_bin_metadata_values(values, bin_data.get('raw_response', {}))])
+        _increment_bin_stats(session.connection(), [values])
+        record = BinRecord(**values)
         
         session.add(record)
         session.commit()
+        _remember_payloads([payload_hash])
+        _bump_write_generation()
         return record
     
     except Exception as e:
@@ -86,6 +670,78 @@ def add_bin_record(bin_data, source='manual', source_url=None):
     finally:
         session.close()
 
+@metrics.timed("bin_db_operation_seconds", operation="add_bin_records")
+def add_bin_records(bin_data_list, source='manual', source_url=None):
+    """
+    Add many BIN records in a single transaction
+    
+    Rows are inserted with one executemany. If the database rejects the
+    batch, rows are retried one by one inside the same transaction (each
+    under its own savepoint) so only the offending rows are skipped. API
+    responses go to response_payloads, each distinct one stored once, and
+    bin_metadata and bin_stats are updated from the inserted rows in the
+    same transaction.
+    
+    Args:
+        bin_data_list (iterable): BIN check result data dicts
+        source (str): 'manual', 'scraper', 'bulk' or 'file_scan'
+        source_url (str): URL if source is 'scraper'
+        
+    Returns:
+        tuple: (inserted, errors) where inserted is the number of rows
+        written and errors is a list of (index, message) for rejected rows
+    """
+    rows = []
+    payloads = {}
+    errors = []
+    
+    for index, bin_data in enumerate(bin_data_list):
+        try:
+            values, (payload_hash, payload) = _bin_record_values(bin_data, source, source_url)
+        except Exception as e:
+            errors.append((index, str(e)))
+            continue
+        rows.append((index, values, _bin_metadata_values(values, bin_data.get('raw_response', {}))))
+        payloads[payload_hash] = payload
+    
+    if not rows:
+        return 0, errors
+    
+    statement = insert(BinRecord.__table__)
+    inserted = 0
+    
+    with engine.begin() as conn:
+        # Identical responses (within the batch or already stored) are kept once
+        _store_payloads(conn, payloads)
+        
+        try:
+            with conn.begin_nested():
+                conn.execute(statement, [values for _, values, _ in rows])
+            saved = rows
+        
+        except exc.DBAPIError:
+            saved = []
+            for row in rows:
+                index, values, _ = row
+                try:
+                    with conn.begin_nested():
+                        conn.execute(statement, values)
+                    saved.append(row)
+                except exc.DBAPIError as e:
+                    errors.append((index, str(e.orig)))
+        
+        _upsert_bin_metadata(conn, [entry for _, _, entry in saved])
+        _increment_bin_stats(conn, [values for _, values, _ in saved])
+        inserted = len(saved)
+    
+    _remember_payloads(payloads)
+    if inserted:
+        _bump_write_generation()
+    
+    errors.sort()
+    return inserted, errors
+
+@metrics.timed("bin_db_operation_seconds", operation="add_threshold_record")
 def add_threshold_record(bin_number, amount, triggered):
     """
     Add a threshold testing record to the database
@@ -109,6 +765,7 @@ def add_threshold_record(bin_number, amount, triggered):
         
         session.add(record)
         session.commit()
+        _bump_write_generation()
         return record
     
     except Exception as e:
@@ -118,6 +775,7 @@ def add_threshold_record(bin_number, amount, triggered):
     finally:
         session.close()
 
+@metrics.timed("bin_db_operation_seconds", operation="get_bin_records")
 def get_bin_records(limit=100):
     """
     Get the most recent BIN records
@@ -137,6 +795,257 @@ def get_bin_records(limit=100):
     finally:
         session.close()
 
+def _match_values(column, values):
+    """Match any of values, with 'Unknown' also matching NULL and '' as bin_stats counts them"""
+    if 'Unknown' in values:
+        return or_(column.in_(values), column.is_(None), column == '')
+    return column.in_(values)
+
+def _bin_record_filters(schemes=None, risk_levels=None, countries=None, bin_prefix=None):
+    """Build WHERE clauses for the history filters"""
+    conditions = []
+    
+    if schemes:
+        conditions.append(_match_values(BinRecord.scheme, schemes))
+    if risk_levels:
+        conditions.append(_match_values(BinRecord.risk_level, risk_levels))
+    if countries:
+        conditions.append(_match_values(BinRecord.country, countries))
+    if bin_prefix:
+        # A range rather than LIKE so SQLite can use the bin_number index
+        upper = bin_prefix[:-1] + chr(ord(bin_prefix[-1]) + 1)
+        conditions.append(BinRecord.bin_number >= bin_prefix)
+        conditions.append(BinRecord.bin_number < upper)
+    
+    return conditions
+
+@metrics.timed("bin_db_operation_seconds", operation="query_bin_records")
+def query_bin_records(schemes=None, risk_levels=None, countries=None, bin_prefix=None,
+                      limit=100, after=None):
+    """
+    Get one page of BIN records, newest first, with filters applied in SQL
+    
+    Pages are addressed by keyset rather than OFFSET: pass the cursor
+    returned for one page as `after` to get the next, so every page costs
+    the same regardless of how deep into the history it is.
+    
+    Args:
+        schemes (list, optional): Only include these schemes
+        risk_levels (list, optional): Only include these risk levels
+        countries (list, optional): Only include these countries
+        bin_prefix (str, optional): Only include BINs starting with this prefix
+        limit (int): Maximum number of records to return
+        after (tuple, optional): (checked_at, id) cursor of the previous page's last row
+        
+    Returns:
+        tuple: (records, next_cursor) where records is a list of BinRecord
+        objects and next_cursor is None on the last page
+    """
+    session = Session()
+    
+    try:
+        query = session.query(BinRecord).filter(
+            *_bin_record_filters(schemes, risk_levels, countries, bin_prefix)
+        )
+        
+        if after is not None:
+            query = query.filter(tuple_(BinRecord.checked_at, BinRecord.id) < tuple_(*after))
+        
+        # Fetch one extra row to learn whether another page exists
+        records = query.order_by(
+            BinRecord.checked_at.desc(), BinRecord.id.desc()
+        ).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = (records[-1].checked_at, records[-1].id)
+        
+        return records, next_cursor
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="load_bin_records_frame")
+def load_bin_records_frame(schemes=None, risk_levels=None, countries=None, bin_prefix=None,
+                           limit=100, after=None):
+    """
+    Load one page of BIN records straight into a typed DataFrame
+    
+    Same filters and keyset paging as query_bin_records, but only the
+    columns the history view needs are selected and no ORM objects are
+    built. Missing card type / IP country values are filled from the
+    stored API response: legacy raw_response JSON with SQLite's
+    json_extract, which only runs for rows where the column itself is
+    empty, and response_payloads blobs by decoding just the distinct
+    payloads those rows reference.
+    
+    Args:
+        schemes (list, optional): Only include these schemes
+        risk_levels (list, optional): Only include these risk levels
+        countries (list, optional): Only include these countries
+        bin_prefix (str, optional): Only include BINs starting with this prefix
+        limit (int): Maximum number of records to return
+        after (tuple, optional): (checked_at, id) cursor of the previous page's last row
+        
+    Returns:
+        tuple: (DataFrame, next_cursor) where next_cursor is None on the last page
+    """
+    import pandas as pd
+    
+    fallback_keys = {"card_type": "cardType", "ip_country": "ipCountry"}
+    
+    def with_fallback(column, json_key):
+        column = func.nullif(column, '')
+        if engine.dialect.name != 'sqlite':
+            return column
+        # COALESCE short-circuits, so the JSON is only parsed when the column is empty
+        extracted = case(
+            (func.json_valid(BinRecord.raw_response), func.json_extract(BinRecord.raw_response, f'$.{json_key}'))
+        )
+        return func.coalesce(column, extracted)
+    
+    # Dates and booleans are fetched raw and converted column-wise by pandas
+    # instead of per row by SQLAlchemy's result processors
+    statement = select(
+        BinRecord.id,
+        BinRecord.bin_number,
+        type_coerce(BinRecord.checked_at, String).label('checked_at'),
+        BinRecord.scheme,
+        with_fallback(BinRecord.card_type, 'cardType').label('card_type'),
+        BinRecord.country,
+        with_fallback(BinRecord.ip_country, 'ipCountry').label('ip_country'),
+        BinRecord.issuer,
+        type_coerce(BinRecord.is_3ds, Integer).label('is_3ds'),
+        BinRecord.risk_level,
+        BinRecord.source,
+        BinRecord.ip_address,
+        BinRecord.source_url,
+        type_coerce(BinRecord.fraud_context, Integer).label('fraud_context'),
+        BinRecord.payload_hash,
+    ).where(*_bin_record_filters(schemes, risk_levels, countries, bin_prefix))
+    
+    if after is not None:
+        statement = statement.where(tuple_(BinRecord.checked_at, BinRecord.id) < tuple_(*after))
+    
+    # Fetch one extra row to learn whether another page exists
+    statement = statement.order_by(BinRecord.checked_at.desc(), BinRecord.id.desc()).limit(limit + 1)
+    
+    with engine.connect() as conn:
+        result = conn.execute(statement)
+        df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        
+        missing = df[list(fallback_keys)].isna().any(axis=1) & df["payload_hash"].notna()
+        if missing.any():
+            responses = _load_payloads(conn, df.loc[missing, "payload_hash"].unique().tolist())
+            for column, json_key in fallback_keys.items():
+                rows = missing & df[column].isna()
+                df.loc[rows, column] = df.loc[rows, "payload_hash"].map(
+                    lambda payload_hash: responses.get(payload_hash, {}).get(json_key)
+                )
+    
+    df = df.drop(columns="payload_hash")
+    for column in fallback_keys:
+        df[column] = df[column].fillna('Unknown').astype(str)
+    df["checked_at"] = pd.to_datetime(df["checked_at"], format="ISO8601")
+    df["is_3ds"] = df["is_3ds"].fillna(0).astype(bool)
+    df["fraud_context"] = df["fraud_context"].fillna(0).astype(bool)
+    
+    next_cursor = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        next_cursor = (df["checked_at"].iloc[-1].to_pydatetime(), int(df["id"].iloc[-1]))
+    
+    return df, next_cursor
+
+def _load_payloads(conn, hashes):
+    """Decode the given response_payloads rows; returns hash -> response dict"""
+    rows = conn.execute(
+        select(ResponsePayload.hash, ResponsePayload.encoding, ResponsePayload.data)
+        .where(ResponsePayload.hash.in_(hashes))
+    )
+    return {payload_hash: decode_payload(encoding, data) for payload_hash, encoding, data in rows}
+
+@metrics.timed("bin_db_operation_seconds", operation="get_bin_record_filter_options")
+def get_bin_record_filter_options():
+    """
+    Get the distinct values available for the history filters
+    
+    Read from bin_stats, so the cost doesn't grow with the history.
+    Records with no value are offered as 'Unknown', which the query
+    filters match against NULL and empty columns.
+    
+    Returns:
+        dict: Sorted 'schemes', 'risk_levels' and 'countries' lists
+    """
+    stats = get_bin_stats()
+    return {
+        key: sorted(value for value, _ in stats[dimension])
+        for key, dimension in (("schemes", "scheme"), ("risk_levels", "risk_level"), ("countries", "country"))
+    }
+
+@metrics.timed("bin_db_operation_seconds", operation="get_bin_stats")
+def get_bin_stats(days=None):
+    """
+    Get bin_records counts per scheme, country, risk level, source and day
+    
+    One read of the bin_stats rollup, however long the history is.
+    
+    Args:
+        days (int, optional): Only return the most recent days that have records
+        
+    Returns:
+        dict: dimension -> list of (value, count), largest count first, or
+        oldest first for 'day'; 'total' -> number of records
+    """
+    stats = {dimension: [] for dimension in STATS_DIMENSIONS}
+    
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(BinStat.dimension, BinStat.value, BinStat.count).where(BinStat.count > 0)
+        ).all()
+    
+    for dimension, value, count in rows:
+        if dimension in stats:
+            stats[dimension].append((value, count))
+    
+    for dimension in STATS_DIMENSIONS:
+        if dimension == 'day':
+            stats[dimension].sort()
+            if days is not None:
+                stats[dimension] = stats[dimension][-days:] if days > 0 else []
+        else:
+            stats[dimension].sort(key=lambda item: (-item[1], item[0]))
+    
+    stats["total"] = sum(count for _, count in stats["source"])
+    return stats
+
+@metrics.timed("bin_db_operation_seconds", operation="get_latest_bin_metadata")
+def get_latest_bin_metadata():
+    """
+    Get the latest known metadata for every BIN with a known scheme
+    
+    Read from bin_metadata, so it doesn't scan the history. Full card
+    numbers are reduced to their 8-digit prefix.
+    
+    Returns:
+        list: (prefix, metadata dict) tuples, least recently checked first,
+        with scheme, country, issuer and cardType keys
+    """
+    statement = select(
+        BinMetadata.bin_number, BinMetadata.scheme, BinMetadata.country, BinMetadata.issuer, BinMetadata.card_type
+    ).where(
+        BinMetadata.scheme.isnot(None)
+    ).order_by(BinMetadata.last_checked, BinMetadata.bin_number)
+    
+    with engine.connect() as conn:
+        return [
+            (bin_number[:8], {"scheme": scheme, "country": country or 'Unknown', "issuer": issuer or 'Unknown',
+                              "cardType": card_type or 'Unknown'})
+            for bin_number, scheme, country, issuer, card_type in conn.execute(statement)
+        ]
+
+@metrics.timed("bin_db_operation_seconds", operation="get_bin_history")
 def get_bin_history(bin_number):
     """
     Get all records for a specific BIN number
@@ -159,6 +1068,68 @@ def get_bin_history(bin_number):
     finally:
         session.close()
 
+@metrics.timed("bin_db_operation_seconds", operation="get_bin_metadata")
+def get_bin_metadata(bin_number):
+    """
+    Get the latest known state of a BIN without reading its history
+    
+    Args:
+        bin_number (str): BIN number as recorded
+        
+    Returns:
+        BinMetadata: The BIN's state, or None if it was never recorded
+    """
+    session = Session()
+    
+    try:
+        return session.get(BinMetadata, bin_number)
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="query_bin_metadata")
+def query_bin_metadata(schemes=None, countries=None, bin_prefix=None, limit=100, after=None):
+    """
+    Get one page of known BINs in BIN order, optionally by scheme / country
+    
+    Args:
+        schemes (list, optional): Only include these schemes
+        countries (list, optional): Only include these countries
+        bin_prefix (str, optional): Only include BINs starting with this prefix
+        limit (int): Maximum number of BINs to return
+        after (str, optional): Last BIN of the previous page
+        
+    Returns:
+        tuple: (states, next_cursor) where states is a list of BinMetadata
+        objects and next_cursor is None on the last page
+    """
+    session = Session()
+    
+    try:
+        query = session.query(BinMetadata)
+        if schemes:
+            query = query.filter(BinMetadata.scheme.in_(schemes))
+        if countries:
+            query = query.filter(BinMetadata.country.in_(countries))
+        if bin_prefix:
+            upper = bin_prefix[:-1] + chr(ord(bin_prefix[-1]) + 1)
+            query = query.filter(BinMetadata.bin_number >= bin_prefix, BinMetadata.bin_number < upper)
+        if after is not None:
+            query = query.filter(BinMetadata.bin_number > after)
+        
+        states = query.order_by(BinMetadata.bin_number).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(states) > limit:
+            states = states[:limit]
+            next_cursor = states[-1].bin_number
+        
+        return states, next_cursor
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="get_threshold_records")
 def get_threshold_records(bin_number):
     """
     Get all threshold testing records for a specific BIN
@@ -181,5 +1152,380 @@ def get_threshold_records(bin_number):
     finally:
         session.close()
 
-# Initialize the database when the module is imported
-init_db()
\ No newline at end of file
+@metrics.timed("bin_db_operation_seconds", operation="get_cached_lookup")
+def get_cached_lookup(cache_key, now=None, with_expiry=False):
+    """
+    Get a cached API response if it has not expired
+    
+    Args:
+        cache_key (str): Hashed cache key
+        now (datetime, optional): Current time, defaults to utcnow
+        with_expiry (bool): Also return when the entry expires
+        
+    Returns:
+        dict: The cached response, or None on a miss; with_expiry returns
+        (response, expires_at) instead, or None on a miss
+    """
+    session = Session()
+    
+    try:
+        entry = session.query(LookupCacheEntry).filter(
+            LookupCacheEntry.cache_key == cache_key,
+            LookupCacheEntry.expires_at > (now or datetime.utcnow())
+        ).first()
+        
+        if entry is None:
+            return None
+        if with_expiry:
+            return json.loads(entry.response), entry.expires_at
+        return json.loads(entry.response)
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="set_cached_lookup")
+def set_cached_lookup(cache_key, response, expires_at):
+    """
+    Store (or replace) a cached API response
+    
+    Args:
+        cache_key (str): Hashed cache key
+        response (dict): API response to cache
+        expires_at (datetime): When the entry stops being served
+    """
+    session = Session()
+    
+    try:
+        session.merge(LookupCacheEntry(
+            cache_key=cache_key,
+            response=json.dumps(response),
+            created_at=datetime.utcnow(),
+            expires_at=expires_at
+        ))
+        session.commit()
+    
+    except Exception as e:
+        session.rollback()
+        raise e
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="prune_lookup_cache")
+def prune_lookup_cache(max_entries, now=None):
+    """
+    Remove expired cache entries and trim the table to the newest max_entries rows
+    
+    Args:
+        max_entries (int): Maximum number of entries to keep
+        now (datetime, optional): Current time, defaults to utcnow
+        
+    Returns:
+        int: Number of entries removed
+    """
+    session = Session()
+    
+    try:
+        removed = session.query(LookupCacheEntry).filter(
+            LookupCacheEntry.expires_at <= (now or datetime.utcnow())
+        ).delete(synchronize_session=False)
+        
+        overflow = session.query(LookupCacheEntry.cache_key).order_by(
+            LookupCacheEntry.created_at.desc()
+        ).offset(max_entries).subquery()
+        removed += session.query(LookupCacheEntry).filter(
+            LookupCacheEntry.cache_key.in_(overflow.select())
+        ).delete(synchronize_session=False)
+        
+        session.commit()
+        return removed
+    
+    except Exception as e:
+        session.rollback()
+        raise e
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="get_scraped_page")
+def get_scraped_page(url, ip_address=None):
+    """
+    Get the stored outcome of the last scan of a URL
+    
+    Args:
+        url (str): Scraped URL
+        ip_address (str, optional): IP address the scan used for lookups
+        
+    Returns:
+        dict: etag, last_modified, content_hash, results, scanned_at,
+        candidates, rejected, max_lookups and min_confidence, or None
+    """
+    session = Session()
+    
+    try:
+        page = session.get(ScrapedPage, (url, ip_address or ''))
+        if page is None:
+            return None
+        
+        return {
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "content_hash": page.content_hash,
+            "results": json.loads(page.results),
+            "scanned_at": page.scanned_at,
+            "candidates": page.candidates,
+            "rejected": page.rejected,
+            "max_lookups": page.max_lookups,
+            "min_confidence": page.min_confidence,
+        }
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="save_scraped_page")
+def save_scraped_page(url, ip_address, etag, last_modified, content_hash, results,
+                      candidates=None, rejected=None, max_lookups=None, min_confidence=None):
+    """
+    Store (or replace) the outcome of a URL scan
+    
+    Args:
+        url (str): Scraped URL
+        ip_address (str): IP address the scan used for lookups (may be None)
+        etag (str): ETag response header, if any
+        last_modified (str): Last-Modified response header, if any
+        content_hash (str): sha256 hex digest of the downloaded bytes
+        results (list): Scraper result dicts
+        candidates (int, optional): Confident candidates the scan found
+        rejected (int, optional): Low-confidence candidates it skipped
+        max_lookups (int, optional): Lookup budget the scan ran with
+        min_confidence (float, optional): Candidate threshold the scan ran with
+    """
+    session = Session()
+    
+    try:
+        session.merge(ScrapedPage(
+            url=url,
+            ip_address=ip_address or '',
+            etag=etag,
+            last_modified=last_modified,
+            content_hash=content_hash,
+            results=json.dumps(results),
+            scanned_at=datetime.utcnow(),
+            candidates=candidates,
+            rejected=rejected,
+            max_lookups=max_lookups,
+            min_confidence=min_confidence
+        ))
+        session.commit()
+    
+    except Exception as e:
+        session.rollback()
+        raise e
+    
+    finally:
+        session.close()
+
+@metrics.timed("bin_db_operation_seconds", operation="migrate_raw_responses")
+def migrate_raw_responses(batch_size=1000):
+    """
+    Move legacy raw_response JSON into response_payloads
+    
+    Each row's response is stored once per distinct content, the row is
+    pointed at it with payload_hash and its raw_response is cleared. Rows
+    are processed in id order, one transaction per batch, so the migration
+    can run while the app is in use and can be interrupted and resumed.
+    Rows whose raw_response isn't valid JSON are left as they are.
+    
+    SQLite only returns the freed space to the file system after VACUUM
+    (see vacuum_db).
+    
+    Args:
+        batch_size (int): Rows per transaction
+        
+    Returns:
+        dict: 'rows' migrated, 'payloads' created, 'skipped' rows, and
+        'bytes_before' / 'bytes_after' for the JSON moved and the blobs created
+    """
+    report = {"rows": 0, "payloads": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    
+    move = update(BinRecord.__table__).where(BinRecord.id == bindparam('row_id')).values(
+        payload_hash=bindparam('row_hash'), raw_response=None
+    )
+    
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(BinRecord.id, BinRecord.raw_response).where(
+                    BinRecord.id > last_id,
+                    BinRecord.raw_response.isnot(None),
+                    BinRecord.payload_hash.is_(None)
+                ).order_by(BinRecord.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            
+            payloads = {}
+            updates = []
+            for row_id, raw_response in rows:
+                try:
+                    payload_hash, payload = _canonical_payload(json.loads(raw_response))
+                except ValueError:
+                    report["skipped"] += 1
+                    continue
+                payloads[payload_hash] = payload
+                updates.append({"row_id": row_id, "row_hash": payload_hash})
+                report["bytes_before"] += len(raw_response.encode('utf-8'))
+            
+            if not updates:
+                continue
+            
+            new = _store_payloads(conn, payloads)
+            conn.execute(move, updates)
+        
+        _remember_payloads(payloads)
+        report["rows"] += len(updates)
+        report["payloads"] += len(new)
+        report["bytes_after"] += sum(len(payload["data"]) for payload in new)
+    
+    return report
+
+@metrics.timed("bin_db_operation_seconds", operation="get_payload_stats")
+def get_payload_stats():
+    """
+    Summarize how API responses are stored
+    
+    Returns:
+        dict: 'payloads' (distinct stored responses), 'compressed_bytes',
+        'uncompressed_bytes', 'referencing_rows' and 'legacy_rows' still
+        holding raw_response JSON
+    """
+    with engine.connect() as conn:
+        payloads, compressed, uncompressed = conn.execute(
+            select(func.count(), func.coalesce(func.sum(func.length(ResponsePayload.data)), 0),
+                   func.coalesce(func.sum(ResponsePayload.size), 0))
+        ).one()
+        referencing = conn.execute(
+            select(func.count()).select_from(BinRecord).where(BinRecord.payload_hash.isnot(None))
+        ).scalar()
+        legacy = conn.execute(
+            select(func.count()).select_from(BinRecord).where(BinRecord.raw_response.isnot(None))
+        ).scalar()
+    
+    return {
+        "payloads": payloads,
+        "compressed_bytes": compressed,
+        "uncompressed_bytes": uncompressed,
+        "referencing_rows": referencing,
+        "legacy_rows": legacy,
+    }
+
+@metrics.timed("bin_db_operation_seconds", operation="rebuild_bin_metadata")
+def rebuild_bin_metadata(batch_size=5000):
+    """
+    Recompute bin_metadata from the whole bin_records history
+    
+    init_db() runs this once for databases created before bin_metadata
+    existed. Rows are replayed in id order with the same merge rules as
+    live writes, all in one transaction.
+    
+    Args:
+        batch_size (int): Rows read per query
+        
+    Returns:
+        int: Number of BINs in bin_metadata afterwards
+    """
+    responses = {}  # payload_hash -> decoded response
+    folded = {}
+    last_id = 0
+    
+    with engine.begin() as conn:
+        columns = [BinRecord.id, BinRecord.bin_number, BinRecord.scheme, BinRecord.card_type, BinRecord.country,
+                   BinRecord.issuer, BinRecord.is_3ds, BinRecord.risk_level, BinRecord.checked_at,
+                   BinRecord.payload_hash, BinRecord.raw_response]
+        
+        while True:
+            rows = conn.execute(
+                select(*columns).where(BinRecord.id > last_id).order_by(BinRecord.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            
+            missing = {row["payload_hash"] for row in rows if row["payload_hash"]} - responses.keys()
+            if missing:
+                responses.update(_load_payloads(conn, missing))
+            
+            for row in rows:
+                if row["payload_hash"]:
+                    response = responses.get(row["payload_hash"], {})
+                else:
+                    try:
+                        response = json.loads(row["raw_response"] or '{}')
+                    except ValueError:
+                        response = {}
+                
+                entry = _bin_metadata_values(dict(row, checked_at=row["checked_at"] or datetime.utcnow()), response)
+                current = folded.get(entry["bin_number"])
+                if current is None:
+                    folded[entry["bin_number"]] = entry
+                else:
+                    _merge_bin_metadata(current, entry)
+        
+        conn.execute(BinMetadata.__table__.delete())
+        states = list(folded.values())
+        for offset in range(0, len(states), batch_size):
+            conn.execute(insert(BinMetadata.__table__), states[offset:offset + batch_size])
+    
+    return len(folded)
+
+@metrics.timed("bin_db_operation_seconds", operation="rebuild_bin_stats")
+def rebuild_bin_stats():
+    """
+    Recompute bin_stats from the whole bin_records history
+    
+    init_db() runs this once for databases created before bin_stats
+    existed; one GROUP BY per dimension, in a single transaction.
+    
+    Returns:
+        int: Number of bin_records rows counted
+    """
+    table = BinStat.__table__
+    
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        for dimension in STATS_DIMENSIONS:
+            if dimension == 'day':
+                column = func.date(BinRecord.checked_at)
+            else:
+                column = getattr(BinRecord, dimension)
+            value = func.coalesce(func.nullif(column, ''), 'Unknown')
+            conn.execute(insert(table).from_select(
+                ['dimension', 'value', 'count'],
+                select(type_coerce(dimension, String), value, func.count()).group_by(value)
+            ))
+        
+        return conn.execute(
+            select(func.coalesce(func.sum(table.c.count), 0)).where(table.c.dimension == 'source')
+        ).scalar()
+
+def vacuum_db():
+    """
+    Rebuild an SQLite database file so space freed by deletes and migrations is returned
+    
+    Blocks other writers while it runs. Does nothing on other databases.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    
+    # VACUUM can't run inside a transaction; pooled SQLite connections are in autocommit mode
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("VACUUM")
+        cursor.close()
+    finally:
+        connection.close()
+
+configure_engine()
@@ -0,0 +1,404 @@
+"""
+Scan local files (log exports, CSV dumps, support-ticket archives) for
+leaked card numbers, using the scraper's candidate scoring.
+
+Files are memory-mapped and split into spans that a process pool scans
+in parallel. Within a span, numpy checks a few byte offsets from every
+position so the candidate regex only runs where a card number could
+start; everything else is skipped at memory speed. Findings are masked
+inside the workers, so full card numbers never leave them, and are
+written to bin_records in bulk with source='file_scan'.
+
+Usage:
+    python file_scanner.py /path/to/exports --jsonl findings.jsonl
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from candidates import CANDIDATE_PATTERN, CONTEXT_CHARS, SHORT_BASE_CONFIDENCE, score_match
+
+# Bytes handed to a worker at a time, and tested per numpy pass within it
+SPAN_BYTES = int(os.environ.get('BIN_SCAN_SPAN_BYTES', 64 * 1024 * 1024))
+BLOCK_BYTES = 1024 * 1024
+
+DEFAULT_WORKERS = int(os.environ.get('BIN_SCAN_WORKERS', os.cpu_count() or 1))
+DEFAULT_MIN_CONFIDENCE = float(os.environ.get('BIN_SCAN_MIN_CONFIDENCE', 0.6))
+
+BYTES_PATTERN = re.compile(CANDIDATE_PATTERN.pattern.encode('ascii'))
+
+# Offsets from a match's first byte that must hold digits: every card
+# number the pattern accepts (plain, 4-4-4-4(-3) or 4-6-5) has a 4-digit
+# first group and digits 5, 10 and 12 bytes in; every bare BIN has 6
+PAN_PROBE = (0, 1, 2, 3, 5, 10, 12)
+BIN_PROBE = (0, 1, 2, 3, 4, 5)
+
+# Substrings of every word POSITIVE_CONTEXT accepts, so a search for them
+# finds at least every place it would match; a bare BIN can only clear a
+# threshold above SHORT_BASE_CONFIDENCE with one of these nearby
+CUE_WORDS = (
+    b"bin", b"iin", b"card", b"cc", b"credit", b"debit", b"prepaid", b"visa", b"mc",
+    b"amex", b"discover", b"jcb", b"maestro", b"unionpay", b"issuer", b"bank", b"cvv",
+    b"exp",
+)
+
+# The run of digits, and separators followed by digits, starting at a position
+CHAIN_PATTERN = re.compile(rb'(?:\d|[ -](?=\d))*')
+
+def mask_number(digits):
+    """
+    Mask a card number for storage and display, keeping the BIN and last four.
+
+    Args:
+        digits (str): Card number or BIN digits
+
+    Returns:
+        str: e.g. 411111******1111; numbers too short to be a card number are returned as-is
+    """
+    if len(digits) < 13:
+        return digits
+    return digits[:6] + "*" * (len(digits) - 10) + digits[-4:]
+
+def iter_files(paths, extensions=None):
+    """
+    Walk files and directories, yielding the non-empty regular files to scan.
+
+    Args:
+        paths (iterable): Files and/or directories
+        extensions (iterable, optional): Only include files with these suffixes (e.g. ".log")
+
+    Yields:
+        tuple: (path, size in bytes)
+    """
+    suffixes = tuple(ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions or ())
+
+    def wanted(path):
+        return not suffixes or path.lower().endswith(suffixes)
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    if wanted(file_path) and not os.path.islink(file_path):
+                        size = os.path.getsize(file_path)
+                        if size:
+                            yield file_path, size
+        elif os.path.isfile(path) and wanted(path):
+            size = os.path.getsize(path)
+            if size:
+                yield path, size
+
+def _probe_positions(buffer, start, end, probes):
+    """
+    Offsets in [start, end) where a match could begin, found with numpy.
+
+    A position qualifies if, for any of the probes, every offset from it
+    holds a digit (and the probe's mask, if any, is set there), which rules
+    out almost all of a typical file at memory speed.
+
+    Args:
+        probes (iterable): (offsets, mask) pairs; mask is a bool array over
+            [start, end) or None
+    """
+    probes = list(probes)
+    reach = max(max(offsets) for offsets, _ in probes)
+    stop = min(len(buffer), end + reach)
+    if stop - start <= min(max(offsets) for offsets, _ in probes):
+        return []
+
+    data = np.frombuffer(buffer, dtype=np.uint8, count=stop - start, offset=start)
+    # Pad so every probe can be tested at every position up to end
+    is_digit = np.zeros(end - start + reach, dtype=bool)
+    is_digit[:len(data)] = (data - np.uint8(48)) < 10
+
+    width = end - start
+    hits = np.zeros(width, dtype=bool)
+    for offsets, mask in probes:
+        probe_hits = is_digit[offsets[0]:offsets[0] + width].copy()
+        for offset in offsets[1:]:
+            probe_hits &= is_digit[offset:offset + width]
+        if mask is not None:
+            probe_hits &= mask
+        hits |= probe_hits
+
+    if not hits.any():
+        return []
+    return (np.flatnonzero(hits) + start).tolist()
+
+def _cue_mask(buffer, start, end):
+    """
+    Positions in [start, end) where a bare BIN would have card wording in
+    its context window.
+    """
+    # A BIN (at most 8 digits) can start up to CONTEXT_CHARS + 8 bytes
+    # before a cue in its trailing context, or CONTEXT_CHARS after one
+    # in its leading context
+    lead, trail = CONTEXT_CHARS + 8, CONTEXT_CHARS
+    mask = np.zeros(end - start, dtype=bool)
+    window_start = max(0, start - trail)
+    window = buffer[window_start:end + lead].lower()
+    for word in CUE_WORDS:
+        found = window.find(word)
+        while found != -1:
+            cue = window_start + found - start
+            mask[max(cue - lead, 0):max(cue + trail + 1, 0)] = True
+            found = window.find(word, found + 1)
+    return mask
+
+def _chain_start(buffer, position):
+    """
+    Walk back from position to the start of the digit/separator chain it is in.
+
+    Matching from the chain start reproduces how a scan of the whole file
+    would split grouped numbers.
+    """
+    while position > 0:
+        previous = buffer[position - 1]
+        if 48 <= previous <= 57 or (previous in b" -" and position > 1 and 48 <= buffer[position - 2] <= 57):
+            position -= 1
+        else:
+            break
+    return position
+
+def scan_span(task):
+    """
+    Scan one span of a file. Runs in a worker process.
+
+    Args:
+        task (tuple): (path, start, end, include_bins, min_confidence)
+
+    Returns:
+        tuple: (list of masked finding dicts, bytes scanned)
+    """
+    path, start, end, include_bins, min_confidence = task
+    # Bare BINs only clear a threshold above the base score with card wording nearby
+    bins_need_cue = min_confidence > SHORT_BASE_CONFIDENCE
+    findings = []
+
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        size = len(buffer)
+        end = min(end, size)
+        chain_end = 0
+
+        for block_start in range(start, end, BLOCK_BYTES):
+            block_end = min(block_start + BLOCK_BYTES, end)
+
+            probes = [(PAN_PROBE, None)]
+            if include_bins:
+                cues = _cue_mask(buffer, block_start, block_end) if bins_need_cue else None
+                probes.append((BIN_PROBE, cues))
+
+            for position in _probe_positions(buffer, block_start, block_end, probes):
+                if position < chain_end:
+                    continue  # already matched as part of an earlier chain
+
+                chain_start = _chain_start(buffer, position)
+                chain_end = CHAIN_PATTERN.match(buffer, position).end()
+
+                # One byte past the chain lets the pattern's (?!\d) see real text
+                for match in BYTES_PATTERN.finditer(buffer, chain_start, min(size, chain_end + 1)):
+                    # Matches starting before this span belong to the previous one
+                    if not start <= match.start() < end:
+                        continue
+
+                    text = match.group().decode("ascii")
+                    digits = text.replace(" ", "").replace("-", "")
+                    if len(digits) <= 8 and not include_bins:
+                        continue
+
+                    before = buffer[max(0, match.start() - CONTEXT_CHARS):match.start()]
+                    after = buffer[match.end():match.end() + CONTEXT_CHARS]
+                    candidate = score_match(text, before.decode("latin-1"), after.decode("latin-1"))
+                    if candidate is None or candidate["confidence"] < min_confidence:
+                        continue
+
+                    candidate.update(path=path, offset=match.start(), masked=mask_number(digits))
+                    findings.append(candidate)
+    finally:
+        buffer.close()
+
+    return findings, end - start
+
+def scan_paths(paths, workers=DEFAULT_WORKERS, span_bytes=SPAN_BYTES, include_bins=False,
+               min_confidence=DEFAULT_MIN_CONFIDENCE, extensions=None):
+    """
+    Scan files and directories for leaked card numbers.
+
+    Args:
+        paths (iterable): Files and/or directories to scan
+        workers (int): Worker processes; 1 scans in this process
+        span_bytes (int): Bytes of a file handed to a worker at a time
+        include_bins (bool): Also report bare 6/8-digit BINs, not just full card numbers
+        min_confidence (float): Candidate score threshold (see candidates.py)
+        extensions (iterable, optional): Only scan files with these suffixes
+
+    Returns:
+        dict: files, bytes, seconds, gb_per_s and findings (masked finding
+        dicts with path, offset, masked, bin, scheme, kind and confidence)
+    """
+    files = list(iter_files(paths, extensions))
+    tasks = [
+        (path, start, min(start + span_bytes, size), include_bins, min_confidence)
+        for path, size in files
+        for start in range(0, size, span_bytes)
+    ]
+
+    started = time.perf_counter()
+    findings = []
+    scanned = 0
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for span_findings, span_bytes_scanned in executor.map(scan_span, tasks):
+                findings.extend(span_findings)
+                scanned += span_bytes_scanned
+    else:
+        for task in tasks:
+            span_findings, span_bytes_scanned = scan_span(task)
+            findings.extend(span_findings)
+            scanned += span_bytes_scanned
+
+    seconds = time.perf_counter() - started
+    return {
+        "files": len(files),
+        "bytes": scanned,
+        "seconds": seconds,
+        "gb_per_s": scanned / seconds / 1e9 if seconds else 0.0,
+        "findings": findings,
+    }
+
+def record_findings(findings, lookup=True, ip_address=None, batch_size=500):
+    """
+    Write findings to bin_records with source='file_scan', one row per BIN per file.
+
+    Args:
+        findings (list): Finding dicts from scan_paths
+        lookup (bool): Check each distinct BIN's 3DS status through the shared
+            lookup path; otherwise rows carry offline metadata only and an
+            unknown 3DS status
+        ip_address (str, optional): IP address used for lookups
+        batch_size (int): Rows per bulk insert
+
+    Returns:
+        tuple: (inserted, errors) as returned by database.add_bin_records
+    """
+    import database as db
+    from bin_checker import lookup_bin_metadata
+    from bulk_checker import iter_bin_results, result_to_bin_data
+
+    grouped = {}
+    for finding in findings:
+        group = grouped.setdefault((finding["path"], finding["bin"]), {
+            "bin": finding["bin"],
+            "scheme": finding["scheme"],
+            "full_number": False,
+            "occurrences": 0,
+            "samples": [],
+        })
+        group["occurrences"] += 1
+        group["full_number"] = group["full_number"] or finding["kind"] == "pan"
+        if len(group["samples"]) < 3 and finding["masked"] not in group["samples"]:
+            group["samples"].append(finding["masked"])
+
+    results = {}
+    if lookup:
+        bins = sorted({bin_number for _, bin_number in grouped})
+        for bin_number, _, result in iter_bin_results([(bin_number, ip_address) for bin_number in bins]):
+            if "error" not in result:
+                results[bin_number] = result
+
+    rows = []
+    for (path, bin_number), group in sorted(grouped.items()):
+        scan_info = {
+            "occurrences": group["occurrences"],
+            "samples": group["samples"],
+            "full_number": group["full_number"],
+        }
+        # A full card number in our own data is an exposure, like a fraud-context sighting
+        exposed = group["full_number"]
+
+        if bin_number in results:
+            bin_data = result_to_bin_data(bin_number, ip_address, results[bin_number], fraud_context=exposed)
+            bin_data["raw_response"] = dict(results[bin_number], file_scan=scan_info)
+        else:
+            metadata = lookup_bin_metadata(bin_number) or {}
+            bin_data = {
+                "BIN": bin_number,
+                "ip_address": ip_address or "",
+                "Scheme": metadata.get("scheme") or group["scheme"],
+                "Type": metadata.get("cardType", "Unknown"),
+                "Country": metadata.get("country", "Unknown"),
+                "Issuer": metadata.get("issuer", "Unknown"),
+                "is3DS": None,
+                "Risk Level": "Unknown",
+                "fraud_context": exposed,
+                "raw_response": {"file_scan": scan_info},
+            }
+        bin_data["source_url"] = "file://" + os.path.abspath(path)
+        rows.append(bin_data)
+
+    inserted = 0
+    errors = []
+    for offset in range(0, len(rows), batch_size):
+        batch_inserted, batch_errors = db.add_bin_records(rows[offset:offset + batch_size], source='file_scan')
+        inserted += batch_inserted
+        errors.extend((offset + index, message) for index, message in batch_errors)
+
+    return inserted, errors
+
+def main(argv=None):
+    """Scan files for leaked card numbers and record the masked findings"""
+    parser = argparse.ArgumentParser(description="Scan local files for leaked card numbers")
+    parser.add_argument("paths", nargs="+", help="Files or directories to scan")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes")
+    parser.add_argument("--span-mb", type=int, default=SPAN_BYTES // (1024 * 1024),
+                        help="Megabytes of a file handed to a worker at a time")
+    parser.add_argument("--ext", action="append", help="Only scan files with this suffix (repeatable)")
+    parser.add_argument("--include-bins", action="store_true", help="Also report bare 6/8-digit BINs")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE,
+                        help="Minimum candidate score (0-1)")
+    parser.add_argument("--jsonl", help="Write masked findings to this JSONL file")
+    parser.add_argument("--no-lookup", action="store_true", help="Don't check 3DS status of found BINs")
+    parser.add_argument("--dry-run", action="store_true", help="Don't write findings to the database")
+    args = parser.parse_args(argv)
+
+    report = scan_paths(args.paths, workers=args.workers, span_bytes=args.span_mb * 1024 * 1024,
+                        include_bins=args.include_bins, min_confidence=args.min_confidence,
+                        extensions=args.ext)
+    findings = report["findings"]
+
+    print(f"Scanned {report['files']} files, {report['bytes'] / 1e9:.2f} GB in "
+          f"{report['seconds']:.2f}s ({report['gb_per_s']:.2f} GB/s): {len(findings)} findings, "
+          f"{len({f['bin'] for f in findings})} distinct BINs")
+
+    if args.jsonl:
+        with open(args.jsonl, "w", encoding="utf-8") as f:
+            for finding in findings:
+                f.write(json.dumps(finding) + "\n")
+
+    if findings and not args.dry_run:
+        import database as db
+
+        db.init_db()
+        inserted, errors = record_findings(findings, lookup=not args.no_lookup)
+        print(f"Recorded {inserted} rows in bin_records")
+        for index, message in errors:
+            print(f"Row {index} rejected: {message}", file=sys.stderr)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Shared, pooled HTTP client used for the 3DS API and for scraping.
+
+One requests.Session is reused per process so connections stay alive
+between lookups. Every request gets bounded connect/read timeouts, and
+429/5xx responses are retried with exponential backoff, honoring the
+server's Retry-After header (capped so a bad header can't stall us).
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Defaults can be overridden from the environment
+CONNECT_TIMEOUT = float(os.environ.get('BIN_HTTP_CONNECT_TIMEOUT', 3.05))  # seconds
+READ_TIMEOUT = float(os.environ.get('BIN_HTTP_READ_TIMEOUT', 10))  # seconds
+MAX_RETRIES = int(os.environ.get('BIN_HTTP_MAX_RETRIES', 3))
+BACKOFF_FACTOR = float(os.environ.get('BIN_HTTP_BACKOFF_FACTOR', 0.5))  # 0.5s, 1s, 2s, ...
+MAX_RETRY_AFTER = float(os.environ.get('BIN_HTTP_MAX_RETRY_AFTER', 30))  # seconds
+POOL_SIZE = int(os.environ.get('BIN_HTTP_POOL_SIZE', 20))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_session = None
+_session_lock = threading.Lock()
+
+class BoundedRetry(Retry):
+    """Retry policy that honors Retry-After but never sleeps longer than MAX_RETRY_AFTER"""
+
+    RETRY_AFTER_STATUS_CODES = RETRY_STATUSES
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+def build_session(max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_size=POOL_SIZE):
+    """
+    Build a session with connection pooling and a retry policy mounted for http and https.
+
+    Args:
+        max_retries (int): Maximum number of retries per request
+        backoff_factor (float): Base delay for exponential backoff between retries
+        pool_size (int): Number of pooled connections kept per host
+
+    Returns:
+        requests.Session: Configured session
+    """
+    retry = BoundedRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,  # a slow upstream won't get faster by asking again
+        status=max_retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        backoff_factor=backoff_factor,
+        respect_retry_after_header=True,
+        raise_on_status=False  # hand the final 429/5xx back to the caller
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_session():
+    """
+    Get the process-wide pooled session, creating it on first use.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+def get(url, headers=None, timeout=None, **kwargs):
+    """
+    Issue a GET request through the shared session.
+
+    Args:
+        url (str): URL to request
+        headers (dict, optional): Request headers
+        timeout (float or tuple, optional): Timeout override, defaults to (CONNECT_TIMEOUT, READ_TIMEOUT)
+        **kwargs: Passed through to requests (e.g. stream=True)
+
+    Returns:
+        requests.Response: The final response after any retries
+    """
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    return get_session().get(url, headers=headers, timeout=timeout, **kwargs)
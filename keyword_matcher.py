@@ -0,0 +1,144 @@
+"""
+Single-pass multi-keyword counting.
+
+KeywordMatcher compiles a keyword list into one regex and counts every
+keyword in a text with a single left-to-right scan, giving the same
+numbers as calling text.lower().count(term) once per keyword.
+KeywordScanner does the same over a stream of text chunks.
+"""
+
+import re
+from collections import Counter
+
+class KeywordMatcher:
+    """
+    Case-insensitive counter for a fixed set of keywords.
+
+    The compiled pattern is a zero-width lookahead over every keyword,
+    longest first, so it stops at each position where any keyword starts
+    and reports the longest one. Shorter keywords starting at the same
+    position are always prefixes of it and are counted from a precomputed
+    table, which keeps overlapping keywords ("card" inside "carding",
+    "bin" inside "cabinet") counted exactly as str.count would.
+
+    Args:
+        terms (iterable): Keywords to count
+    """
+
+    def __init__(self, terms):
+        self.terms = tuple(sorted({term.lower() for term in terms if term}))
+        self.max_length = max((len(term) for term in self.terms), default=0)
+
+        alternatives = "|".join(re.escape(term) for term in sorted(self.terms, key=len, reverse=True))
+        # The leading character class lets most positions fail before trying every alternative
+        first_chars = "".join(re.escape(char) for char in sorted({term[0] for term in self.terms}))
+        self.pattern = re.compile(f"(?=[{first_chars}])(?=({alternatives}))") if self.terms else None
+
+        # Every keyword that is a prefix of (or equal to) each keyword
+        self._prefixes = {
+            term: tuple(other for other in self.terms if term.startswith(other))
+            for term in self.terms
+        }
+
+        # Occurrences of a keyword can only overlap each other if it starts
+        # with one of its own endings ("aa", "abab"); those need positions
+        # tracked to match str.count, everything else can be tallied in bulk
+        self._self_overlapping = any(
+            term[-size:] == term[:size] for term in self.terms for size in range(1, len(term))
+        )
+
+    def count(self, text):
+        """
+        Count keyword occurrences in a text.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            Counter: Keyword -> number of non-overlapping occurrences
+        """
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.close()
+
+    def scanner(self):
+        """Start an incremental scan; see KeywordScanner"""
+        return KeywordScanner(self)
+
+class KeywordScanner:
+    """
+    Incremental keyword counting over a stream of text chunks.
+
+    Only the last few characters of each chunk (one less than the longest
+    keyword) are carried over, so keywords split across chunks are counted
+    without keeping the whole text.
+
+    Args:
+        matcher (KeywordMatcher): Compiled keyword set
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.counts = Counter()
+        self._carry = ""
+        self._carry_start = 0  # absolute offset of _carry[0]
+        self._next_allowed = {}  # keyword -> absolute offset its next match may start at
+
+    def feed(self, text):
+        """
+        Scan the next chunk of text.
+
+        Args:
+            text (str): Next chunk of the stream
+        """
+        self._scan(self._carry + text.lower(), final=False)
+
+    def close(self):
+        """
+        Finish the scan.
+
+        Returns:
+            Counter: Keyword -> number of non-overlapping occurrences
+        """
+        self._scan(self._carry, final=True)
+        self._carry = ""
+        return self.counts
+
+    def _scan(self, window, final):
+        matcher = self.matcher
+        if matcher.pattern is None:
+            return
+
+        # Positions before the limit have all the text any keyword starting there could need
+        limit = len(window) if final else len(window) - (matcher.max_length - 1)
+
+        if matcher._self_overlapping:
+            self._count_positions(window, limit)
+        elif limit > 0:
+            longest = Counter(matcher.pattern.findall(window))
+            # Keywords starting in the carried tail are counted with the next chunk
+            for match in matcher.pattern.finditer(window, limit):
+                longest[match.group(1)] -= 1
+            for found, occurrences in longest.items():
+                for term in matcher._prefixes[found]:
+                    self.counts[term] += occurrences
+
+        keep_from = max(0, limit)
+        self._carry = window[keep_from:]
+        self._carry_start += keep_from
+
+    def _count_positions(self, window, limit):
+        counts = self.counts
+        next_allowed = self._next_allowed
+        offset = self._carry_start
+
+        for match in self.matcher.pattern.finditer(window):
+            start = match.start()
+            if start >= limit:
+                break
+            position = offset + start
+            for term in self.matcher._prefixes[match.group(1)]:
+                # str.count doesn't count overlapping occurrences of the same keyword
+                if position >= next_allowed.get(term, 0):
+                    counts[term] += 1
+                    next_allowed[term] = position + len(term)
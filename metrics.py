@@ -0,0 +1,394 @@
+"""
+Lightweight in-process metrics for the lookup, scraper and database hot paths.
+
+Counters and latency histograms are kept in memory and exported in the
+Prometheus text format, either through render_prometheus() (the app's
+Diagnostics panel) or a small /metrics HTTP endpoint (BIN_METRICS_PORT).
+
+Collection is off unless BIN_METRICS is set or enable() is called. While
+it is off, instrumented calls only pay for one flag check.
+
+Usage:
+    LOOKUPS = metrics.counter("bin_lookups_total", "3DS lookups by outcome")
+
+    @metrics.timed("bin_db_operation_seconds", "Database call latency", operation="get_bin_records")
+    def get_bin_records(limit=100):
+        ...
+"""
+
+import os
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+_enabled = os.environ.get('BIN_METRICS', '0').lower() in ('1', 'true', 'yes')
+
+# Port for the /metrics endpoint started by start_http_server (unset: don't serve)
+METRICS_PORT = os.environ.get('BIN_METRICS_PORT')
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow page fetches
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry = {}  # name -> Counter / Histogram / _Callback, in registration order
+_server = None
+
+def enabled():
+    """Whether metrics are being collected"""
+    return _enabled
+
+def enable(flag=True):
+    """
+    Turn collection on or off for the whole process.
+
+    Args:
+        flag (bool): True to collect, False to stop (collected values are kept)
+    """
+    global _enabled
+    _enabled = bool(flag)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+class Counter:
+    """
+    Monotonic counter, optionally split by labels.
+
+    Args:
+        name (str): Metric name
+        help_text (str): Description for the # HELP line
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text=""):
+        self.name = name
+        self.help = help_text
+        self._values = {}  # label key -> value
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the series with these labels (no-op while disabled)"""
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """
+        Current values.
+
+        Returns:
+            list: (name suffix, labels dict, value) tuples
+        """
+        with _lock:
+            return [("", dict(key), value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, optionally split by labels.
+
+    Args:
+        name (str): Metric name, conventionally ending in _seconds
+        help_text (str): Description for the # HELP line
+        buckets (tuple): Ascending upper bounds; +Inf is implied
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts (last is +Inf), sum, count]
+
+    def observe(self, value, **labels):
+        """Record one observation (no-op while disabled)"""
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block"""
+        if not _enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self):
+        """
+        Per-series count, mean and approximate percentiles.
+
+        Returns:
+            list: (labels dict, dict with count, sum, mean, p50, p95, p99) tuples
+        """
+        with _lock:
+            series = [(dict(key), list(counts), total, count)
+                      for key, (counts, total, count) in sorted(self._series.items())]
+
+        return [
+            (labels, {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self._quantile(counts, count, 0.5),
+                "p95": self._quantile(counts, count, 0.95),
+                "p99": self._quantile(counts, count, 0.99),
+            })
+            for labels, counts, total, count in series
+        ]
+
+    def _quantile(self, counts, count, q):
+        # Linear interpolation inside the bucket holding the q-th observation,
+        # the same estimate as PromQL's histogram_quantile
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def samples(self):
+        """
+        Current values in Prometheus form (cumulative buckets, sum and count).
+
+        Returns:
+            list: (name suffix, labels dict, value) tuples
+        """
+        with _lock:
+            series = [(dict(key), list(counts), total, count)
+                      for key, (counts, total, count) in sorted(self._series.items())]
+
+        samples = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(("_bucket", dict(labels, le=le), cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+class _Callback:
+    """Values read from a function at export time, e.g. cache statistics kept elsewhere"""
+
+    def __init__(self, name, help_text, kind, read):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._read = read
+
+    def samples(self):
+        return [("", labels, value) for labels, value in self._read()]
+
+def _register(name, factory):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = factory()
+        return metric
+
+def counter(name, help_text=""):
+    """
+    Get or create a counter.
+
+    Args:
+        name (str): Metric name, conventionally ending in _total
+        help_text (str): Description for the # HELP line
+
+    Returns:
+        Counter: The registered counter
+    """
+    return _register(name, lambda: Counter(name, help_text))
+
+def histogram(name, help_text="", buckets=DEFAULT_BUCKETS):
+    """
+    Get or create a latency histogram.
+
+    Args:
+        name (str): Metric name, conventionally ending in _seconds
+        help_text (str): Description for the # HELP line
+        buckets (tuple): Ascending bucket upper bounds in seconds
+
+    Returns:
+        Histogram: The registered histogram
+    """
+    return _register(name, lambda: Histogram(name, help_text, buckets))
+
+def register_callback(name, help_text, kind, read):
+    """
+    Export values owned by another component.
+
+    Args:
+        name (str): Metric name
+        help_text (str): Description for the # HELP line
+        kind (str): "counter" or "gauge"
+        read (callable): Returns a list of (labels dict, value) pairs; only called on export
+    """
+    with _lock:
+        _registry[name] = _Callback(name, help_text, kind, read)
+
+def timed(name, help_text="", **labels):
+    """
+    Decorator recording a function's latency and failures.
+
+    Durations go to the histogram `name`; exceptions also increment the
+    counter named like it with _seconds replaced by _errors_total.
+
+    Args:
+        name (str): Histogram name, ending in _seconds
+        help_text (str): Description for the # HELP line
+        **labels: Labels identifying this function's series
+
+    Returns:
+        callable: Decorator
+    """
+    latency = histogram(name, help_text)
+    errors = counter(name[:-len("_seconds")] + "_errors_total" if name.endswith("_seconds") else name + "_errors_total",
+                     f"Exceptions raised by calls recorded in {name}")
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc(**labels)
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started, **labels)
+
+        return wrapper
+
+    return decorate
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def render_prometheus():
+    """
+    Export every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: Exposition text (version 0.0.4)
+    """
+    with _lock:
+        metrics = list(_registry.values())
+
+    lines = []
+    for metric in metrics:
+        try:
+            samples = metric.samples()
+        except Exception:
+            continue  # a failing callback shouldn't break the export
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """
+    Summarize every metric for display.
+
+    Returns:
+        dict: 'histograms' -> list of (name, labels, summary dict) and
+        'values' -> list of (name, labels, value) for counters, gauges and callbacks
+    """
+    with _lock:
+        metrics = list(_registry.values())
+
+    histograms = []
+    values = []
+    for metric in metrics:
+        if isinstance(metric, Histogram):
+            histograms.extend((metric.name, labels, summary) for labels, summary in metric.summary())
+        else:
+            try:
+                values.extend((metric.name, labels, value) for _, labels, value in metric.samples())
+            except Exception:
+                continue
+    return {"histograms": histograms, "values": values}
+
+def reset():
+    """Forget all recorded values (registered metrics stay registered)"""
+    with _lock:
+        for metric in _registry.values():
+            if isinstance(metric, Counter):
+                metric._values.clear()
+            elif isinstance(metric, Histogram):
+                metric._series.clear()
+
+def start_http_server(port=None, address="0.0.0.0"):
+    """
+    Serve render_prometheus() at /metrics from a daemon thread.
+
+    Safe to call repeatedly; only the first call starts a server.
+
+    Args:
+        port (int, optional): Port to listen on, defaults to BIN_METRICS_PORT
+        address (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if no port is configured
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = port if port is not None else METRICS_PORT
+    if port is None:
+        return None
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((address, int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
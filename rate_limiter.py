@@ -0,0 +1,88 @@
+"""
+Token-bucket rate limiting for calls to the 3ds-lookup API.
+
+The shared limiter is sized from the environment so it can be matched to
+the RapidAPI plan; every upstream lookup takes one token from it, no
+matter which entry point (UI, batch API, scraper) triggered the lookup.
+"""
+
+import os
+import time
+import threading
+
+# Requests per second allowed by the API plan; 0 disables limiting
+DEFAULT_RATE = float(os.environ.get('BIN_API_RATE_LIMIT', 10))
+# Maximum burst size, defaults to one second's worth of tokens
+DEFAULT_BURST = float(os.environ.get('BIN_API_BURST', 0)) or None
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are reserved ahead of time: a caller that finds the bucket empty
+    takes a token "on credit" and sleeps until it would have been refilled.
+    This keeps waiters in FIFO order without a condition variable.
+
+    Args:
+        rate (float): Tokens added per second; 0 or less means unlimited
+        capacity (float, optional): Bucket size, defaults to max(rate, 1)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens from the bucket without waiting.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds the caller must wait before proceeding
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens from the bucket, sleeping until they are available.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+def get_rate_limiter():
+    """
+    Get the process-wide limiter for the 3ds-lookup API, creating it on first use.
+
+    Returns:
+        TokenBucket: The shared limiter
+    """
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _shared_lock:
+            if _shared_limiter is None:
+                _shared_limiter = TokenBucket(DEFAULT_RATE, DEFAULT_BURST)
+    return _shared_limiter
@@ -0,0 +1,429 @@
+"""
+Standalone JSON service answering BIN / 3DS lookups over HTTP.
+
+Wraps check_bin_3ds and classify_risk for other services, with one lookup
+cache, one pooled HTTP session and one rate limiter shared by every
+request. Concurrent requests are micro-batched: a dispatcher thread
+collects the lookups waiting in its queue, answers cache hits directly,
+and sends each distinct (BIN, IP) that missed to the lookup pool once, no
+matter how many requests asked for it.
+
+Endpoints:
+    GET  /lookup?bin=411111&ip=8.8.8.8&fraud_context=0
+    POST /lookup   {"bin": "411111", "ip": "8.8.8.8", "fraud_context": false}
+    POST /batch    {"items": [{"bin": "411111"}, ...]} or {"bins": ["411111", ...], "ip": "..."}
+    GET  /health, /stats, /metrics
+
+Usage:
+    python service.py --port 8080
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+import http_client
+from bin_checker import check_bin_3ds, get_lookup_cache, get_coalescing_stats, DEFAULT_CONCURRENCY, LOOKUPS
+from utils import classify_risk, is_valid_bin, is_valid_ip
+
+HOST = os.environ.get('BIN_SERVICE_HOST', '127.0.0.1')
+PORT = int(os.environ.get('BIN_SERVICE_PORT', 8080))
+
+# How long the dispatcher keeps collecting lookups while every worker is busy
+BATCH_WAIT = float(os.environ.get('BIN_SERVICE_BATCH_WAIT_MS', 2)) / 1000
+# Most lookups dispatched together, and most BINs accepted in one /batch request
+MAX_BATCH = int(os.environ.get('BIN_SERVICE_MAX_BATCH', 256))
+MAX_REQUEST_BINS = int(os.environ.get('BIN_SERVICE_MAX_REQUEST_BINS', 1000))
+
+# Seconds a request waits for its lookups before answering 504
+REQUEST_TIMEOUT = float(os.environ.get('BIN_SERVICE_TIMEOUT', 30))
+
+REQUEST_SECONDS = metrics.histogram("bin_service_request_seconds", "Service request latency by endpoint")
+BATCH_SIZES = metrics.histogram("bin_service_batch_size", "Lookups per dispatched micro-batch",
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+class MicroBatcher:
+    """
+    Group concurrent lookups and run each distinct one once.
+
+    While a lookup worker is free, whatever is queued is dispatched at
+    once, so an idle service adds no delay. Once every worker is busy, new
+    lookups would have to queue anyway, so the dispatcher keeps collecting
+    for up to max_wait seconds (or max_batch lookups) and deduplicates them
+    before handing them out.
+
+    Args:
+        workers (int): Lookups run at once (upstream API concurrency)
+        max_wait (float): Seconds to keep collecting while all workers are busy
+        max_batch (int): Most lookups dispatched together
+    """
+
+    def __init__(self, workers=DEFAULT_CONCURRENCY, max_wait=BATCH_WAIT, max_batch=MAX_BATCH):
+        self.workers = max(1, workers)
+        self.max_wait = max_wait
+        self.max_batch = max(1, max_batch)
+        self.cache = get_lookup_cache()
+
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="service-lookup")
+        self._lock = threading.Lock()
+        self._busy = 0
+
+        self.batches = 0
+        self.lookups = 0
+        self.deduplicated = 0
+
+        self._thread = threading.Thread(target=self._run, name="service-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, bin_number, ip_address=None):
+        """
+        Queue a lookup.
+
+        Returns:
+            Future: Resolves to (result dict, cached) where result has the
+            shape returned by check_bin_3ds
+        """
+        future = Future()
+        self._queue.put(((bin_number, ip_address), future))
+        return future
+
+    def stats(self):
+        """
+        Report how much batching happened.
+
+        Returns:
+            dict: Dispatched batches, lookups, lookups answered by another in
+            the same batch, and mean batch size
+        """
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "lookups": self.lookups,
+                "deduplicated": self.deduplicated,
+                "mean_batch_size": self.lookups / self.batches if self.batches else 0.0,
+                "busy_workers": self._busy,
+            }
+
+    def close(self):
+        """Stop the dispatcher and wait for running lookups"""
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                with self._lock:
+                    saturated = self._busy >= self.workers
+                timeout = deadline - time.monotonic() if saturated else 0
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        waiters = {}
+        for key, future in batch:
+            waiters.setdefault(key, []).append(future)
+
+        with self._lock:
+            self.batches += 1
+            self.lookups += len(batch)
+            self.deduplicated += len(batch) - len(waiters)
+        BATCH_SIZES.observe(len(batch))
+
+        for (bin_number, ip_address), futures in waiters.items():
+            # Only the memory tier here: an SQLite probe would hold up the whole batch.
+            # A miss is counted by the worker's full lookup.
+            cached = self.cache.get(bin_number, ip_address, count_miss=False, memory_only=True)
+            if cached is not None:
+                LOOKUPS.inc(outcome="cache_hit")
+                _resolve(futures, cached, True)
+                continue
+
+            with self._lock:
+                self._busy += 1
+            task = self._executor.submit(self._lookup, bin_number, ip_address)
+            task.add_done_callback(lambda task, futures=futures: self._finish(task, futures))
+
+    def _lookup(self, bin_number, ip_address):
+        # Both tiers, then the (coalesced, rate limited) upstream call, storing the answer itself
+        cached = self.cache.get(bin_number, ip_address)
+        if cached is not None:
+            LOOKUPS.inc(outcome="cache_hit")
+            return cached, True
+
+        result = check_bin_3ds(bin_number, ip_address, use_cache=False)
+        if "error" not in result:
+            self.cache.set(bin_number, ip_address, result)
+        return result, False
+
+    def _finish(self, task, futures):
+        with self._lock:
+            self._busy -= 1
+        try:
+            result, cached = task.result()
+        except Exception as e:
+            result, cached = {"error": f"Request failed: {str(e)}"}, False
+        _resolve(futures, result, cached)
+
+def _resolve(futures, result, cached):
+    # Every waiter gets its own deep copy so one request can't mutate another's answer
+    for index, future in enumerate(futures):
+        future.set_result((result if index == 0 else copy.deepcopy(result), cached))
+
+def format_answer(bin_number, ip_address, result, cached=False, fraud_context=False):
+    """
+    Build the JSON answer for one lookup.
+
+    Args:
+        bin_number (str): BIN or card number that was checked
+        ip_address (str): IP address used for the lookup (may be None)
+        result (dict): Response from check_bin_3ds
+        cached (bool): Whether the response came from the lookup cache
+        fraud_context (bool): Whether the caller found the BIN in a fraud context
+
+    Returns:
+        dict: Lookup fields and risk level, or bin / ip / error on failure
+    """
+    if "error" in result:
+        return {"bin": bin_number, "ip": ip_address, "error": result["error"]}
+
+    is_3ds = result.get("is3DS", False)
+    return {
+        "bin": bin_number,
+        "ip": ip_address,
+        "scheme": result.get("scheme", "Unknown"),
+        "type": result.get("cardType", "Unknown"),
+        "country": result.get("country", "Unknown"),
+        "issuer": result.get("issuer", "Unknown"),
+        "ip_country": result.get("ipCountry", "Unknown"),
+        "is3DS": is_3ds,
+        "risk_level": classify_risk(is_3ds, fraud_context),
+        "cached": cached,
+    }
+
+class RequestError(Exception):
+    """A client error answered with the given HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _parse_item(item, default_ip=None, default_fraud=False):
+    """Validate one lookup request; returns (bin, ip, fraud_context) or raises RequestError"""
+    if not isinstance(item, dict):
+        item = {"bin": item}
+
+    bin_number = str(item.get("bin", "")).strip().replace(" ", "").replace("-", "")
+    ip_address = item.get("ip") or default_ip
+    fraud_context = item.get("fraud_context", default_fraud)
+
+    if not isinstance(fraud_context, bool):
+        raise RequestError(400, f"fraud_context must be true or false, not {fraud_context!r}")
+    if not is_valid_bin(bin_number):
+        raise RequestError(400, f"invalid BIN: {bin_number!r}")
+    if ip_address and not is_valid_ip(str(ip_address)):
+        raise RequestError(400, f"invalid IP address: {ip_address!r}")
+
+    return bin_number, ip_address or None, fraud_context
+
+def _query_flag(value):
+    """A boolean query parameter; anything but the usual spellings is a 400"""
+    flag = str(value).lower() if value is not None else ''
+    if flag in ('1', 'true', 'yes'):
+        return True
+    if flag in ('', '0', 'false', 'no'):
+        return False
+    raise RequestError(400, f"fraud_context must be true or false, not {value!r}")
+
+class LookupHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's MicroBatcher"""
+
+    # Keep-alive for callers that reuse connections; small responses go out
+    # as header and body writes, so don't let Nagle delay them
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/lookup":
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self._handle("lookup", lambda: self._lookup(dict(query, fraud_context=_query_flag(query.get("fraud_context")))))
+        elif url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/stats":
+            self._send(200, {
+                "cache": get_lookup_cache().stats(),
+                "coalescing": get_coalescing_stats(),
+                "batching": self.server.batcher.stats(),
+            })
+        elif url.path == "/metrics":
+            body = metrics.render_prometheus().encode("utf-8")
+            self._send_bytes(200, body, "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == "/lookup":
+            self._handle("lookup", lambda: self._lookup(self._read_json()))
+        elif path == "/batch":
+            self._handle("batch", lambda: self._batch(self._read_json()))
+        else:
+            self._read_body()
+            self._send(404, {"error": "not found"})
+
+    def _handle(self, endpoint, respond):
+        with REQUEST_SECONDS.time(endpoint=endpoint):
+            try:
+                status, payload = respond()
+            except RequestError as e:
+                status, payload = e.status, {"error": str(e)}
+            except (FutureTimeoutError, TimeoutError):
+                # Separate classes before Python 3.11
+                status, payload = 504, {"error": "lookup timed out"}
+            except Exception as e:
+                self.log_error("%s request failed: %r", endpoint, e)
+                status, payload = 500, {"error": "internal error"}
+            self._send(status, payload)
+
+    def _lookup(self, body):
+        bin_number, ip_address, fraud_context = _parse_item(body)
+        result, cached = self.server.batcher.submit(bin_number, ip_address).result(REQUEST_TIMEOUT)
+        answer = format_answer(bin_number, ip_address, result, cached, fraud_context)
+        return (502 if "error" in answer else 200), answer
+
+    def _batch(self, body):
+        if not isinstance(body, dict):
+            raise RequestError(400, "expected a JSON object with 'items' or 'bins'")
+        items = body.get("items", body.get("bins"))
+        if not isinstance(items, list):
+            raise RequestError(400, "expected a JSON object with 'items' or 'bins'")
+        if len(items) > MAX_REQUEST_BINS:
+            raise RequestError(413, f"at most {MAX_REQUEST_BINS} BINs per request")
+
+        default_fraud = body.get("fraud_context", False)
+        if not isinstance(default_fraud, bool):
+            raise RequestError(400, f"fraud_context must be true or false, not {default_fraud!r}")
+        parsed = []
+        for item in items:
+            try:
+                parsed.append(_parse_item(item, body.get("ip"), default_fraud))
+            except RequestError as e:
+                # A bad item gets its own error without failing the rest
+                raw = item.get("bin") if isinstance(item, dict) else item
+                parsed.append({"bin": raw, "error": str(e)})
+
+        # Queue everything before waiting so the whole request lands in as few batches as possible
+        futures = [
+            None if isinstance(entry, dict) else self.server.batcher.submit(entry[0], entry[1])
+            for entry in parsed
+        ]
+        deadline = time.monotonic() + REQUEST_TIMEOUT
+
+        results = []
+        for entry, future in zip(parsed, futures):
+            if future is None:
+                results.append(entry)
+                continue
+            bin_number, ip_address, fraud_context = entry
+            result, cached = future.result(max(0, deadline - time.monotonic()))
+            results.append(format_answer(bin_number, ip_address, result, cached, fraud_context))
+
+        return 200, {"results": results}
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self):
+        try:
+            return json.loads(self._read_body() or b"{}")
+        except ValueError:
+            raise RequestError(400, "request body is not valid JSON")
+
+    def _send(self, status, payload):
+        self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_server(host=HOST, port=PORT, batcher=None, verbose=False):
+    """
+    Build (but don't start) the lookup service.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to listen on, 0 for any free port
+        batcher (MicroBatcher, optional): Batcher to use instead of a new default one
+        verbose (bool): Log every request to stderr
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to run it
+    """
+    # Build the shared session up front rather than on the first request
+    http_client.get_session()
+
+    server = ThreadingHTTPServer((host, port), LookupHandler)
+    server.daemon_threads = True
+    server.batcher = batcher or MicroBatcher()
+    server.verbose = verbose
+    return server
+
+def main(argv=None):
+    """Run the lookup service until interrupted"""
+    parser = argparse.ArgumentParser(description="JSON BIN / 3DS lookup service")
+    parser.add_argument("--host", default=HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=PORT, help="Port to listen on")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_CONCURRENCY, help="Lookups run at once")
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT * 1000,
+                        help="How long to collect lookups while all workers are busy")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    batcher = MicroBatcher(workers=args.workers, max_wait=args.batch_wait_ms / 1000)
+    server = create_server(args.host, args.port, batcher, args.verbose)
+    print(f"Serving BIN lookups on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
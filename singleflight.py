@@ -0,0 +1,94 @@
+"""
+Single-flight call coalescing.
+
+Concurrent callers asking for the same key share one execution of the
+underlying function: the first caller runs it, everyone else waits for
+and receives that result (or exception).
+"""
+
+import threading
+
+class _Call:
+    """An in-flight execution that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key.
+
+    Attributes:
+        executed (int): Number of times a function was actually run
+        coalesced (int): Number of calls that were served by another caller's execution
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless a call with the same key is already in flight.
+
+        Args:
+            key (hashable): Identifies equivalent calls
+            fn (callable): Function to run
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came
+            from another caller's execution
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self):
+        """Number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """
+        Report how much work coalescing saved.
+
+        Returns:
+            dict: Executed and coalesced call counts
+        """
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
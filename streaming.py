@@ -0,0 +1,167 @@
+"""
+Bounded-memory text extraction and pattern matching over streamed input.
+
+PageTextExtractor turns HTML arriving in chunks into plain text without
+building a document tree, and StreamingMatcher runs a regex over a
+stream of text chunks, carrying just enough of each chunk forward that
+matches straddling a chunk boundary are still found exactly once.
+"""
+
+import codecs
+from html.parser import HTMLParser
+
+# Content of these elements is never visible text
+SKIPPED_TAGS = frozenset({"script", "style", "template"})
+
+# Text on either side of these elements belongs to different "words";
+# other (inline) tags are ignored so "<b>4111</b>11" still reads as one number
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul", "option", "title",
+})
+
+class PageTextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text tokenizer.
+
+    Feed decoded HTML with feed() and collect the visible text produced so
+    far with drain(). Only text that hasn't been drained yet is held in
+    memory.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._pieces = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._pieces.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._pieces.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._pieces.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pieces.append(data)
+
+    def drain(self):
+        """Return and forget the text extracted since the last call"""
+        text = "".join(self._pieces)
+        self._pieces = []
+        return text
+
+def iter_page_text(chunks, encoding=None):
+    """
+    Decode and tokenize streamed HTML, yielding visible text as it becomes available.
+
+    Args:
+        chunks (iterable): Raw HTML byte chunks
+        encoding (str, optional): Character encoding, defaults to UTF-8
+
+    Yields:
+        str: Visible text, in document order
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    parser = PageTextExtractor()
+
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        text = parser.drain()
+        if text:
+            yield text
+
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    text = parser.drain()
+    if text:
+        yield text
+
+class StreamingMatcher:
+    """
+    Find regex matches across a stream of text chunks.
+
+    Matches ending within `overlap` characters of the end of the data seen
+    so far are held back until more input (or close()) shows they can't
+    grow, so `overlap` must exceed the longest possible match plus any
+    lookahead. The same number of characters before the resume point is
+    kept as context for lookbehinds and \\b. Memory use is bounded by
+    about twice `overlap` regardless of stream length.
+
+    With `context` set, each match also carries up to that many characters
+    of the text before and after it; `overlap` must then also cover the
+    context.
+
+    Args:
+        pattern (re.Pattern): Compiled pattern to search for
+        overlap (int): Characters of context carried between chunks
+        context (int): Characters of text before and after each match to return with it
+    """
+
+    def __init__(self, pattern, overlap=64, context=0):
+        self.pattern = pattern
+        self.overlap = max(overlap, context)
+        self.context = context
+        self._buffer = ""
+        self._buffer_start = 0  # absolute stream offset of _buffer[0]
+        self._scan_from = 0     # index in _buffer where unscanned text begins
+
+    def feed(self, text):
+        """
+        Add text and return the matches that are now known to be complete.
+
+        Args:
+            text (str): Next chunk of the stream
+
+        Returns:
+            list: (absolute offset, matched text) tuples, or (absolute
+            offset, matched text, text before, text after) when context is set
+        """
+        return self._scan(self._buffer + text, final=False)
+
+    def close(self):
+        """Return the matches still held back at the end of the stream"""
+        return self._scan(self._buffer, final=True)
+
+    def _scan(self, window, final):
+        found = []
+        horizon = len(window) if final else len(window) - self.overlap
+        resume = max(self._scan_from, horizon)
+
+        # Starting at _scan_from (rather than slicing) lets lookbehinds see the carried context
+        for match in self.pattern.finditer(window, self._scan_from):
+            if match.end() > horizon:
+                # Might continue in the next chunk; rescan it once more text arrives.
+                # Never resume past the horizon: a longer match starting there
+                # (e.g. "3782 " before a pending "822463") may still form
+                resume = max(self._scan_from, min(match.start(), horizon))
+                break
+            if self.context:
+                before = window[max(0, match.start() - self.context):match.start()]
+                after = window[match.end():match.end() + self.context]
+                found.append((self._buffer_start + match.start(), match.group(), before, after))
+            else:
+                found.append((self._buffer_start + match.start(), match.group()))
+
+        keep_from = max(0, resume - self.overlap)
+        self._buffer = window[keep_from:]
+        self._buffer_start += keep_from
+        self._scan_from = resume - keep_from
+
+        return found
@@ -0,0 +1,136 @@
+"""
+Shared fixtures for the test suite.
+
+BIN_DB_URL is pointed at a scratch SQLite database before any application
+module is imported, so tests never touch bins_database.db; tests that
+write records bind the engine to their own file with the `database`
+fixture. Network tests talk to `http_stub`, a local server whose
+responses each test scripts.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+_scratch_dir = tempfile.TemporaryDirectory(prefix="bin-tests-")
+os.environ['BIN_DB_URL'] = 'sqlite:///' + os.path.join(_scratch_dir.name, 'default.db')
+os.environ.setdefault('BIN_CACHE_PERSISTENT', '0')
+os.environ.setdefault('BIN_API_RATE_LIMIT', '0')
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    The database module bound to an empty scratch database.
+
+    Returns:
+        module: database, with init_db() already run
+    """
+    pytest.importorskip("sqlalchemy")
+    import database
+
+    database.configure_engine(f"sqlite:///{tmp_path / 'bins.db'}")
+    database.init_db()
+    yield database
+    database.configure_engine(os.environ['BIN_DB_URL'])
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Records each GET and answers with whatever the server's respond callable returns"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append({
+                "path": self.path,
+                "headers": dict(self.headers),
+                "client": self.client_address,
+            })
+        status, headers, body = self.server.respond(self)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def http_stub():
+    """
+    Local HTTP server for client, scraper and service tests.
+
+    Set .respond to a callable taking the request handler and returning
+    (status, headers dict, body); every request is appended to .requests.
+
+    Returns:
+        ThreadingHTTPServer: With .url (base URL), .respond and .requests
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.respond = lambda handler: (200, {"Content-Type": "text/plain"}, b"ok")
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+# A page with two confident BIN candidates (a "bin" mention and a full card
+# number) and one low-confidence number next to order wording
+CARD_PAGE = (
+    "<html><body><p>fresh bin 414720 visa credit</p>"
+    "<p>4111 1111 1111 1111</p><p>order 517204 shipped</p></body></html>"
+)
+
+@pytest.fixture
+def card_site(http_stub, database, monkeypatch):
+    """
+    Serve CARD_PAGE at /page (ETag, 304 on If-None-Match) and a stand-in
+    3ds-lookup API from http_stub, with bin_checker pointed at it and an
+    empty in-memory lookup cache.
+
+    Returns:
+        ThreadingHTTPServer: http_stub with .page_url, .page (body), .etag
+        (None to send none) and .api_calls()
+    """
+    pytest.importorskip("requests")
+    import json
+    import bin_checker
+    from cache import LookupCache
+
+    monkeypatch.setattr(bin_checker, "API_BASE_URL", http_stub.url)
+    monkeypatch.setattr(bin_checker, "_lookup_cache", LookupCache(persistent=False))
+
+    http_stub.page = CARD_PAGE
+    http_stub.etag = '"v1"'
+    http_stub.page_url = http_stub.url + "/page"
+
+    def respond(handler):
+        if handler.path.startswith("/page"):
+            if http_stub.etag and handler.headers.get("If-None-Match") == http_stub.etag:
+                return 304, {"ETag": http_stub.etag}, b""
+            headers = {"Content-Type": "text/html; charset=utf-8"}
+            if http_stub.etag:
+                headers["ETag"] = http_stub.etag
+            return 200, headers, http_stub.page
+        body = json.dumps({"scheme": "VISA", "cardType": "CREDIT", "country": "US",
+                           "issuer": "Stub Bank", "is3DS": True})
+        return 200, {"Content-Type": "application/json"}, body
+
+    http_stub.respond = respond
+    http_stub.api_calls = lambda: sum(1 for r in http_stub.requests if not r["path"].startswith("/page"))
+    return http_stub
@@ -0,0 +1,37 @@
+"""
+Database History tab rendering, through Streamlit's AppTest.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("pandas")
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import REPO_ROOT
+
+def record(bin_number, source_url=None):
+    return {"BIN": bin_number, "Scheme": "VISA", "Country": "US", "Issuer": "Stub Bank",
+            "is3DS": True, "Risk Level": "Enforced", "raw_response": {}, "source_url": source_url}
+
+def test_history_shows_source_url_of_every_source(database):
+    database.add_bin_records([record("411111")], source='manual')
+    database.add_bin_records([record("414720", "https://forum.example.com/t/1")], source='scraper')
+    database.add_bin_records([record("457173", "file:///exports/app.log")], source='file_scan')
+
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60)
+    at.session_state["active_tab"] = "Database History"
+    at.run()
+    [box for box in at.checkbox if box.label == "Show All Card Details"][0].check().run()
+
+    assert not at.exception
+    history = at.dataframe[0].value
+    urls = dict(zip(history["BIN"], history["URL"]))
+    assert urls == {
+        "411111": "N/A",
+        "414720": "https://forum.example.com/t/1",
+        "457173": "file:///exports/app.log",
+    }
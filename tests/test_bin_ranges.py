@@ -0,0 +1,53 @@
+"""
+BinRangeIndex.from_database on databases the app has not initialised yet.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import database
+from bin_ranges import BinRangeIndex, main
+
+# bin_records as it was before bin_metadata, payload hashes and bin_stats
+LEGACY_SCHEMA = """
+CREATE TABLE bin_records (
+    id INTEGER PRIMARY KEY, bin_number VARCHAR(6) NOT NULL, ip_address VARCHAR(45) NOT NULL,
+    scheme VARCHAR(50), card_type VARCHAR(50), country VARCHAR(50), issuer VARCHAR(100),
+    ip_country VARCHAR(50), is_3ds BOOLEAN, risk_level VARCHAR(20), fraud_context BOOLEAN,
+    raw_response TEXT, checked_at DATETIME, source VARCHAR(50), source_url VARCHAR(255)
+)
+"""
+
+@pytest.fixture
+def scratch_url(tmp_path):
+    path = tmp_path / "scratch.db"
+    database.configure_engine(f"sqlite:///{path}")
+    yield path
+    database.configure_engine(os.environ['BIN_DB_URL'])
+
+def test_from_empty_database(scratch_url):
+    index = BinRangeIndex.from_database()
+
+    assert len(index) == 0
+    assert index.lookup("411111") is None
+
+def test_from_legacy_database(scratch_url, tmp_path):
+    conn = sqlite3.connect(scratch_url)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO bin_records (bin_number, ip_address, scheme, card_type, country, issuer, checked_at, source) "
+        "VALUES ('414720', '', 'VISA', 'CREDIT', 'US', 'Stub Bank', '2024-01-02 03:04:05', 'manual')"
+    )
+    conn.commit()
+    conn.close()
+
+    output = tmp_path / "ranges.idx"
+    assert main(["--from-db", "-o", str(output)]) == 0
+
+    index = BinRangeIndex.load(str(output))
+    assert index.lookup("41472012")["scheme"] == "VISA"
+    assert index.lookup("414720")["issuer"] == "Stub Bank"
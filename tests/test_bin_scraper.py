@@ -0,0 +1,84 @@
+"""
+Conditional rescans in scrape_bins_from_url against a local site that answers 304.
+"""
+
+import pytest
+
+pytest.importorskip("requests")
+
+from bin_scraper import scrape_bins_from_url, save_scan
+
+def page_requests(site):
+    return [r for r in site.requests if r["path"].startswith("/page")]
+
+def test_first_scan_is_stored_with_its_counts(card_site, database):
+    result = scrape_bins_from_url(card_site.page_url)
+
+    assert not result.from_cache
+    assert [row["BIN"] for row in result] == ["411111", "414720"]
+    assert (result.candidates, result.rejected) == (2, 1)
+
+    stored = database.get_scraped_page(card_site.page_url)
+    assert stored["etag"] == '"v1"'
+    assert stored["results"] == list(result)
+    assert (stored["candidates"], stored["rejected"]) == (2, 1)
+
+def test_rescan_uses_304_and_stored_results(card_site):
+    first = scrape_bins_from_url(card_site.page_url)
+    api_calls = card_site.api_calls()
+
+    second = scrape_bins_from_url(card_site.page_url)
+
+    assert page_requests(card_site)[-1]["headers"].get("If-None-Match") == '"v1"'
+    assert second.from_cache
+    assert list(second) == list(first)
+    assert (second.candidates, second.rejected) == (2, 1)
+    assert card_site.api_calls() == api_calls
+
+def test_unchanged_content_without_validators_is_not_parsed_again(card_site):
+    card_site.etag = None
+    scrape_bins_from_url(card_site.page_url)
+
+    second = scrape_bins_from_url(card_site.page_url)
+
+    assert "If-None-Match" not in page_requests(card_site)[-1]["headers"]
+    assert second.from_cache
+
+def test_changed_page_is_rescanned(card_site):
+    scrape_bins_from_url(card_site.page_url)
+    card_site.etag = '"v2"'
+    card_site.page = card_site.page.replace("414720", "457173")
+
+    result = scrape_bins_from_url(card_site.page_url)
+
+    assert not result.from_cache
+    assert [row["BIN"] for row in result] == ["411111", "457173"]
+
+def test_use_cache_false_bypasses_the_stored_scan(card_site):
+    scrape_bins_from_url(card_site.page_url)
+
+    result = scrape_bins_from_url(card_site.page_url, use_cache=False)
+
+    assert "If-None-Match" not in page_requests(card_site)[-1]["headers"]
+    assert not result.from_cache
+    assert len(result) == 2
+
+def test_different_settings_bypass_the_stored_scan(card_site):
+    scrape_bins_from_url(card_site.page_url)
+
+    limited = scrape_bins_from_url(card_site.page_url, max_lookups=1)
+    assert not limited.from_cache and len(limited) == 1
+
+    stricter = scrape_bins_from_url(card_site.page_url, max_lookups=1, min_confidence=0.9)
+    assert not stricter.from_cache
+    assert (stricter.candidates, stricter.rejected) == (1, 2)
+
+    again = scrape_bins_from_url(card_site.page_url, max_lookups=1, min_confidence=0.9)
+    assert again.from_cache and len(again) == 1
+
+def test_store_false_waits_for_save_scan(card_site, database):
+    result = scrape_bins_from_url(card_site.page_url, store=False)
+    assert database.get_scraped_page(card_site.page_url) is None
+
+    assert save_scan(result)
+    assert scrape_bins_from_url(card_site.page_url).from_cache
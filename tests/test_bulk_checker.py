@@ -0,0 +1,57 @@
+"""
+Parsing and validation of bulk uploads, and how their values reach the lookup API.
+"""
+
+import json
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+pytest.importorskip("requests")
+
+import bin_checker
+from bulk_checker import parse_bin_file, prepare_bins
+
+def test_pretty_printed_json_array():
+    data = json.dumps([{"bin": "414720", "ip": "8.8.8.8"}, "4111 1111 1111 1111", 510000], indent=2)
+
+    assert list(parse_bin_file(data.encode(), "bins.json")) == [
+        ("414720", "8.8.8.8"),
+        ("4111111111111111", None),
+        ("510000", None),
+    ]
+
+def test_json_lines_and_unparsable_array():
+    lines = '{"BIN": "414720", "ip_address": "8.8.8.8"}\n\n"510000"\n'
+    assert list(parse_bin_file(lines, "bins.ndjson")) == [("414720", "8.8.8.8"), ("510000", None)]
+
+    # Not valid JSON as a whole: read line by line, so good lines still count
+    broken = '[\n"414720",\n'
+    assert list(parse_bin_file(broken, "bins.json")) == [("[", None), ('"414720",', None)]
+
+def test_rows_with_invalid_ip_are_rejected():
+    pairs = [
+        ("414720", "1.2.3.4&bin=999999"),
+        ("414720", "8.8.8.8"),
+        ("414720", None),
+        ("510000", "not-an-ip"),
+        ("abc", "8.8.8.8"),
+    ]
+
+    valid, invalid, duplicates = prepare_bins(pairs, default_ip="9.9.9.9")
+
+    assert valid == [("414720", "8.8.8.8"), ("414720", "9.9.9.9")]
+    assert invalid == ["414720 (IP 1.2.3.4&bin=999999)", "510000 (IP not-an-ip)", "abc"]
+    assert duplicates == 0
+
+def test_lookup_values_are_encoded_into_the_query(http_stub, monkeypatch):
+    monkeypatch.setattr(bin_checker, "API_BASE_URL", http_stub.url)
+    http_stub.respond = lambda handler: (200, {"Content-Type": "application/json"}, b'{"scheme": "VISA"}')
+
+    assert bin_checker._fetch_3ds("414720", "1.2.3.4&bin=999999") == {"scheme": "VISA"}
+    assert bin_checker._fetch_3ds("414720") == {"scheme": "VISA"}
+
+    binip, cards = (urlsplit(r["path"]) for r in http_stub.requests)
+    assert binip.path == "/binip/"
+    assert parse_qs(binip.query) == {"bin": ["414720"], "ip": ["1.2.3.4&bin=999999"]}
+    assert (cards.path, parse_qs(cards.query)) == ("/cards/", {"num": ["4147200000000000"]})
@@ -0,0 +1,73 @@
+"""
+bin-intel scrape: pages are remembered for rescans only once their BINs are recorded.
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+
+import cli
+
+def scrape(site, tmp_path, capsys, *options):
+    urls = tmp_path / "urls.txt"
+    urls.write_text(site.page_url + "\n")
+    code = cli.main(["scrape", str(urls), *options])
+    out, err = capsys.readouterr()
+    return code, [json.loads(line) for line in out.splitlines()], err
+
+def recorded_bins(database):
+    return sorted(record.bin_number for record in database.get_bin_records())
+
+def test_no_db_scrape_does_not_remember_the_page(card_site, database, tmp_path, capsys):
+    code, rows, _ = scrape(card_site, tmp_path, capsys, "--no-db")
+    assert code == 0
+    assert sorted(row["BIN"] for row in rows) == ["411111", "414720"]
+    assert database.get_scraped_page(card_site.page_url) is None
+
+    code, rows, err = scrape(card_site, tmp_path, capsys)
+
+    assert code == 0
+    assert "0 unchanged" in err
+    assert recorded_bins(database) == ["411111", "414720"]
+
+def test_recorded_page_is_unchanged_on_the_next_run(card_site, database, tmp_path, capsys):
+    scrape(card_site, tmp_path, capsys)
+    assert database.get_scraped_page(card_site.page_url)["results"]
+
+    code, rows, err = scrape(card_site, tmp_path, capsys)
+
+    assert code == 0
+    assert "1 unchanged" in err
+    assert len(rows) == 2
+    assert recorded_bins(database) == ["411111", "414720"]
+
+def test_failed_save_does_not_remember_the_page(card_site, database, tmp_path, capsys, monkeypatch):
+    def fail(records, source=None, source_url=None):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(database, "add_bin_records", fail)
+        code, _, err = scrape(card_site, tmp_path, capsys)
+    assert code == 1
+    assert "not saved: database is locked" in err
+    assert database.get_scraped_page(card_site.page_url) is None
+
+    code, _, err = scrape(card_site, tmp_path, capsys)
+
+    assert code == 0
+    assert "0 unchanged" in err
+    assert recorded_bins(database) == ["411111", "414720"]
+
+def test_check_rejects_rows_with_invalid_ip(card_site, tmp_path, capsys):
+    bins = tmp_path / "bins.csv"
+    bins.write_text("bin,ip\n414720,8.8.8.8\n414720,8.8.8.8\n457173,1.2.3.4&bin=999999\n510000,\n")
+
+    code = cli.main(["check", str(bins), "--no-db"])
+    out, err = capsys.readouterr()
+
+    assert code == 0
+    assert sorted(json.loads(line)["BIN"] for line in out.splitlines()) == ["414720", "510000"]
+    assert "1 invalid, 1 duplicates" in err
+    assert not any("999999" in r["path"] or "457173" in r["path"] for r in card_site.requests)
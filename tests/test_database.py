@@ -0,0 +1,39 @@
+"""
+History filters: every option get_bin_record_filter_options offers matches its records.
+"""
+
+import pytest
+
+pytest.importorskip("pandas")
+
+def record(bin_number, country, scheme="VISA"):
+    return {"BIN": bin_number, "Scheme": scheme, "Country": country, "Issuer": "Stub Bank",
+            "is3DS": True, "Risk Level": "Enforced", "raw_response": {}}
+
+def test_unknown_option_matches_missing_values(database):
+    database.add_bin_records([
+        record("411111", None),
+        record("414720", ""),
+        record("457173", "US"),
+        record("510000", None, scheme="MASTERCARD"),
+    ])
+
+    options = database.get_bin_record_filter_options()
+    assert options["countries"] == ["US", "Unknown"]
+
+    records, _ = database.query_bin_records(countries=["Unknown"], schemes=["VISA"])
+    assert sorted(r.bin_number for r in records) == ["411111", "414720"]
+
+    frame, _ = database.load_bin_records_frame(countries=["Unknown", "US"])
+    assert len(frame) == 4
+
+    records, _ = database.query_bin_records(countries=["US"])
+    assert [r.bin_number for r in records] == ["457173"]
+
+def test_every_filter_option_matches_its_stats_count(database):
+    database.add_bin_records([record("411111", None), record("414720", "GB"), record("457173", "GB")])
+
+    stats = database.get_bin_stats()
+    for country, count in stats["country"]:
+        frame, _ = database.load_bin_records_frame(countries=[country])
+        assert len(frame) == count
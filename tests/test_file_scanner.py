@@ -0,0 +1,110 @@
+"""
+Span and block boundaries in file_scanner.scan_span.
+
+A file split into spans at arbitrary offsets must yield exactly what a
+single span over the whole file does, and both must equal a plain regex
+scan of the file, so numbers straddling a boundary are neither lost nor
+reported twice.
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import file_scanner
+from candidates import CONTEXT_CHARS, score_match
+
+SEED = 1604
+
+def luhn_complete(prefix, length):
+    """Append a Luhn check digit to prefix padded to length - 1 random digits."""
+    rng = random.Random(prefix + str(length))
+    body = prefix + "".join(rng.choice("0123456789") for _ in range(length - 1 - len(prefix)))
+    total = 0
+    for i, digit in enumerate(reversed(body)):
+        value = int(digit) * (2 if i % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return body + str((10 - total % 10) % 10)
+
+def grouped(number, separator):
+    if len(number) == 15:
+        return separator.join((number[:4], number[4:10], number[10:]))
+    return separator.join(number[i:i + 4] for i in range(0, len(number), 4))
+
+def make_text(rng, pieces=400):
+    numbers = [
+        luhn_complete(prefix, length)
+        for prefix, length in (("4147", 16), ("5500", 16), ("3782", 15), ("6011", 16), ("4111", 19))
+    ]
+    parts = []
+    for _ in range(pieces):
+        kind = rng.randrange(6)
+        number = rng.choice(numbers)
+        if kind == 0:
+            parts.append(number)
+        elif kind == 1:
+            parts.append(grouped(number, rng.choice(" -")))
+        elif kind == 2:
+            parts.append(rng.choice(("card bin ", "visa iin ", "order ")) + number[:rng.choice((6, 8))])
+        elif kind == 3:
+            parts.append("".join(rng.choice("0123456789 -") for _ in range(rng.randrange(1, 30))))
+        elif kind == 4:
+            parts.append("ticket #" + str(rng.randrange(10 ** 9)))
+        else:
+            parts.append(rng.choice(("customer paid with", "refund", "exp 09/27", "debit", "\n")))
+    return " ".join(parts).encode("ascii")
+
+def reference_scan(data, path, include_bins, min_confidence):
+    findings = []
+    for match in file_scanner.BYTES_PATTERN.finditer(data):
+        text = match.group().decode("ascii")
+        digits = text.replace(" ", "").replace("-", "")
+        if len(digits) <= 8 and not include_bins:
+            continue
+        before = data[max(0, match.start() - CONTEXT_CHARS):match.start()].decode("latin-1")
+        after = data[match.end():match.end() + CONTEXT_CHARS].decode("latin-1")
+        candidate = score_match(text, before, after)
+        if candidate is None or candidate["confidence"] < min_confidence:
+            continue
+        candidate.update(path=path, offset=match.start(), masked=file_scanner.mask_number(digits))
+        findings.append(candidate)
+    return findings
+
+def split_scan(path, size, cuts, include_bins, min_confidence):
+    bounds = [0] + sorted(cuts) + [size]
+    findings = []
+    for start, end in zip(bounds, bounds[1:]):
+        span_findings, scanned = file_scanner.scan_span((path, start, end, include_bins, min_confidence))
+        assert scanned == end - start
+        findings.extend(span_findings)
+    return findings
+
+@pytest.mark.parametrize("block_bytes", [7, 64, 4096])
+@pytest.mark.parametrize("include_bins,min_confidence", [(False, 0.6), (True, 0.3), (True, 0.6)])
+def test_split_spans_match_single_span(tmp_path, monkeypatch, block_bytes, include_bins, min_confidence):
+    monkeypatch.setattr(file_scanner, "BLOCK_BYTES", block_bytes)
+    rng = random.Random(SEED)
+    data = make_text(rng)
+    path = str(tmp_path / "export.log")
+    with open(path, "wb") as f:
+        f.write(data)
+
+    whole, _ = file_scanner.scan_span((path, 0, len(data), include_bins, min_confidence))
+    assert whole == reference_scan(data, path, include_bins, min_confidence)
+    assert whole, "fixture text should contain findings"
+
+    for _ in range(20):
+        cuts = set(rng.sample(range(1, len(data)), rng.randrange(1, 12)))
+        assert split_scan(path, len(data), cuts, include_bins, min_confidence) == whole
+
+def test_scan_paths_spans_match_single_span(tmp_path):
+    data = make_text(random.Random(SEED + 1))
+    (tmp_path / "a.log").write_bytes(data)
+
+    single = file_scanner.scan_paths([str(tmp_path)], workers=1, span_bytes=len(data))
+    split = file_scanner.scan_paths([str(tmp_path)], workers=1, span_bytes=97)
+
+    assert split["findings"] == single["findings"]
+    assert split["bytes"] == single["bytes"] == len(data)
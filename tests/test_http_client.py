@@ -0,0 +1,77 @@
+"""
+Retry, Retry-After capping, timeouts and keep-alive of http_client against a local stub.
+"""
+
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import http_client
+
+def scripted(*responses):
+    """respond callable answering with each (status, headers) in turn, then 200s"""
+    remaining = list(responses)
+
+    def respond(handler):
+        if remaining:
+            status, headers = remaining.pop(0)
+            return status, headers, b"busy"
+        return 200, {"Content-Type": "text/plain"}, b"ok"
+
+    return respond
+
+def test_retries_5xx_and_429_until_success(http_stub):
+    http_stub.respond = scripted((503, {"Retry-After": "0"}), (429, {"Retry-After": "0"}), (502, {}))
+    session = http_client.build_session(max_retries=3, backoff_factor=0)
+
+    response = session.get(http_stub.url + "/x", timeout=(1, 2))
+
+    assert response.status_code == 200
+    assert len(http_stub.requests) == 4
+
+def test_returns_last_error_when_retries_run_out(http_stub):
+    http_stub.respond = scripted(*[(503, {"Retry-After": "0"})] * 10)
+    session = http_client.build_session(max_retries=2, backoff_factor=0)
+
+    response = session.get(http_stub.url + "/x", timeout=(1, 2))
+
+    assert response.status_code == 503
+    assert len(http_stub.requests) == 3
+
+def test_retry_after_is_capped(http_stub, monkeypatch):
+    monkeypatch.setattr(http_client, "MAX_RETRY_AFTER", 0.2)
+    http_stub.respond = scripted((503, {"Retry-After": "120"}))
+    session = http_client.build_session(max_retries=1, backoff_factor=0)
+
+    started = time.monotonic()
+    response = session.get(http_stub.url + "/x", timeout=(1, 2))
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    assert 0.2 <= elapsed < 5
+
+def test_read_timeout_is_bounded_and_not_retried(http_stub):
+    def slow(handler):
+        time.sleep(1.0)
+        return 200, {}, b"late"
+
+    http_stub.respond = slow
+    session = http_client.build_session(max_retries=3, backoff_factor=0)
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.RequestException):
+        session.get(http_stub.url + "/slow", timeout=(1, 0.2))
+
+    assert time.monotonic() - started < 0.9
+    assert len(http_stub.requests) == 1
+
+def test_connection_is_reused_across_calls(http_stub, monkeypatch):
+    monkeypatch.setattr(http_client, "_session", None)
+
+    for _ in range(5):
+        assert http_client.get(http_stub.url + "/x").status_code == 200
+
+    assert len({request["client"] for request in http_stub.requests}) == 1
+    assert http_client.get_session() is http_client.get_session()
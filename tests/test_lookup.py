@@ -0,0 +1,85 @@
+"""
+Lookup results handed out by the cache and by coalesced calls are never shared.
+"""
+
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("requests")
+
+import bin_checker
+from cache import LookupCache
+
+RESPONSE = {"scheme": "VISA", "is3DS": True, "bank": {"name": "Stub Bank", "phones": ["555"]}}
+
+@pytest.fixture
+def api(http_stub, monkeypatch):
+    monkeypatch.setattr(bin_checker, "API_BASE_URL", http_stub.url)
+    monkeypatch.setattr(bin_checker, "_lookup_cache", LookupCache(persistent=False))
+    http_stub.respond = lambda handler: (200, {"Content-Type": "application/json"}, json.dumps(RESPONSE))
+    return http_stub
+
+def test_memory_tier_results_are_deep_copies():
+    cache = LookupCache(persistent=False)
+    response = json.loads(json.dumps(RESPONSE))
+    cache.set("414720", None, response)
+    response["bank"]["name"] = "changed by the caller that stored it"
+
+    first = cache.get("414720")
+    first["bank"]["phones"].append("changed by a reader")
+
+    assert cache.get("414720") == RESPONSE
+
+def test_sqlite_tier_results_are_deep_copies(database):
+    writer = LookupCache(persistent=True)
+    writer.set("414720", None, RESPONSE)
+
+    reader = LookupCache(persistent=True)
+    promoted = reader.get("414720")
+    promoted["bank"]["name"] = "changed"
+
+    assert reader.stats()["db_hits"] == 1
+    assert reader.get("414720") == RESPONSE
+
+def test_coalesced_callers_get_independent_results(api):
+    release = threading.Event()
+
+    def slow(handler):
+        release.wait(5)
+        return 200, {"Content-Type": "application/json"}, json.dumps(RESPONSE)
+
+    api.respond = slow
+    before = bin_checker.get_coalescing_stats()["coalesced"]
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(bin_checker.check_bin_3ds("414720")))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    while bin_checker.get_coalescing_stats()["coalesced"] - before < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(api.requests) == 1
+    results[0]["bank"]["phones"].append("changed")
+    assert results[1] == results[2] == RESPONSE
+
+def test_lookup_that_finishes_after_a_miss_is_not_repeated(api):
+    cache = bin_checker.get_lookup_cache()
+    get = cache.get
+
+    def get_then_finish_other_lookup(bin_number, ip_address=None, **kwargs):
+        cached = get(bin_number, ip_address, **kwargs)
+        # Another caller's upstream lookup completes right after this miss
+        cache.set(bin_number, ip_address, RESPONSE)
+        return cached
+
+    cache.get = get_then_finish_other_lookup
+    assert bin_checker.check_bin_3ds("414720") == RESPONSE
+    assert api.requests == []
+    assert cache.stats()["misses"] == 1
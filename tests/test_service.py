@@ -0,0 +1,114 @@
+"""
+Lookup service error responses, request validation and where cache probes run.
+"""
+
+import json
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+import bin_checker
+import service
+from cache import LookupCache
+
+RESPONSE = {"scheme": "VISA", "cardType": "CREDIT", "country": "US", "issuer": "Stub Bank", "is3DS": False}
+
+class StubBatcher(service.MicroBatcher):
+    """A batcher whose lookups answer RESPONSE at once, never finish, or fail before being queued"""
+
+    def __init__(self, error=None, answer=False):
+        super().__init__(workers=1)
+        self.error = error
+        self.answer = answer
+
+    def submit(self, bin_number, ip_address=None):
+        if self.error:
+            raise self.error
+        future = Future()
+        if self.answer:
+            future.set_result((dict(RESPONSE), False))
+        return future
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(batcher):
+        server = service.create_server("127.0.0.1", 0, batcher)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+
+def test_lookup_timeout_answers_504(serve, monkeypatch):
+    monkeypatch.setattr(service, "REQUEST_TIMEOUT", 0.1)
+    url = serve(StubBatcher())
+
+    single = requests.get(url + "/lookup", params={"bin": "411111"}, timeout=5)
+    batch = requests.post(url + "/batch", data=json.dumps({"bins": ["411111", "550000"]}), timeout=5)
+
+    assert (single.status_code, single.json()) == (504, {"error": "lookup timed out"})
+    assert (batch.status_code, batch.json()) == (504, {"error": "lookup timed out"})
+
+def test_unexpected_error_answers_500_and_keeps_serving(serve):
+    url = serve(StubBatcher(error=RuntimeError("dispatcher stopped")))
+
+    with requests.Session() as session:
+        failed = session.get(url + "/lookup", params={"bin": "411111"}, timeout=5)
+        health = session.get(url + "/health", timeout=5)
+
+    assert (failed.status_code, failed.json()) == (500, {"error": "internal error"})
+    assert health.status_code == 200
+
+def test_fraud_context_must_be_a_boolean(serve):
+    url = serve(StubBatcher(answer=True))
+
+    def post(path, body):
+        response = requests.post(url + path, data=json.dumps(body), timeout=5)
+        return response.status_code, response.json()
+
+    assert post("/lookup", {"bin": "411111", "fraud_context": False})[1]["risk_level"] == "Weak"
+    assert post("/lookup", {"bin": "411111", "fraud_context": True})[1]["risk_level"] == "Unsafe"
+    assert post("/lookup", {"bin": "411111", "fraud_context": "false"}) == (
+        400, {"error": "fraud_context must be true or false, not 'false'"})
+    assert post("/batch", {"bins": ["411111"], "fraud_context": 1})[0] == 400
+
+    status, body = post("/batch", {"items": [{"bin": "411111"}, {"bin": "411111", "fraud_context": "no"}]})
+    assert status == 200
+    assert body["results"][0]["risk_level"] == "Weak"
+    assert body["results"][1] == {"bin": "411111", "error": "fraud_context must be true or false, not 'no'"}
+
+    def get(flag):
+        return requests.get(url + "/lookup", params={"bin": "411111", "fraud_context": flag}, timeout=5)
+
+    assert get("1").json()["risk_level"] == "Unsafe"
+    assert get("false").json()["risk_level"] == "Weak"
+    assert get("maybe").status_code == 400
+
+def test_sqlite_tier_is_probed_off_the_dispatcher_thread(serve, database, monkeypatch):
+    LookupCache(persistent=True).set("411111", None, RESPONSE)
+    monkeypatch.setattr(bin_checker, "_lookup_cache", LookupCache(persistent=True))
+
+    threads = []
+    get_cached_lookup = database.get_cached_lookup
+
+    def recording_get(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return get_cached_lookup(*args, **kwargs)
+
+    monkeypatch.setattr(database, "get_cached_lookup", recording_get)
+    url = serve(service.MicroBatcher(workers=1))
+
+    first = requests.get(url + "/lookup", params={"bin": "411111"}, timeout=5).json()
+    second = requests.get(url + "/lookup", params={"bin": "411111"}, timeout=5).json()
+
+    assert first["cached"] and second["cached"]
+    assert len(threads) == 1 and threads[0].startswith("service-lookup")
@@ -17,6 +17,30 @@ def is_valid_bin(bin_number):
     # Check if it's a 6-digit BIN or a full card number (13-19 digits)
     return bool(re.match(r'^\d{6,19}$', bin_number))
 
+def is_luhn_valid(card_number):
+    """
+    Check a card number's Luhn (mod 10) check digit.
+    
+    Args:
+        card_number (str): Card number digits
+        
+    Returns:
+        bool: True if the check digit is correct, False otherwise
+    """
+    if not card_number or not card_number.isdigit():
+        return False
+    
+    total = 0
+    for position, digit in enumerate(reversed(card_number)):
+        digit = int(digit)
+        if position % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    
+    return total % 10 == 0
+
 def is_valid_ip(ip_address):
     """
     Validate if the input is a valid IP address.